@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import random
+import multiprocessing
+from datetime import datetime, timedelta
+
+from pyswrve.testing import RouteServer
+
+prefix = '/api/1/exporter/'
+
+
+def timeline(points, hourly=False):
+    """ Synthetic Swrve timeline of `points` days or hours """
+
+    start = datetime(2017, 1, 1)
+    if hourly:
+        return [(start + timedelta(hours=i)).strftime('H-%Y-%m-%d-%H')
+                for i in range(points)]
+    return [(start + timedelta(days=i)).strftime('D-%Y-%m-%d')
+            for i in range(points)]
+
+
+def series(points, hourly=False, seed=0):
+    rnd = random.Random(seed)
+    return [[date, float(rnd.randint(0, 10000))]
+            for date in timeline(points, hourly)]
+
+
+def kpi_response(points, hourly=False):
+    return [{'name': 'kpi', 'data': series(points, hourly)}]
+
+
+def evt_response(points, hourly=False):
+    return [{'name': 'event', 'data': series(points, hourly, seed=1)}]
+
+
+def payload_response(points, values, hourly=False):
+    return [{'data': series(points, hourly, seed=idx),
+             'event_name': 'levelup',
+             'name': 'levelup/level/%d' % idx,
+             'payload_key': 'level',
+             'payload_value': str(idx)}
+            for idx in range(values)]
+
+
+def cohorts_response(days):
+    data = {}
+    for idx, date in enumerate(timeline(days)):
+        data[date[2:]] = {
+            'users': 1000 + idx,
+            'data': {str(day): 0.9 ** day for day in range(days - idx)}
+        }
+    return [{'name': 'retention', 'data': data}]
+
+
+class _FakeRoutes:
+    """ Routes of the fake server, created in the server process """
+
+    def __init__(self, points, payload_values, cohort_days, userdb_files,
+                 userdb_file_size, hourly, latency, error_rate, seed):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.url = None
+
+        responses = {
+            'kpi/dau.json': kpi_response(points, hourly),
+            'event/count': evt_response(points, hourly),
+            'event/payload': payload_response(points, payload_values,
+                                              hourly),
+            'cohorts/daily': cohorts_response(cohort_days),
+        }
+        self.routes = {prefix + path: self._route(json.dumps(data))
+                       for path, data in responses.items()}
+
+        self.files = ['/files/users_%04d.gz' % idx
+                      for idx in range(userdb_files)]
+        for path in self.files:
+            self.routes[path] = self._route(os.urandom(userdb_file_size))
+        self.routes['/api/1/userdbs.json'] = self._userdb_urls
+
+    def _fail(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            status = self._random.choice([429, 500])
+            return status, {'error': 'injected'}, {'Retry-After': '0'}
+        return None
+
+    def _route(self, data):
+        def route(handler, params, body):
+            return self._fail() or (200, data, {})
+        return route
+
+    def _userdb_urls(self, handler, params, body):
+        data = {
+            'date': '2017-01-01',
+            'data_files': {'users': [self.url + path for path in self.files]},
+            'schemas': {}
+        }
+        return self._fail() or (200, data, {})
+
+
+def _serve(kwargs, conn):
+    fake = _FakeRoutes(**kwargs)
+    # requests aren't recorded, so memory doesn't grow with benchmarks
+    server = RouteServer(fake.routes)
+    fake.url = server.url
+    server.start()
+    try:
+        conn.send(fake.url)
+        conn.recv()
+    finally:
+        server.stop()
+
+
+class FakeSwrve:
+    """ Local stand-in for Swrve Export and UserDB APIs with synthetic
+    responses, injected latency and errors
+
+    The server runs in a separate process, so it doesn't compete with the
+    measured client for the GIL. Every route sleeps `latency` seconds and
+    fails with 429 or 500 status with `error_rate` probability.
+    """
+
+    def __init__(self, points=365, payload_values=50, cohort_days=30,
+                 userdb_files=4, userdb_file_size=1024*1024, hourly=False,
+                 latency=0, error_rate=0, seed=0):
+        self._kwargs = {
+            'points': points, 'payload_values': payload_values,
+            'cohort_days': cohort_days, 'userdb_files': userdb_files,
+            'userdb_file_size': userdb_file_size, 'hourly': hourly,
+            'latency': latency, 'error_rate': error_rate, 'seed': seed
+        }
+        self.url = None
+        self._conn = None
+        self._process = None
+
+    def __enter__(self):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self._kwargs, child_conn), daemon=True
+        )
+        self._process.start()
+        self.url = self._conn.recv()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._conn.send(None)
+        self._process.join()
+
+    def point(self, api):
+        """ Send requests of the api object to the fake server """
+
+        if api._api_url.endswith('exporter/'):
+            api._api_url = self.url + prefix
+        else:
+            api._api_url = self.url + '/api/1/userdbs.json'
+        return api
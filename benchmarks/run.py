@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+""" Benchmarks of pyswrve against a local fake Swrve server
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --latency 0.05 --error-rate 0.02 \\
+        --compare results.json
+"""
+
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import pyswrve
+from pyswrve import ExportApi, UserdbApi
+from pyswrve.exceptions import SwrveApiException
+from pyswrve.ratelimit import SwrveRateLimiter
+
+from .fake_swrve import FakeSwrve
+
+keys = {'api_key': 'key', 'personal_key': 'personal'}
+
+
+def percentile(values, percent):
+    """ Nearest-rank percentile of not empty list """
+
+    values = sorted(values)
+    idx = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[idx]
+
+
+def peak_memory(func):
+    """ Peak of memory allocated by Python while `func` runs, in bytes """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def make_api(fake, args, api_class=ExportApi):
+    """ Api object sending requests to the fake server, injected errors
+    are retried
+    """
+
+    limiter = None
+    if args.error_rate:
+        limiter = SwrveRateLimiter(rate=10**6, backoff=0.01)
+    return fake.point(api_class(rate_limiter=limiter, **keys))
+
+
+def bench_requests(fake, args):
+    """ Throughput and latency of `send_api_request` """
+
+    api = make_api(fake, args)
+    url = api._api_url + 'kpi/dau.json'
+    latencies = []
+    errors = 0
+
+    def send(_):
+        started = time.perf_counter()
+        try:
+            api.send_api_request(url)
+        except SwrveApiException:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with api, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for res in executor.map(send, range(args.requests)):
+            if res is None:
+                errors += 1
+            else:
+                latencies.append(res)
+    seconds = time.perf_counter() - started
+
+    return {
+        'requests': args.requests,
+        'errors': errors,
+        'seconds': seconds,
+        'rps': args.requests / seconds,
+        'p50': percentile(latencies, 50) if latencies else None,
+        'p99': percentile(latencies, 99) if latencies else None,
+    }
+
+
+def bench_shaping(fake, args):
+    """ CPU time and peak memory of result shaping without network """
+
+    api = make_api(fake, args)
+    with api:
+        kpi = api.send_api_request(api._api_url + 'kpi/dau.json')
+        payload = api.send_api_request(api._api_url + 'event/payload')
+        cohorts = api.send_api_request(api._api_url + 'cohorts/daily')
+
+    cases = {
+        'get_kpi': lambda: api._kpi_results(kpi, 'dau', True, True, None),
+        'get_payload': lambda: api._payload_results(payload, True, False,
+                                                    False),
+        'get_user_cohorts': lambda: api._cohorts_results(cohorts, True),
+    }
+    if numpy is not None:
+        cases['get_payload_matrix'] = lambda: api._payload_results(
+            payload, True, False, False, 'matrix'
+        )
+
+    results = {}
+    for name, func in cases.items():
+        started = time.process_time()
+        for _ in range(args.repeat):
+            func()
+        cpu = (time.process_time() - started) / args.repeat
+        results[name] = {'cpu': cpu, 'peak_memory': peak_memory(func)}
+    return results
+
+
+def bench_stream(fake, args):
+    """ Peak memory of the whole payload request, plain vs streaming """
+
+    api = make_api(fake, args)
+
+    def plain():
+        api.get_payload('levelup', 'level')
+
+    def stream():
+        for _ in api.iter_payload('levelup', 'level'):
+            pass
+
+    results = {}
+    with api:
+        for name, func in (('get_payload', plain), ('iter_payload', stream)):
+            try:
+                results[name] = {'peak_memory': peak_memory(func)}
+            except SwrveApiException as e:
+                results[name] = {'error': str(e)}
+    return results
+
+
+def bench_userdb(fake, args):
+    """ Throughput of UserDB files download """
+
+    api = make_api(fake, args, UserdbApi)
+    with api, tempfile.TemporaryDirectory() as path:
+        report = api.download(path, max_workers=args.workers)
+    return {'bytes': report['bytes'], 'seconds': report['seconds'],
+            'throughput': report['throughput'],
+            'errors': len(report['errors'])}
+
+
+benchmarks = {
+    'requests': bench_requests,
+    'shaping': bench_shaping,
+    'stream': bench_stream,
+    'userdb': bench_userdb,
+}
+
+
+def flatten(results, prefix=''):
+    """ Flat dict of metrics like `shaping.get_kpi.cpu` """
+
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results, path):
+    """ Print relative change of every metric against previous results """
+
+    with open(path) as f:
+        previous = flatten(json.load(f)['results'])
+
+    for name, value in sorted(flatten(results).items()):
+        old = previous.get(name)
+        if not old:
+            change = ''
+        else:
+            change = '%+.1f%%' % ((value - old) / old * 100)
+        print('%-45s %14.6g %10s' % (name, value, change))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(benchmarks),
+                        help='run only these benchmarks')
+    parser.add_argument('--points', type=int, default=365,
+                        help='count of points in every series')
+    parser.add_argument('--hourly', action='store_true',
+                        help='hourly timeline instead of daily')
+    parser.add_argument('--payload-values', type=int, default=50)
+    parser.add_argument('--cohort-days', type=int, default=30)
+    parser.add_argument('--userdb-files', type=int, default=4)
+    parser.add_argument('--userdb-file-size', type=int, default=1024*1024)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='share of responses failed with 429 or 500')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='repeats of every shaping case')
+    parser.add_argument('--output', help='path to save json results')
+    parser.add_argument('--compare', help='path to previous json results')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake = FakeSwrve(args.points, args.payload_values, args.cohort_days,
+                     args.userdb_files, args.userdb_file_size, args.hourly,
+                     args.latency, args.error_rate)
+
+    results = {}
+    with fake:
+        for name in args.only or sorted(benchmarks):
+            results[name] = benchmarks[name](fake, args)
+
+    output = {
+        'meta': {
+            'date': datetime.now().isoformat(),
+            'pyswrve': pyswrve.__version__,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
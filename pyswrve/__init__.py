@@ -3,6 +3,12 @@
 from .export_api import SwrveExportApi as ExportApi
 from .userdb_api import SwrveUserdbApi as UserdbApi
 from .items_api import SwrveItemsApi as ItemsApi
+from .async_api import AsyncSwrveExportApi as AsyncExportApi
+from .async_api import AsyncSwrveUserdbApi as AsyncUserdbApi
+from .async_api import AsyncSwrveItemsApi as AsyncItemsApi
+from .fleet import SwrveFleetApi as FleetApi
+from .fleet import AsyncSwrveFleetApi as AsyncFleetApi
+from .report import SwrveReport as Report
 
 version_info = (0, 4, 0, 'dev')
 __version__ = '.'.join(map(str, version_info))
@@ -1,11 +1,42 @@
 # -*- coding: utf-8 -*-
 
+import time
 import os.path
+import logging
+import threading
 from configparser import ConfigParser
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from .cache import request_key, endpoint_name
+from .metrics import request_event, current_endpoint
+from .stream import iter_series
 from .exceptions import SwrveApiException
+from .transport import SwrveTransport
+
+logger = logging.getLogger(__name__)
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def read_config(path):
+    """ Read pyswrve config, the file is parsed only once until it's
+    modified
+
+    :param path: [:class:`str`] path to config file
+    :return: :class:`ConfigParser`
+    """
+
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    with _configs_lock:
+        cached = _configs.get(path)
+        if cached is None or cached[0] != mtime:
+            conf = ConfigParser()
+            conf.read(path)
+            cached = _configs[path] = (mtime, conf)
+        return cached[1]
 
 
 class SwrveApi:
@@ -15,14 +46,16 @@ class SwrveApi:
     """
 
     conf_path = os.path.join(os.path.expanduser('~'), '.pyswrve')
-    __conf = ConfigParser()
 
     __api_url_us = 'https://dashboard.swrve.com/api/1/'
     __api_url_eu = 'https://eu-dashboard.swrve.com/api/1/'
     _api_url = None
+    transport_class = SwrveTransport
 
     def __init__(self, region='us', api_key=None, personal_key=None,
-                 section=None, conf_path=None):
+                 section=None, conf_path=None, transport=None,
+                 cache=None, rate_limiter=None, coalescer=None,
+                 hooks=None):
         """ __init__
 
         :param region: [:class:`str`] us or eu region, it defines domain
@@ -36,19 +69,34 @@ class SwrveApi:
             config sections
         :param conf_path: [:class:`str`] arg overrides default path to
             config file with entered
+        :param transport: [:class:`SwrveTransport`] transport for sending
+            requests, by default every api object creates own transport,
+            pass one transport to several api objects to share the pool
+            of connections
+        :param cache: [:class:`SwrveCache`] opt-in cache for responses,
+            can be shared by several api objects
+        :param rate_limiter: [:class:`SwrveRateLimiter`] opt-in rate
+            limiter and retry scheduler, share one limiter between api
+            objects working with the same API key
+        :param coalescer: [:class:`SwrveCoalescer`] opt-in deduplication
+            of identical requests sent concurrently or within a short
+            window
+        :param hooks: [:class:`list`] opt-in callables receiving events
+            with timings of every request, e.g. :class:`SwrveMetrics`,
+            events don't contain credentials
         """
 
         if section is None:
             section = 'defaults'
         self.section = section
 
-        if not api_key or not personal_key:
-            if conf_path is not None:
-                self.con_path = conf_path
+        if conf_path is not None:
+            self.conf_path = conf_path
 
-            self.__conf.read(self.conf_path)
-            api_key = self.__conf.get(section, 'api_key')
-            personal_key = self.__conf.get(section, 'personal_key')
+        if not api_key or not personal_key:
+            conf = read_config(self.conf_path)
+            api_key = conf.get(section, 'api_key')
+            personal_key = conf.get(section, 'personal_key')
 
         self._params = {
             'api_key': api_key,
@@ -60,22 +108,167 @@ class SwrveApi:
         elif region == 'eu':
             self._api_url = self.__api_url_eu
 
+        self._own_transport = transport is None
+        if transport is None:
+            transport = self.transport_class()
+        self._transport = transport
+        self._cache = cache
+        self._rate_limiter = rate_limiter
+        self._coalescer = coalescer
+        self._hooks = list(hooks or [])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Close the transport if it was created by this api object """
+
+        if self._own_transport:
+            self._transport.close()
+
     def save_config(self):
         """ Save params to config file """
 
-        if not self.__conf.has_section(self.section):
-            self.__conf.add_section(self.section)
+        conf = read_config(self.conf_path)
+        if not conf.has_section(self.section):
+            conf.add_section(self.section)
 
         for key in self._params:
             val = self._params[key]
-            self.__conf.set(self.section, key, val)
+            conf.set(self.section, key, val)
 
         with open(self.conf_path, 'w') as f:
-            self.__conf.write(f)
+            conf.write(f)
 
     def set_param(self, key, val):
         self._params[key] = val
 
+    def _gather(self, calls, max_workers=None):
+        """ Run calls concurrently on a bounded pool of threads
+
+        :param calls: [:class:`dict`] keys are any hashable objects and
+            values are tuples (func, args, kwargs)
+        :param max_workers: [:class:`int`] max count of concurrent calls,
+            by default equals to the transport pool size
+        :return: [:class:`dict`] keys from `calls` and values are calls
+            results or `SwrveApiException` for failed calls, connection
+            errors and timeouts are wrapped too
+        """
+
+        if max_workers is None:
+            max_workers = self._transport.pool_size
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                key: executor.submit(func, *args, **kwargs)
+                for key, (func, args, kwargs) in calls.items()
+            }
+            for key in futures:
+                try:
+                    results[key] = futures[key].result()
+                except SwrveApiException as e:
+                    results[key] = e
+                except requests.RequestException as e:
+                    url = e.request.url if e.request is not None else None
+                    results[key] = SwrveApiException(str(e), None, url, None)
+
+        return results
+
+    def _request_params(self, **kwargs):
+        """ Merge api params with not None kwargs """
+
+        params = self._params.copy()
+        dct = {k: kwargs[k] for k in kwargs if kwargs[k] is not None}
+        params.update(dct)
+        return params
+
+    def _get(self, url, params, event=None, **kwargs):
+        """ Send GET request, with the rate limiter the request waits for
+        a token and failed requests are retried
+
+        :param url: [:class:`str`] url for request
+        :param params: [:class:`dict`] request params
+        :param event: [:class:`dict`] request event of hooks, if it's
+            passed the body is read separately to measure timings
+        :param kwargs: other args of `SwrveTransport.get`
+        :return: `requests.Response` object
+        """
+
+        if event is not None:
+            kwargs['stream'] = True
+        return self._request('get', url, params, event, **kwargs)
+
+    def _request(self, method, url, params, event=None, **kwargs):
+        """ Body of :meth:`_get`, also used for HEAD requests
+
+        :param method: [:class:`str`] `get` or `head`
+        :param params: [:class:`dict`] request params or None for urls
+            without API keys, e.g. UserDB files
+        """
+
+        send = getattr(self._transport, method)
+        limiter = self._rate_limiter
+        if limiter is None:
+            res = send(url, params=params, **kwargs)
+            if event is not None:
+                event['ttfb'] = res.elapsed.total_seconds()
+            return res
+
+        api_key = params.get('api_key') if params else None
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = limiter.reserve(api_key)
+            time.sleep(wait)
+            if event is not None:
+                event['queue'] += wait
+                event['retries'] = attempt
+
+            try:
+                res = send(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = limiter.retry_delay(api_key, None, None, attempt,
+                                            started)
+                if delay is None:
+                    raise
+            else:
+                delay = limiter.retry_delay(api_key, res.status_code,
+                                            res.headers.get('Retry-After'),
+                                            attempt, started)
+                if delay is None:
+                    if event is not None:
+                        event['ttfb'] = res.elapsed.total_seconds()
+                    return res
+                res.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _emit(self, event):
+        """ Pass the event to all hooks, errors of hooks are logged and
+        don't fail the request
+        """
+
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception('hook %r failed on %s event', hook,
+                                 event.get('kind'))
+
+    def _set_endpoint(self, url):
+        """ Remember the endpoint for `shape` events of hooks, it's set
+        before the coalescer and stores, so responses received without
+        a request are labeled too
+        """
+
+        if self._hooks:
+            current_endpoint.set(endpoint_name(url))
+
     def send_api_request(self, url, **kwargs):
         """ Send GET request to Swrve API
 
@@ -84,16 +277,118 @@ class SwrveApi:
         :raises SwrveApiException: if request status_code != 200
         """
 
-        params = self._params.copy()
-        dct = {k: kwargs[k] for k in kwargs if kwargs[k] is not None}
-        params.update(dct)
+        self._set_endpoint(url)
+        params = self._request_params(**kwargs)
+        if self._coalescer is None:
+            return self._send(url, params)
+
+        key = request_key(url, params)
+        return self._coalescer.fetch(key, lambda: self._send(url, params))
+
+    def stream_api_request(self, url, key=None, chunk_size=64*1024,
+                           **kwargs):
+        """ Send GET request to Swrve API and decode the response with
+        series incrementally, the cache and the coalescer aren't used
+
+        :param url: [:class:`str`] url for request
+        :param key: [:class:`str`] a field of series required with every
+            point, look at :func:`pyswrve.stream.iter_series`
+        :param chunk_size: [:class:`int`] size of read chunks in bytes
+        :return: generator of tuples (series, point)
+        :raises SwrveApiException: if request status_code != 200
+        """
+
+        self._set_endpoint(url)
+        params = self._request_params(**kwargs)
+        if not self._hooks:
+            with self._get(url, params, stream=True) as res:
+                if res.status_code != 200:
+                    raise self._response_error(res, url, params)
+                yield from iter_series(res.iter_content(chunk_size), key)
+            return
+
+        # download and decode are interleaved, so only `total` is measured
+        event = request_event(url)
+        started = time.perf_counter()
+        try:
+            with self._get(url, params, event) as res:
+                event['status'] = res.status_code
+                if res.status_code != 200:
+                    raise self._response_error(res, url, params)
+                chunks = self._count_bytes(res.iter_content(chunk_size),
+                                           event)
+                yield from iter_series(chunks, key)
+        finally:
+            event['total'] = time.perf_counter() - started
+            self._emit(event)
+
+    @staticmethod
+    def _count_bytes(chunks, event):
+        """ Pass chunks through and write their size to the event """
+
+        event['bytes'] = 0
+        for chunk in chunks:
+            event['bytes'] += len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _response_error(res, url, params):
+        """ Create exception for failed request """
+
+        try:
+            error = res.json()['error']
+        except ValueError:
+            error = None
+        return SwrveApiException(error, res.status_code, url, params)
+
+    def _send(self, url, params):
+        """ Get response from the cache or send request
+
+        :param url: [:class:`str`] url for request
+        :param params: [:class:`dict`] request params
+        :return: [:class:`dict`] request results
+        :raises SwrveApiException: if request status_code != 200
+        """
+
+        if not self._hooks:
+            return self._send_request(url, params)
+
+        event = request_event(url)
+        started = time.perf_counter()
+        try:
+            return self._send_request(url, params, event)
+        finally:
+            event['total'] = time.perf_counter() - started
+            self._emit(event)
+
+    def _send_request(self, url, params, event=None):
+        """ Body of :meth:`_send`, timings are written to the event """
+
+        if self._cache is not None:
+            data = self._cache.get(url, params)
+            if data is not None:
+                if event is not None:
+                    event['cached'] = True
+                return data
+
+        res = self._get(url, params, event)
+        if event is not None:
+            event['status'] = res.status_code
+            started = time.perf_counter()
+            event['bytes'] = len(res.content)
+            event['download'] = time.perf_counter() - started
 
-        res = requests.get(url, params=params)
         if res.status_code != 200:
-            try:
-                error = res.json()['error']
-            except ValueError:
-                error = None
-            raise SwrveApiException(error, res.status_code, url, params)
+            raise self._response_error(res, url, params)
+
+        if event is None:
+            data = res.json()
+        else:
+            started = time.perf_counter()
+            data = res.json()
+            event['decode'] = time.perf_counter() - started
+
+        if self._cache is not None:
+            self._cache.set(url, params, data)
 
-        return res.json()
+        return data
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .timeline import prefixes, detect_prefix
+
+SeriesArray = namedtuple('SeriesArray', ['timeline', 'values'])
+SeriesArray.__doc__ = """ Columnar time series: `timeline` is
+`numpy.datetime64` array and `values` is `float64` array
+"""
+
+# numpy datetime64 unit: length of the date part
+unit_sizes = {'h': 13, 'D': 10, 'M': 7, 'Y': 4}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for output='array'")
+
+
+def timeline_to_datetime64(timeline):
+    """ Convert Swrve timeline strings like `D-2017-01-01` or
+    `H-2017-01-01-05` to `numpy.datetime64` array, the granularity is
+    detected once by the first element
+
+    :param timeline: [:class:`list`] strings with dates
+    :return: `numpy.datetime64` array
+    """
+
+    _require_numpy()
+    if not len(timeline):
+        return np.array([], dtype='datetime64[D]')
+
+    prefix = detect_prefix(timeline[0])
+    unit = prefixes[prefix][0]
+    size = unit_sizes[unit]
+
+    start = len(prefix)
+    if unit == 'h':
+        # 2017-01-01-05 -> 2017-01-01T05
+        dates = [i[start:start+10] + 'T' + i[start+11:start+13]
+                 for i in timeline]
+    else:
+        dates = [i[start:start+size] for i in timeline]
+
+    return np.array(dates, dtype='datetime64[%s]' % unit)
+
+
+def series_array(points, multiplier=None):
+    """ Create :class:`SeriesArray` from a list of [date, value] pairs
+
+    :param points: [:class:`list`] Export API data points
+    :param multiplier: [:class:`float`] multiplier applied to all values
+    :return: :class:`SeriesArray`
+    """
+
+    _require_numpy()
+    timeline = timeline_to_datetime64([i[0] for i in points])
+    values = np.fromiter((i[1] for i in points), dtype='float64',
+                         count=len(points))
+    if multiplier is not None:
+        values *= multiplier
+    return SeriesArray(timeline, values)
+
+
+def divide_series(series, dau):
+    """ Divide values of the series with DAU, zero DAU gives zero value
+
+    :param series: :class:`SeriesArray` with values
+    :param dau: :class:`SeriesArray` with DAU
+    :return: :class:`SeriesArray`
+    """
+
+    values = np.divide(series.values, dau.values,
+                       out=np.zeros_like(series.values),
+                       where=dau.values != 0)
+    return SeriesArray(dau.timeline, values)
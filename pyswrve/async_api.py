@@ -0,0 +1,716 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .api import SwrveApi
+from .cache import request_key
+from .metrics import request_event
+from .stream import aiter_series
+from .export_api import SwrveExportApi
+from .userdb_api import SwrveUserdbApi, _FileDownload
+from .items_api import SwrveItemsApi, _ItemIndex
+from .exceptions import SwrveApiException
+from .transport import AsyncSwrveTransport
+
+
+class AsyncSwrveApi(SwrveApi):
+    """ Base class for sending requests to Swrve Non-Client APIs from
+    asyncio code, requires `aiohttp`
+    """
+
+    transport_class = AsyncSwrveTransport
+
+    def __enter__(self):
+        raise TypeError('use "async with" with %s' % type(self).__name__)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        raise TypeError('use "async with" with %s' % type(self).__name__)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """ Close the transport if it was created by this api object """
+
+        if self._own_transport:
+            await self._transport.close()
+
+    async def _gather(self, calls, max_workers=None):
+        """ Async version of :meth:`SwrveApi._gather`, calls are
+        coroutine functions limited by a semaphore
+        """
+
+        if max_workers is None:
+            max_workers = self._transport.pool_size
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(func, args, kwargs):
+            async with semaphore:
+                try:
+                    return await func(*args, **kwargs)
+                except SwrveApiException as e:
+                    return e
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e) or e.__class__.__name__
+                    return SwrveApiException(error, None, None, None)
+
+        keys = list(calls)
+        results = await asyncio.gather(*[run(*calls[k]) for k in keys])
+        return dict(zip(keys, results))
+
+    async def _get(self, url, params, event=None, **kwargs):
+        """ Async version of :meth:`SwrveApi._get`, the body is read by
+        the transport, so only `queue` and `retries` are written to the
+        event, `ttfb` and `download` aren't measured
+        """
+
+        return await self._request('get', url, params, event, **kwargs)
+
+    async def _request(self, method, url, params, event=None, **kwargs):
+        """ Async version of :meth:`SwrveApi._request` """
+
+        send = getattr(self._transport, method)
+        limiter = self._rate_limiter
+        if limiter is None:
+            return await send(url, params=params, **kwargs)
+
+        api_key = params.get('api_key') if params else None
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = limiter.reserve(api_key)
+            await asyncio.sleep(wait)
+            if event is not None:
+                event['queue'] += wait
+                event['retries'] = attempt
+
+            try:
+                res = await send(url, params=params, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                delay = limiter.retry_delay(api_key, None, None, attempt,
+                                            started)
+                if delay is None:
+                    raise
+            else:
+                delay = limiter.retry_delay(api_key, res.status,
+                                            res.headers.get('Retry-After'),
+                                            attempt, started)
+                if delay is None:
+                    return res
+                res.release()
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send_api_request(self, url, **kwargs):
+        """ Send GET request to Swrve API
+
+        :param url: [:class:`str`] url for request
+        :return: [:class:`dict`] request results
+        :raises SwrveApiException: if request status != 200
+        """
+
+        self._set_endpoint(url)
+        params = self._request_params(**kwargs)
+        if self._coalescer is None:
+            return await self._send(url, params)
+
+        key = request_key(url, params)
+        return await self._coalescer.fetch_async(
+            key, lambda: self._send(url, params)
+        )
+
+    async def stream_api_request(self, url, key=None, chunk_size=64*1024,
+                                 **kwargs):
+        """ Async version of :meth:`SwrveApi.stream_api_request`
+
+        :return: async generator of tuples (series, point)
+        """
+
+        self._set_endpoint(url)
+        params = self._request_params(**kwargs)
+        event = request_event(url) if self._hooks else None
+        started = time.perf_counter()
+        try:
+            res = await self._get(url, params, event, stream=True)
+            async with res:
+                if event is not None:
+                    event['status'] = res.status
+                if res.status != 200:
+                    raise await self._response_error(res, url, params)
+                chunks = res.content.iter_chunked(chunk_size)
+                if event is not None:
+                    chunks = self._count_bytes(chunks, event)
+                async for item in aiter_series(chunks, key):
+                    yield item
+        finally:
+            if event is not None:
+                event['total'] = time.perf_counter() - started
+                self._emit(event)
+
+    @staticmethod
+    async def _count_bytes(chunks, event):
+        """ Async version of :meth:`SwrveApi._count_bytes` """
+
+        event['bytes'] = 0
+        async for chunk in chunks:
+            event['bytes'] += len(chunk)
+            yield chunk
+
+    @staticmethod
+    async def _response_error(res, url, params):
+        """ Async version of :meth:`SwrveApi._response_error` """
+
+        try:
+            error = (await res.json(content_type=None))['error']
+        except ValueError:
+            error = None
+        return SwrveApiException(error, res.status, url, params)
+
+    async def _send(self, url, params):
+        """ Async version of :meth:`SwrveApi._send` """
+
+        if not self._hooks:
+            return await self._send_request(url, params)
+
+        event = request_event(url)
+        started = time.perf_counter()
+        try:
+            return await self._send_request(url, params, event)
+        finally:
+            event['total'] = time.perf_counter() - started
+            self._emit(event)
+
+    async def _send_request(self, url, params, event=None):
+        """ Async version of :meth:`SwrveApi._send_request` """
+
+        if self._cache is not None:
+            data = self._cache.get(url, params)
+            if data is not None:
+                if event is not None:
+                    event['cached'] = True
+                return data
+
+        res = await self._get(url, params, event)
+        if event is not None:
+            event['status'] = res.status
+            event['bytes'] = res.content_length
+
+        if res.status != 200:
+            raise await self._response_error(res, url, params)
+
+        started = time.perf_counter()
+        data = await res.json(content_type=None)
+        if event is not None:
+            event['decode'] = time.perf_counter() - started
+
+        if self._cache is not None:
+            self._cache.set(url, params, data)
+
+        return data
+
+
+class AsyncSwrveExportApi(AsyncSwrveApi, SwrveExportApi):
+    """ Async version of :class:`SwrveExportApi`, methods have the same
+    signatures and results
+    """
+
+    async def _send_series_request(self, url, **kwargs):
+        """ Async version of :meth:`SwrveExportApi._send_series_request`,
+        missing periods are requested concurrently
+        """
+
+        self._set_endpoint(url)
+        store = self._series_store
+        if store is None:
+            return await self._send_split_request(url, **kwargs)
+
+        params = self._request_params(**kwargs)
+        ranges = store.missing_ranges(url, params)
+        if ranges is None:
+            return await self._send_split_request(url, **kwargs)
+
+        responses = await asyncio.gather(*[
+            self._send_split_request(url, **dict(kwargs, start=start,
+                                                 stop=stop))
+            for start, stop in ranges
+        ])
+        return store.merge(url, params, ranges, responses)
+
+    async def _send_split_request(self, url, **kwargs):
+        """ Async version of :meth:`SwrveExportApi._send_split_request` """
+
+        splitter = self._splitter
+        ranges = None
+        if splitter is not None:
+            params = self._request_params(**kwargs)
+            ranges = splitter.split(url, params)
+        if not ranges:
+            res = await self.send_api_request(url, **kwargs)
+            if splitter is not None:
+                splitter.learn(url, params, [res])
+            return res
+
+        responses = []
+        if splitter.is_daily(url, params) is None:
+            # the first sub-range shows whether the series can be split
+            first = await self._send_range_request(url, ranges[0], **kwargs)
+            if splitter.learn(url, params, [first]) is False:
+                return await self.send_api_request(url, **kwargs)
+            responses, ranges = [first], ranges[1:]
+
+        calls = {rng: (self._send_range_request, (url, rng), kwargs)
+                 for rng in ranges}
+        results = await self._gather(calls, splitter.max_workers)
+        responses += self._split_responses(ranges, results)
+
+        merged = splitter.merge(responses)
+        if merged is None:
+            # the first sub-range had no points to learn granularity
+            splitter.learn(url, params, responses)
+            return await self.send_api_request(url, **kwargs)
+        return merged
+
+    async def _send_range_request(self, url, rng, **kwargs):
+        """ Async version of :meth:`SwrveExportApi._send_range_request` """
+
+        started = time.monotonic()
+        res = await self.send_api_request(url, **dict(kwargs, start=rng[0],
+                                                      stop=rng[1]))
+        self._observe_range(url, rng, time.monotonic() - started, kwargs)
+        return res
+
+    async def get_kpi(self, kpi, with_date=True, as_datetime=False,
+                      currency=None, segment=None, multiplier=None,
+                      output='list', **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_kpi` """
+
+        url = urljoin(self._api_url, 'kpi/%s.json' % kpi)
+        data = await self._send_series_request(url, currency=currency,
+                                               segment=segment, **kwargs)
+        return self._kpi_results(data, kpi, with_date, as_datetime,
+                                 multiplier, output)
+
+    async def iter_kpi(self, kpi, with_date=True, as_datetime=False,
+                       currency=None, segment=None, multiplier=None,
+                       **kwargs):
+        """ Async version of :meth:`SwrveExportApi.iter_kpi`, returns an
+        async generator
+        """
+
+        if kpi not in self.kpi_taxable:
+            multiplier = None
+
+        url = urljoin(self._api_url, 'kpi/%s.json' % kpi)
+        points = self.stream_api_request(url, currency=currency,
+                                         segment=segment, **kwargs)
+        async for series, point in points:
+            yield self._point(point, with_date, as_datetime, multiplier)
+
+    async def get_kpis(self, kpis, segments=None, currencies=None,
+                       max_workers=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_kpis` """
+
+        calls = self._kpis_calls(kpis, segments, currencies, kwargs)
+        return await self._gather(calls, max_workers)
+
+    async def get_kpi_dau(self, kpi, with_date=True, as_datetime=False,
+                          currency=None, segment=None, multiplier=None,
+                          output='list', **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_kpi_dau` """
+
+        dau = await self.get_kpi('dau', with_date, as_datetime, currency,
+                                 segment, multiplier, output, **kwargs)
+        values = await self.get_kpi(kpi, with_date, as_datetime, currency,
+                                    segment, multiplier, output, **kwargs)
+        return self._dau_results(dau, values)
+
+    async def get_evt(self, evt_name, with_date=True, as_datetime=False,
+                      segment=None, output='list', **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_evt` """
+
+        url = urljoin(self._api_url, 'event/count')
+        data = await self._send_series_request(url, name=evt_name,
+                                               segment=segment, **kwargs)
+        return self._series_results(data[0]['data'], with_date, as_datetime,
+                                    output)
+
+    async def iter_evt(self, evt_name, with_date=True, as_datetime=False,
+                       segment=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.iter_evt`, returns an
+        async generator
+        """
+
+        url = urljoin(self._api_url, 'event/count')
+        points = self.stream_api_request(url, name=evt_name, segment=segment,
+                                         **kwargs)
+        async for series, point in points:
+            yield self._point(point, with_date, as_datetime)
+
+    async def get_evt_dau(self, evt_name, with_date=True, as_datetime=False,
+                          segment=None, output='list', **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_evt_dau` """
+
+        dau = await self.get_kpi('dau', with_date, as_datetime,
+                                 segment=segment, output=output, **kwargs)
+        evt = await self.get_evt(evt_name, with_date, as_datetime, segment,
+                                 output, **kwargs)
+        return self._dau_results(dau, evt)
+
+    async def get_kpis_dau(self, kpis, with_date=True, as_datetime=False,
+                           currency=None, segment=None, multiplier=None,
+                           output='list', max_workers=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_kpis_dau` """
+
+        args = (with_date, as_datetime, currency, segment, multiplier, output)
+        calls = {('kpi', kpi): (self.get_kpi, (kpi,) + args, kwargs)
+                 for kpi in set(kpis) | {'dau'}}
+        data = await self._gather(calls, max_workers)
+        return self._bulk_dau_results(data, [('kpi', kpi) for kpi in kpis])
+
+    async def get_evts_dau(self, evt_names, with_date=True,
+                           as_datetime=False, segment=None, output='list',
+                           max_workers=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_evts_dau` """
+
+        calls = self._evts_dau_calls(evt_names, with_date, as_datetime,
+                                     segment, output, kwargs)
+        data = await self._gather(calls, max_workers)
+        return self._bulk_dau_results(data, [('evt', evt) for evt in
+                                             evt_names])
+
+    async def get_evt_lst(self):
+        """ Async version of :meth:`SwrveExportApi.get_evt_lst` """
+
+        url = urljoin(self._api_url, 'event/list')
+        return await self.send_api_request(url)
+
+    async def get_payload(self, evt_name, payload_key, with_date=True,
+                          as_datetime=False, default_struct=False,
+                          output='list', top=None):
+        """ Async version of :meth:`SwrveExportApi.get_payload` """
+
+        url = urljoin(self._api_url, 'event/payload')
+        data = await self.send_api_request(url, name=evt_name,
+                                           payload_key=payload_key)
+        return self._payload_results(data, with_date, as_datetime,
+                                     default_struct, output, top)
+
+    async def iter_payload(self, evt_name, payload_key, with_date=True,
+                           as_datetime=False):
+        """ Async version of :meth:`SwrveExportApi.iter_payload`, returns
+        an async generator
+        """
+
+        url = urljoin(self._api_url, 'event/payload')
+        points = self.stream_api_request(url, 'payload_value', name=evt_name,
+                                         payload_key=payload_key)
+        async for series, point in points:
+            yield (series['payload_value'],
+                   self._point(point, with_date, as_datetime))
+
+    async def get_payload_lst(self, evt_name):
+        """ Async version of :meth:`SwrveExportApi.get_payload_lst` """
+
+        url = urljoin(self._api_url, 'event/payloads')
+        return await self.send_api_request(url, name=evt_name)
+
+    async def get_event_breakdown(self, evt_name, payload_keys=None,
+                                  with_date=True, as_datetime=False,
+                                  output='list', max_workers=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_event_breakdown` """
+
+        calls = self._breakdown_calls(evt_name, payload_keys, with_date,
+                                      as_datetime, output, kwargs)
+        data = await self._gather(calls, max_workers)
+        if payload_keys is None:
+            payload_keys = self._breakdown_keys(data)
+            calls = self._breakdown_calls(evt_name, payload_keys, with_date,
+                                          as_datetime, output, kwargs,
+                                          count=False)
+            data.update(await self._gather(calls, max_workers))
+
+        return self._breakdown_results(evt_name, payload_keys, data)
+
+    async def get_user_cohorts(self, cohort_type='retention',
+                               as_datetime=False, segment=None):
+        """ Async version of :meth:`SwrveExportApi.get_user_cohorts` """
+
+        url = urljoin(self._api_url, 'cohorts/daily')
+        data = await self.send_api_request(url, cohort_type=cohort_type,
+                                           segment=segment)
+        return self._cohorts_results(data, as_datetime)
+
+    async def get_cohort_matrix(self, cohort_type='retention',
+                                segment=None):
+        """ Async version of :meth:`SwrveExportApi.get_cohort_matrix` """
+
+        url = urljoin(self._api_url, 'cohorts/daily')
+        data = await self.send_api_request(url, cohort_type=cohort_type,
+                                           segment=segment)
+        return self._cohort_matrix_results(data)
+
+    async def get_cohort_matrices(self, cohort_types=None, segments=None,
+                                  base=None, max_workers=None):
+        """ Async version of :meth:`SwrveExportApi.get_cohort_matrices` """
+
+        calls = self._cohorts_calls(cohort_types, segments)
+        results = await self._gather(calls, max_workers)
+        return self._merge_cohorts(results, base)
+
+    async def get_report(self, report, max_workers=None):
+        """ Async version of :meth:`SwrveExportApi.get_report` """
+
+        calls = self._report_lists_calls(report)
+        lists = await self._gather(calls, max_workers)
+        plan = self._report_plan(report, lists)
+        calls = self._report_calls(report, plan)
+        data = await self._gather(calls, max_workers)
+        return self._report_results(plan, data)
+
+    async def get_item_sales(self, uid=None, tag=None, as_datetime=False,
+                             currency=None, segment=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_item_sales` """
+
+        url = urljoin(self._api_url, 'item/sales')
+        results = await self._send_series_request(url, uid=uid, tag=tag,
+                                                  currency=currency,
+                                                  segment=segment, **kwargs)
+        return self._items_results(results, as_datetime)
+
+    async def get_item_revenue(self, uid=None, tag=None, as_datetime=False,
+                               currency=None, segment=None, **kwargs):
+        """ Async version of :meth:`SwrveExportApi.get_item_revenue` """
+
+        url = urljoin(self._api_url, 'item/revenue')
+        results = await self._send_series_request(url, uid=uid, tag=tag,
+                                                  currency=currency,
+                                                  segment=segment, **kwargs)
+        return self._items_results(results, as_datetime)
+
+    async def _iter_items(self, url, uid, tag, as_datetime, currency,
+                          segment, kwargs):
+        """ Async version of :meth:`SwrveExportApi._iter_items`, so
+        `iter_item_sales` and `iter_item_revenue` return async generators
+        """
+
+        points = self.stream_api_request(url, uid=uid, tag=tag,
+                                         currency=currency, segment=segment,
+                                         **kwargs)
+        async for series, point in points:
+            yield series, self._point(point, True, as_datetime)
+
+    async def get_item_tag(self, tag):
+        """ Async version of :meth:`SwrveExportApi.get_item_tag` """
+
+        url = urljoin(self._api_url, 'item/tag')
+        return await self.send_api_request(url, tag=tag)
+
+    async def get_segment_lst(self):
+        """ Async version of :meth:`SwrveExportApi.get_segment_lst` """
+
+        url = urljoin(self._api_url, 'segment/list')
+        return await self.send_api_request(url)
+
+
+class AsyncSwrveUserdbApi(AsyncSwrveApi, SwrveUserdbApi):
+    """ Async version of :class:`SwrveUserdbApi` """
+
+    async def get_urls(self):
+        """ Async version of :meth:`SwrveUserdbApi.get_urls` """
+
+        return await self.send_api_request(self._api_url)
+
+    async def download(self, path, urls=None, max_workers=None,
+                       chunk_size=1024*1024):
+        """ Async version of :meth:`SwrveUserdbApi.download` """
+
+        if urls is None:
+            urls = await self.get_urls()
+
+        calls = self._download_calls(path, urls, chunk_size)
+        started = time.monotonic()
+        results = await self._gather(calls, max_workers)
+        return self._download_report(results, time.monotonic() - started)
+
+    async def _download_file(self, url, path, chunk_size, manifest):
+        """ Async version of :meth:`SwrveUserdbApi._download_file` """
+
+        download = _FileDownload(url, path, manifest)
+        try:
+            res = await self._request('head', url, None,
+                                      allow_redirects=True)
+            if res.status != 200:
+                res = await self._get(url, None,
+                                      headers=download.probe_headers,
+                                      stream=True)
+                res.close()
+            if not download.check(res.status, res.headers):
+                return download.file_path, 0
+
+            res = await self._get(url, None, headers=download.headers,
+                                  stream=True)
+            async with res:
+                with download.open(res.status) as f:
+                    async for chunk in res.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                        download.transferred += len(chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise SwrveApiException(str(e), None, url, None) from e
+
+        return download.done()
+
+
+class AsyncSwrveItemsApi(AsyncSwrveApi, SwrveItemsApi):
+    """ Async version of :class:`SwrveItemsApi` """
+
+    async def send_post_request(self, url, uid=None, data=None):
+        """ Async version of :meth:`SwrveItemsApi.send_post_request` """
+
+        params = self._post_params(uid, data)
+        if self._rate_limiter is not None:
+            await asyncio.sleep(self._rate_limiter.reserve(params['api_key']))
+
+        res = await self._transport.post(url, data=params)
+        try:
+            results = await res.json(content_type=None)
+        except ValueError:
+            results = None
+
+        if res.status != 200:
+            error = results.get('error') if isinstance(results, dict) \
+                else None
+            raise SwrveApiException(error, res.status, url, {'item': uid})
+
+        return results
+
+    async def get_item_lst(self):
+        """ Async version of :meth:`SwrveItemsApi.get_item_lst` """
+
+        return await self.send_api_request(self._api_url)
+
+    async def get_item_attrs(self, uid):
+        """ Async version of :meth:`SwrveItemsApi.get_item_attrs` """
+
+        return await self.send_api_request(self._api_url, item=uid)
+
+    def iter_items_attrs(self, uids, max_workers=None):
+        """ Async version of :meth:`SwrveItemsApi.iter_items_attrs`,
+        returns an async generator
+        """
+
+        args = ((uid,) for uid in uids)
+        return self._iter_completed(self._item_attrs, args, max_workers)
+
+    async def get_items_attrs(self, uids, path=None, max_workers=None):
+        """ Async version of :meth:`SwrveItemsApi.get_items_attrs` """
+
+        results = self.iter_items_attrs(uids, max_workers)
+        if path is None:
+            return {uid: attrs async for uid, attrs in results}
+
+        report = {'written': 0, 'failed': {}}
+        with open(path, 'w') as f:
+            async for uid, attrs in results:
+                self._write_attrs(f, report, uid, attrs)
+        return report
+
+    async def _item_attrs(self, uid):
+        """ Async version of :meth:`SwrveItemsApi._item_attrs` """
+
+        try:
+            return uid, await self.get_item_attrs(uid)
+        except SwrveApiException as e:
+            return uid, e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = str(e) or e.__class__.__name__
+            return uid, SwrveApiException(error, None, self._api_url,
+                                          {'item': uid})
+
+    async def _iter_completed(self, func, args_iter, max_workers=None):
+        """ Async version of :meth:`SwrveItemsApi._iter_completed`, `func`
+        is a coroutine function
+        """
+
+        if max_workers is None:
+            max_workers = self._transport.pool_size
+
+        pending = set()
+        try:
+            for args in args_iter:
+                if len(pending) >= max_workers:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.ensure_future(func(*args)))
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def create_item(self, uid, data=None):
+        """ Async version of :meth:`SwrveItemsApi.create_item` """
+
+        await self.send_post_request(self._api_url, uid, data)
+
+    async def create_items(self, data=None):
+        """ Async version of :meth:`SwrveItemsApi.create_items` """
+
+        await self.send_post_request(self._api_url + '_bulk', data=data)
+
+    async def upload_items(self, items, max_bytes=512*1024,
+                           max_workers=None):
+        """ Async version of :meth:`SwrveItemsApi.upload_items` """
+
+        report = {'succeeded': [], 'failed': {}, 'chunks': 0}
+        chunks = ((chunk,) for chunk in self._item_chunks(items, max_bytes))
+        async for uids, error in self._iter_completed(self._upload_chunk,
+                                                      chunks, max_workers):
+            report['chunks'] += 1
+            self._add_chunk_result(report, uids, error)
+
+        return report
+
+    async def _upload_chunk(self, chunk):
+        """ Async version of :meth:`SwrveItemsApi._upload_chunk` """
+
+        try:
+            await self.send_post_request(self._api_url + '_bulk', data=chunk)
+        except (SwrveApiException, aiohttp.ClientError,
+                asyncio.TimeoutError) as e:
+            return list(chunk), e
+        return list(chunk), None
+
+    async def sync_items(self, desired, index_path=None, dry_run=False,
+                         max_bytes=512*1024, max_workers=None):
+        """ Async version of :meth:`SwrveItemsApi.sync_items` """
+
+        index = _ItemIndex(index_path)
+        current = await self.get_item_lst()
+        diff = self._items_diff(desired, current, index)
+        if dry_run:
+            diff['upload'] = None
+            return diff
+
+        changed = ((uid, desired[uid])
+                   for uid in diff['create'] + diff['update'])
+        upload = await self.upload_items(changed, max_bytes, max_workers)
+        return self._sync_report(desired, diff, upload, index)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import os.path
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import date
+from urllib.parse import urlsplit
+
+
+hidden_params = ('api_key', 'personal_key')
+
+
+def endpoint_name(url):
+    """ Name of endpoint without host, query string and credentials,
+    e.g. `exporter/kpi/dau.json`
+
+    :param url: [:class:`str`] request url
+    :return: [:class:`str`]
+    """
+
+    path = urlsplit(url).path
+    return path.split('/api/1/', 1)[-1]
+
+
+def request_key(url, params, skip=()):
+    """ Create a key for the request, credentials are hashed
+
+    :param url: [:class:`str`] request url
+    :param params: [:class:`dict`] request params
+    :param skip: [:class:`tuple`] params not included in the key
+    :return: [:class:`str`] sha256 hex digest
+    """
+
+    items = []
+    for k in sorted(params):
+        if k in skip:
+            continue
+        val = str(params[k])
+        if k in hidden_params:
+            val = hashlib.sha256(val.encode('utf-8')).hexdigest()
+        items.append([k, val])
+
+    raw = json.dumps([url, items])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SwrveCache:
+    """ Persistent on-disk cache for Swrve API responses based on SQLite
+
+    Entries are keyed by url and request params, `api_key` and
+    `personal_key` are stored only as hashes. Responses for periods that
+    are already over never change, so they are stored without expiration,
+    other responses live `ttl` seconds. When the total size of stored
+    responses is bigger than `max_size` the least recently used entries
+    are evicted.
+    """
+
+    default_path = os.path.join(os.path.expanduser('~'), '.pyswrve_cache')
+
+    # endpoint: ttl in seconds, 0 means the endpoint isn't cached
+    endpoint_ttls = {
+        'event/list': 3600,
+        'event/payloads': 3600,
+        'segment/list': 3600,
+        'item/tag': 3600,
+        'userdbs.json': 0,
+        'items': 0
+    }
+
+    def __init__(self, path=None, max_size=256*1024*1024, ttl=300,
+                 endpoint_ttls=None):
+        """ __init__
+
+        :param path: [:class:`str`] path to SQLite database file, default
+            is `$HOME/.pyswrve_cache`
+        :param max_size: [:class:`int`] max total size of stored
+            responses in bytes
+        :param ttl: [:class:`int`] ttl in seconds for responses which
+            can still change, like stats for today
+        :param endpoint_ttls: [:class:`dict`] overrides ttls for endpoints
+            like `event/list` or `kpi/`, a key matches endpoint names
+            starting with it
+        """
+
+        if path is None:
+            path = self.default_path
+
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.endpoint_ttls = dict(self.endpoint_ttls)
+        if endpoint_ttls is not None:
+            self.endpoint_ttls.update(endpoint_ttls)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed '
+            'ON responses (accessed)'
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def endpoint(url):
+        """ Get endpoint name from request url
+
+        :param url: [:class:`str`] request url
+        :return: [:class:`str`] endpoint name like `kpi/dau.json`
+        """
+
+        path = endpoint_name(url)
+        if path.startswith('exporter/'):
+            path = path[len('exporter/'):]
+        return path
+
+    def make_key(self, url, params):
+        """ Create cache key from url and request params
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :return: [:class:`str`] sha256 hex digest
+        """
+
+        return request_key(url, params)
+
+    def get_ttl(self, endpoint, params):
+        """ Get ttl for the request
+
+        :param endpoint: [:class:`str`] endpoint name
+        :param params: [:class:`dict`] request params
+        :return: [:class:`int`] ttl in seconds, None means the response
+            never expires, 0 means the response isn't cached
+        """
+
+        for key in self.endpoint_ttls:
+            if endpoint == key or endpoint.startswith(key.rstrip('/') + '/'):
+                return self.endpoint_ttls[key]
+
+        stop = params.get('stop')
+        if stop and str(stop)[:10] < date.today().isoformat():
+            return None
+
+        return self.ttl
+
+    def get(self, url, params):
+        """ Get cached response
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :return: decoded response or None if there is no fresh response
+            in the cache
+        """
+
+        key = self.make_key(url, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, expires FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is not None and row[1] is not None and row[1] <= now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?',
+                                   (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                'UPDATE responses SET accessed = ? WHERE key = ?', (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, url, params, data):
+        """ Store response in the cache
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :param data: decoded response
+        """
+
+        endpoint = self.endpoint(url)
+        ttl = self.get_ttl(endpoint, params)
+        if ttl == 0:
+            return
+
+        raw = json.dumps(data)
+        size = len(raw)
+        if size > self.max_size:
+            return
+
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        key = self.make_key(url, params)
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, endpoint, data, size, expires, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, raw, size, expires, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """ Delete least recently used responses until total size fits
+        `max_size`, must be called with the lock acquired
+        """
+
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        rows = self._conn.execute(
+            'SELECT key, size FROM responses ORDER BY accessed'
+        ).fetchall()
+        keys = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            keys.append((key,))
+            total -= size
+
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', keys)
+
+    def stats(self):
+        """ Get cache stats
+
+        :return: [:class:`dict`] hits, misses, count of entries and total
+            size of stored responses
+        """
+
+        with self._lock:
+            count, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count,
+                'size': size}
+
+    def clear(self):
+        """ Delete all cached responses """
+
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def close(self):
+        """ Close the database connection """
+
+        self._conn.close()
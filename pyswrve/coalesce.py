@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_missing = object()
+
+
+def _copy(data):
+    """ Copy parsed JSON, it's faster than `copy.deepcopy` """
+
+    if isinstance(data, list):
+        return [_copy(item) for item in data]
+    if isinstance(data, dict):
+        return {key: _copy(value) for key, value in data.items()}
+    return data
+
+
+class SwrveCoalescer:
+    """ Deduplication of identical requests
+
+    Identical requests sent concurrently share one HTTP round trip, and
+    a response is reused by identical requests sent within `window`
+    seconds after it was received. Every caller gets its own copy of the
+    parsed response, so results can be modified in place.
+    """
+
+    def __init__(self, window=5):
+        """ __init__
+
+        :param window: [:class:`float`] seconds a response is reused,
+            0 means only concurrent requests are deduplicated
+        """
+
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._pending = {}
+        self._async_pending = {}
+
+    def _recent(self, key, now):
+        """ Get a recent response, must be called with the lock acquired """
+
+        while self._results:
+            oldest = next(iter(self._results))
+            if self._results[oldest][0] > now:
+                break
+            del self._results[oldest]
+
+        item = self._results.get(key)
+        return _missing if item is None else item[1]
+
+    def _done(self, key, data):
+        """ Store a response, must be called with the lock acquired """
+
+        if self.window:
+            self._results.pop(key, None)
+            self._results[key] = (time.monotonic() + self.window, data)
+
+    def fetch(self, key, func):
+        """ Get response for the request key, `func` is called only if
+        there is no identical request in flight or a recent response
+
+        :param key: [:class:`str`] request key
+        :param func: a function sending the request
+        :return: the response
+        """
+
+        with self._lock:
+            data = self._recent(key, time.monotonic())
+            if data is not _missing:
+                self.hits += 1
+                return _copy(data)
+
+            future = self._pending.get(key)
+            if future is not None:
+                self.hits += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self._pending[key] = Future()
+                owner = True
+
+        if not owner:
+            return _copy(future.result())
+
+        try:
+            data = func()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self._done(key, data)
+        future.set_result(data)
+        return _copy(data)
+
+    async def fetch_async(self, key, coro_func):
+        """ Async version of :meth:`fetch`
+
+        :param key: [:class:`str`] request key
+        :param coro_func: a coroutine function sending the request
+        :return: the response
+        """
+
+        with self._lock:
+            data = self._recent(key, time.monotonic())
+            if data is not _missing:
+                self.hits += 1
+                return _copy(data)
+
+            future = self._async_pending.get(key)
+            if future is not None:
+                self.hits += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = asyncio.get_running_loop().create_future()
+                self._async_pending[key] = future
+                owner = True
+
+        if not owner:
+            return _copy(await asyncio.shield(future))
+
+        try:
+            data = await coro_func()
+        except BaseException as e:
+            with self._lock:
+                del self._async_pending[key]
+            future.set_exception(e)
+            # the exception is raised here, waiters retrieve it from future
+            future.exception()
+            raise
+
+        with self._lock:
+            del self._async_pending[key]
+            self._done(key, data)
+        future.set_result(data)
+        return _copy(data)
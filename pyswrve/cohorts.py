@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# keys with size of cohort in cohort dicts
+size_keys = ('users', 'cohort_size', 'size')
+_day_key = re.compile(r'^\D*(\d+)$')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for cohort matrices')
+
+
+def cohort_days(cohort):
+    """ Get values of one cohort by day offsets, values are read from
+    nested `data` dict if it exists, keys like `3` or `day_3` are offsets
+
+    :param cohort: [:class:`dict`] one cohort of `get_user_cohorts`
+    :return: [:class:`dict`] keys are ints, values are floats
+    """
+
+    days = cohort.get('data', cohort)
+    if not isinstance(days, dict):
+        return {}
+
+    results = {}
+    for key, value in days.items():
+        match = _day_key.match(str(key))
+        if match is not None and isinstance(value, (int, float)):
+            results[int(match.group(1))] = value
+    return results
+
+
+def cohort_size(cohort):
+    for key in size_keys:
+        if key in cohort:
+            return cohort[key]
+    return None
+
+
+class CohortMatrix:
+    """ Dense cohorts data: `values` is `float64` array with shape
+    (count of cohorts, count of day offsets), row `i` is the cohort of
+    `dates[i]` and column `n` is day N, unknown values are NaN. `sizes`
+    are counts of users in cohorts, NaN if they are unknown.
+    """
+
+    def __init__(self, dates, values, sizes):
+        """ __init__
+
+        :param dates: `numpy.datetime64` array of cohorts dates, sorted
+        :param values: `float64` array of values
+        :param sizes: `float64` array of cohorts sizes
+        """
+
+        self.dates = dates
+        self.values = values
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return '<CohortMatrix %d cohorts x %d days>' % self.values.shape
+
+    @classmethod
+    def from_response(cls, data):
+        """ Create matrix from Export API cohorts response
+
+        :param data: [:class:`list`] raw `cohorts/daily` response
+        :return: :class:`CohortMatrix`
+        """
+
+        _require_numpy()
+        cohorts = data[0]['data'] if data else {}
+        keys = sorted(cohorts)
+        rows = [cohort_days(cohorts[key]) for key in keys]
+        width = max((max(row) + 1 for row in rows if row), default=0)
+
+        values = np.full((len(keys), width), np.nan)
+        for idx, row in enumerate(rows):
+            if row:
+                values[idx, list(row)] = list(row.values())
+
+        sizes = np.array([cohort_size(cohorts[key]) for key in keys],
+                         dtype='float64')
+        dates = np.array(keys, dtype='datetime64[D]')
+        return cls(dates, values, sizes)
+
+    def day(self, offset):
+        """ Values of all cohorts for the day offset
+
+        :param offset: [:class:`int`] day offset
+        :return: `float64` array
+        """
+
+        if offset >= self.values.shape[1]:
+            return np.full(len(self), np.nan)
+        return self.values[:, offset]
+
+    def weighted_mean(self, weights=None):
+        """ Mean of cohorts for every day offset, weighted by cohorts
+        sizes by default, unknown values are skipped
+
+        :param weights: `float64` array of weights of cohorts
+        :return: `float64` array, NaN for days without values
+        """
+
+        if weights is None:
+            weights = self.sizes
+        weights = np.where(np.isnan(weights), 0, weights)
+        if not weights.any():
+            weights = np.ones(len(self))
+
+        known = ~np.isnan(self.values)
+        total = np.where(known, self.values, 0).T @ weights
+        weight = known.T @ weights
+        return np.divide(total, weight, out=np.full(len(total), np.nan),
+                         where=weight != 0)
+
+    def update(self, other):
+        """ Merge newer data, new cohorts are added and known values of
+        `other` replace values of existing cohorts
+
+        :param other: :class:`CohortMatrix` with newer data
+        :return: new :class:`CohortMatrix`
+        """
+
+        dates = np.union1d(self.dates, other.dates)
+        width = max(self.values.shape[1], other.values.shape[1])
+        values = np.full((len(dates), width), np.nan)
+        sizes = np.full(len(dates), np.nan)
+
+        for matrix in (self, other):
+            rows = np.searchsorted(dates, matrix.dates)
+            block = values[rows, :matrix.values.shape[1]]
+            known = ~np.isnan(matrix.values)
+            block[known] = matrix.values[known]
+            values[rows, :matrix.values.shape[1]] = block
+
+            known = ~np.isnan(matrix.sizes)
+            sizes[rows[known]] = matrix.sizes[known]
+
+        return CohortMatrix(dates, values, sizes)
+
+    def save(self, path):
+        """ Save matrix to `.npz` file
+
+        :param path: [:class:`str`] path to file
+        """
+
+        with open(path, 'wb') as f:
+            np.savez(f, dates=self.dates, values=self.values,
+                     sizes=self.sizes)
+
+    @classmethod
+    def load(cls, path):
+        """ Load matrix saved by :meth:`save`
+
+        :param path: [:class:`str`] path to file
+        :return: :class:`CohortMatrix`
+        """
+
+        _require_numpy()
+        with np.load(path) as data:
+            return cls(data['dates'], data['values'], data['sizes'])
@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import time
 from urllib.parse import urljoin
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from .api import SwrveApi
+from .exceptions import SwrveApiException
+from .arrays import SeriesArray, series_array, divide_series
+from .timeline import parse_date, parse_timeline, parse_days
+from .pivot import top_payloads, merge_rows, pivot_dense, pivot_sparse
+from .metrics import shaping
+from .cohorts import CohortMatrix
+from .report import SwrveReport, report_costs
 
 
 class SwrveExportApi(SwrveApi):
@@ -27,6 +35,8 @@ class SwrveExportApi(SwrveApi):
     kpi_taxable = {'dollar_revenue', 'arpu_daily', 'arppu_daily',
                    'arpu_monthly', 'arppu_monthly'}
     period_lens = {'day': 1, 'week': 7, 'month': 30, 'year': 360}
+    cohort_types = ('retention', 'avg_sessions', 'avg_playtime',
+                    'avg_revenue', 'total_revenue')
 
     date_formats = {
         'DH-': '%Y-%m-%d-%H',
@@ -38,7 +48,9 @@ class SwrveExportApi(SwrveApi):
     }
 
     def __init__(self, region='us', api_key=None, personal_key=None,
-                 section=None, conf_path=None):
+                 section=None, conf_path=None, transport=None,
+                 cache=None, series_store=None, rate_limiter=None,
+                 coalescer=None, hooks=None, splitter=None):
         """ __init__
 
         :param region: [:class:`str`] us or eu region, it defines domain
@@ -52,10 +64,31 @@ class SwrveExportApi(SwrveApi):
             config sections
         :param conf_path: [:class:`str`] arg overrides default path to
             config file with entered
+        :param transport: [:class:`SwrveTransport`] transport for sending
+            requests, pass one transport to several api objects to share
+            the pool of connections
+        :param cache: [:class:`SwrveCache`] opt-in cache for responses
+        :param series_store: [:class:`SwrveSeriesStore`] opt-in store of
+            known days, with the store `get_kpi`, `get_evt`,
+            `get_item_sales` and `get_item_revenue` request only days
+            missing in the store
+        :param rate_limiter: [:class:`SwrveRateLimiter`] opt-in rate
+            limiter and retry scheduler
+        :param coalescer: [:class:`SwrveCoalescer`] opt-in deduplication
+            of identical requests
+        :param hooks: [:class:`list`] opt-in callables receiving events
+            with timings of every request, e.g. :class:`SwrveMetrics`
+        :param splitter: [:class:`SwrveSplitter`] opt-in splitting of long
+            periods of `get_kpi`, `get_evt`, `get_item_sales` and
+            `get_item_revenue` into sub-ranges requested concurrently
         """
 
-        super().__init__(region, api_key, personal_key, section, conf_path)
+        super().__init__(region, api_key, personal_key, section, conf_path,
+                         transport, cache, rate_limiter, coalescer,
+                         hooks)
         self._api_url = urljoin(self._api_url, 'exporter/')
+        self._series_store = series_store
+        self._splitter = splitter
 
     def set_dates(self, start=None, stop=None, period=None, period_len=None):
         """ Set start and stop or history params
@@ -72,7 +105,7 @@ class SwrveExportApi(SwrveApi):
             if period_len is None:
                 period_len = 1
             stop = datetime.today()
-            days = period_len * self.period_lens(period)
+            days = period_len * self.period_lens[period]
             start = stop - timedelta(days=days)
 
         if isinstance(start, datetime):
@@ -83,6 +116,96 @@ class SwrveExportApi(SwrveApi):
         self.set_param('start', start)
         self.set_param('stop', stop)
 
+    def _send_series_request(self, url, **kwargs):
+        """ Send request for time series, with the series store only
+        days missing in the store are requested
+
+        :param url: [:class:`str`] url for request
+        :return: [:class:`list`] request results
+        """
+
+        self._set_endpoint(url)
+        store = self._series_store
+        if store is None:
+            return self._send_split_request(url, **kwargs)
+
+        params = self._request_params(**kwargs)
+        ranges = store.missing_ranges(url, params)
+        if ranges is None:
+            return self._send_split_request(url, **kwargs)
+
+        responses = [
+            self._send_split_request(url, **dict(kwargs, start=start,
+                                                 stop=stop))
+            for start, stop in ranges
+        ]
+        return store.merge(url, params, ranges, responses)
+
+    def _send_split_request(self, url, **kwargs):
+        """ Send request for time series, with the splitter long periods
+        are requested by sub-ranges concurrently and stitched
+
+        :param url: [:class:`str`] url for request
+        :return: [:class:`list`] request results
+        :raises SwrveApiException: if any sub-range request has failed
+        """
+
+        splitter = self._splitter
+        ranges = None
+        if splitter is not None:
+            params = self._request_params(**kwargs)
+            ranges = splitter.split(url, params)
+        if not ranges:
+            res = self.send_api_request(url, **kwargs)
+            if splitter is not None:
+                splitter.learn(url, params, [res])
+            return res
+
+        responses = []
+        if splitter.is_daily(url, params) is None:
+            # the first sub-range shows whether the series can be split
+            first = self._send_range_request(url, ranges[0], **kwargs)
+            if splitter.learn(url, params, [first]) is False:
+                return self.send_api_request(url, **kwargs)
+            responses, ranges = [first], ranges[1:]
+
+        calls = {rng: (self._send_range_request, (url, rng), kwargs)
+                 for rng in ranges}
+        results = self._gather(calls, splitter.max_workers)
+        responses += self._split_responses(ranges, results)
+
+        merged = splitter.merge(responses)
+        if merged is None:
+            # the first sub-range had no points to learn granularity
+            splitter.learn(url, params, responses)
+            return self.send_api_request(url, **kwargs)
+        return merged
+
+    def _send_range_request(self, url, rng, **kwargs):
+        """ Request one sub-range and pass its latency to the splitter """
+
+        started = time.monotonic()
+        res = self.send_api_request(url, **dict(kwargs, start=rng[0],
+                                                stop=rng[1]))
+        self._observe_range(url, rng, time.monotonic() - started, kwargs)
+        return res
+
+    def _observe_range(self, url, rng, seconds, kwargs):
+        days = (date.fromisoformat(rng[1]) - date.fromisoformat(rng[0]))
+        self._splitter.observe(url, days.days + 1, seconds,
+                               self._request_params(**kwargs))
+
+    @staticmethod
+    def _split_responses(ranges, results):
+        """ Get responses in order of sub-ranges, the first error is
+        raised
+        """
+
+        for rng in ranges:
+            if isinstance(results[rng], SwrveApiException):
+                raise results[rng]
+        return [results[rng] for rng in ranges]
+
     def to_datetime(self, date_str):
         """ Create `datetime` object from string with specified format
 
@@ -90,16 +213,19 @@ class SwrveExportApi(SwrveApi):
         :return: `datetime` object
         """
 
-        for fmt_key in self.date_formats:
-            if date_str.startswith(fmt_key):
-                fmt = self.date_formats[fmt_key]
-                date_part = date_str.split(fmt_key)[1]
-                break
+        return parse_date(date_str)
 
-        return datetime.strptime(date_part, fmt)
+    @staticmethod
+    def _with_datetime(points):
+        """ Convert dates of [date, value] pairs to `datetime` objects by
+        one batch
+        """
+
+        dates = parse_timeline([i[0] for i in points])
+        return [[d, i[1]] for d, i in zip(dates, points)]
 
     def get_kpi(self, kpi, with_date=True, as_datetime=False, currency=None,
-                segment=None, multiplier=None, **kwargs):
+                segment=None, multiplier=None, output='list', **kwargs):
         """ Request the kpi stats
 
         :param kpi: [:class:`str`] the kpi's name, one from
@@ -117,27 +243,125 @@ class SwrveExportApi(SwrveApi):
         :param multiplier: [:class:`float`] revenue multiplier like in Swrve
             Dashboard - Setup - Report Settings - Reporting Revenue,
             it applies to revenue, arpu and arppu
+        :param output: [:class:`str`] `list` or `array`, with `array`
+            the result is :class:`SeriesArray` with numpy arrays of dates
+            and values, `with_date` and `as_datetime` are ignored
         :return: [:class:`list`] a list of lists with dates and values or
             a list of values, it depends on with_date arg
         """
 
         url = urljoin(self._api_url, 'kpi/%s.json' % kpi)
-        data = self.send_api_request(url, currency=currency, segment=segment,
-                                     **kwargs)
+        data = self._send_series_request(url, currency=currency,
+                                         segment=segment, **kwargs)
+        return self._kpi_results(data, kpi, with_date, as_datetime,
+                                 multiplier, output)
+
+    @shaping
+    def _kpi_results(self, data, kpi, with_date, as_datetime, multiplier,
+                     output='list'):
+        """ Shape raw kpi response, shared by sync and async apis """
+
         results = data[0]['data']
+        if kpi not in self.kpi_taxable:
+            multiplier = None
 
-        if multiplier is not None and kpi in self.kpi_taxable:
+        if output == 'array':
+            return series_array(results, multiplier)
+
+        if multiplier is not None:
             results = [[i[0], i[1]*multiplier] for i in results]
 
+        return self._series_results(results, with_date, as_datetime, output)
+
+    @staticmethod
+    def _check_output(output):
+        if output not in ('list', 'array'):
+            raise ValueError('output must be list or array, not %s' % output)
+
+    @shaping
+    def _series_results(self, results, with_date, as_datetime,
+                        output='list'):
+        """ Apply `with_date` and `as_datetime` to a series of
+        [date, value] pairs
+        """
+
+        self._check_output(output)
+        if output == 'array':
+            return series_array(results)
+
         if not with_date:
             results = [i[1] for i in results]
         elif as_datetime:
-            results = [[self.to_datetime(i[0]), i[1]] for i in results]
+            results = self._with_datetime(results)
 
         return results
 
+    def get_kpis(self, kpis, segments=None, currencies=None,
+                 max_workers=None, **kwargs):
+        """ Request stats for many kpis, segments and currencies
+        concurrently
+
+        :param kpis: [:class:`list`] kpis names, from
+            `SwrveExportApi.kpi_factors`
+        :param segments: [:class:`list`] segments names, None in the list
+            means stats for all users
+        :param currencies: [:class:`list`] in-project currencies
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :param kwargs: other args of `get_kpi` like `with_date`,
+            `as_datetime` or `multiplier`
+        :return: [:class:`dict`] keys are tuples (kpi, segment, currency),
+            values are `get_kpi` results or `SwrveApiException` if the
+            request has failed
+        """
+
+        calls = self._kpis_calls(kpis, segments, currencies, kwargs)
+        return self._gather(calls, max_workers)
+
+    def _kpis_calls(self, kpis, segments, currencies, kwargs):
+        """ Create calls of `get_kpi` for every combination of kpi,
+        segment and currency
+        """
+
+        calls = {}
+        for kpi in kpis:
+            for segment in segments or [None]:
+                for currency in currencies or [None]:
+                    call_kwargs = dict(kwargs, segment=segment,
+                                       currency=currency)
+                    calls[(kpi, segment, currency)] = (self.get_kpi, (kpi,),
+                                                       call_kwargs)
+        return calls
+
+    def iter_kpi(self, kpi, with_date=True, as_datetime=False,
+                 currency=None, segment=None, multiplier=None, **kwargs):
+        """ Request the kpi stats and yield values as the response is
+        decoded, args are the same as in `get_kpi`
+
+        :return: generator of [date, value] pairs or values
+        """
+
+        if kpi not in self.kpi_taxable:
+            multiplier = None
+
+        url = urljoin(self._api_url, 'kpi/%s.json' % kpi)
+        points = self.stream_api_request(url, currency=currency,
+                                         segment=segment, **kwargs)
+        for series, point in points:
+            yield self._point(point, with_date, as_datetime, multiplier)
+
+    @staticmethod
+    def _point(point, with_date, as_datetime, multiplier=None):
+        """ Shape one [date, value] pair of a streamed response """
+
+        value = point[1] if multiplier is None else point[1]*multiplier
+        if not with_date:
+            return value
+        return [parse_date(point[0]) if as_datetime else point[0], value]
+
     def get_kpi_dau(self, kpi, with_date=True, as_datetime=False,
-                    currency=None, segment=None, multiplier=None, **kwargs):
+                    currency=None, segment=None, multiplier=None,
+                    output='list', **kwargs):
         """" Request the kpi stats and divide every value with DAU
 
         :param kpi: [:class:`str`] the kpi's name, one from
@@ -155,6 +379,9 @@ class SwrveExportApi(SwrveApi):
         :param multiplier: [:class:`float`] revenue multiplier like in Swrve
             Dashboard - Setup - Report Settings - Reporting Revenue,
             it applies to revenue, arpu and arppu
+        :param output: [:class:`str`] `list` or `array`, with `array`
+            the result is :class:`SeriesArray` with numpy arrays of dates
+            and values, `with_date` and `as_datetime` are ignored
         :return: [:class:`list`] a list of lists with dates and values or
             a list of values, it depends on with_date arg
         """
@@ -162,28 +389,37 @@ class SwrveExportApi(SwrveApi):
         data = {}
         for k in ('dau', kpi):
             data[k] = self.get_kpi(k, with_date, as_datetime, currency,
-                                   segment, multiplier, **kwargs)
+                                   segment, multiplier, output, **kwargs)
+
+        return self._dau_results(data['dau'], data[kpi])
+
+    @shaping
+    def _dau_results(self, dau, values):
+        """ Divide every value of the series with DAU """
+
+        if isinstance(dau, SeriesArray):
+            return divide_series(values, dau)
 
         results = []
-        for idx in range(len(data['dau'])):
-            _dau = data['dau'][idx]
-            _kpi = data[kpi][idx]
+        for idx in range(len(dau)):
+            _dau = dau[idx]
+            _val = values[idx]
 
             if _dau == 0:
                 res = 0
             elif isinstance(_dau, list) and _dau[1] == 0:
                 res = [0]
             elif isinstance(_dau, list):
-                res = [_dau[0], _kpi[1] / _dau[1]]
+                res = [_dau[0], _val[1] / _dau[1]]
             else:
-                res = _kpi / _dau
+                res = _val / _dau
 
             results.append([res])
 
         return results
 
     def get_evt(self, evt_name, with_date=True, as_datetime=False,
-                segment=None, **kwargs):
+                segment=None, output='list', **kwargs):
         """ Request event stats
 
         :param evt_name: [:class:`str`] the event name
@@ -195,23 +431,35 @@ class SwrveExportApi(SwrveApi):
         :param as_datetime: [`bool`] if True convert strings with dates
             to `datetime` object, default value is False
         :param segment: [:class:`str`] request stats for specified segment
+        :param output: [:class:`str`] `list` or `array`, with `array`
+            the result is :class:`SeriesArray` with numpy arrays of dates
+            and values, `with_date` and `as_datetime` are ignored
         :return: [:class:`list`] a list of lists with dates and values or
             a list of values, it depends on with_date arg
         """
 
         url = urljoin(self._api_url, 'event/count')
-        data = self.send_api_request(url, name=evt_name, segment=segment,
-                                     **kwargs)
-        results = data[0]['data']
-        if not with_date:
-            results = [i[1] for i in results]
-        elif as_datetime:
-            results = [[self.to_datetime(i[0]), i[1]] for i in results]
+        data = self._send_series_request(url, name=evt_name, segment=segment,
+                                         **kwargs)
+        return self._series_results(data[0]['data'], with_date, as_datetime,
+                                    output)
 
-        return results
+    def iter_evt(self, evt_name, with_date=True, as_datetime=False,
+                 segment=None, **kwargs):
+        """ Request event stats and yield values as the response is
+        decoded, args are the same as in `get_evt`
+
+        :return: generator of [date, value] pairs or values
+        """
+
+        url = urljoin(self._api_url, 'event/count')
+        points = self.stream_api_request(url, name=evt_name, segment=segment,
+                                         **kwargs)
+        for series, point in points:
+            yield self._point(point, with_date, as_datetime)
 
     def get_evt_dau(self, evt_name, with_date=True, as_datetime=False,
-                    segment=None, **kwargs):
+                    segment=None, output='list', **kwargs):
         """ Request event stats and divide every value with DAU
 
         :param evt_name: [:class:`str`] the event name
@@ -223,33 +471,94 @@ class SwrveExportApi(SwrveApi):
         :param as_datetime: [`bool`] if True convert strings with dates
             to `datetime` object, default value is False
         :param segment: [:class:`str`] request stats for specified segment
+        :param output: [:class:`str`] `list` or `array`, with `array`
+            the result is :class:`SeriesArray` with numpy arrays of dates
+            and values, `with_date` and `as_datetime` are ignored
         :return: [:class:`list`] a list of lists with dates and values or
             a list of values, it depends on with_date arg
         """
 
-        data = {
-            'dau': self.get_kpi('dau', with_date, as_datetime, segment,
-                                **kwargs),
-            evt_name: self.get_evt(evt_name, with_date, as_datetime, segment,
-                                   **kwargs)
-        }
+        dau = self.get_kpi('dau', with_date, as_datetime, segment=segment,
+                           output=output, **kwargs)
+        evt = self.get_evt(evt_name, with_date, as_datetime, segment, output,
+                           **kwargs)
 
-        results = []
-        for idx in range(len(data['dau'])):
-            _dau = data['dau'][idx]
-            _evt = data[evt_name][idx]
+        return self._dau_results(dau, evt)
 
-            if _dau == 0:
-                res = 0
-            elif isinstance(_dau, list) and _dau[1] == 0:
-                res = [0]
-            elif isinstance(_dau, list):
-                res = [_dau[0], _evt[1] / _dau[1]]
-            else:
-                res = _evt / _dau
+    def get_kpis_dau(self, kpis, with_date=True, as_datetime=False,
+                     currency=None, segment=None, multiplier=None,
+                     output='list', max_workers=None, **kwargs):
+        """ Request stats for many kpis concurrently and divide every value
+        with DAU, DAU is requested only once
 
-            results.append([res])
+        :param kpis: [:class:`list`] kpis names, from
+            `SwrveExportApi.kpi_factors`
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :param kwargs: other args are the same as in `get_kpi_dau`
+        :return: [:class:`dict`] keys are kpis names, values are
+            `get_kpi_dau` like results or `SwrveApiException` if the
+            request has failed
+        :raises SwrveApiException: if DAU request has failed
+        """
+
+        args = (with_date, as_datetime, currency, segment, multiplier, output)
+        calls = {('kpi', kpi): (self.get_kpi, (kpi,) + args, kwargs)
+                 for kpi in set(kpis) | {'dau'}}
+        data = self._gather(calls, max_workers)
+        return self._bulk_dau_results(data, [('kpi', kpi) for kpi in kpis])
+
+    def get_evts_dau(self, evt_names, with_date=True, as_datetime=False,
+                     segment=None, output='list', max_workers=None,
+                     **kwargs):
+        """ Request stats for many events concurrently and divide every
+        value with DAU, DAU is requested only once
+
+        :param evt_names: [:class:`list`] events names
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :param kwargs: other args are the same as in `get_evt_dau`
+        :return: [:class:`dict`] keys are events names, values are
+            `get_evt_dau` like results or `SwrveApiException` if the
+            request has failed
+        :raises SwrveApiException: if DAU request has failed
+        """
 
+        calls = self._evts_dau_calls(evt_names, with_date, as_datetime,
+                                     segment, output, kwargs)
+        data = self._gather(calls, max_workers)
+        return self._bulk_dau_results(data, [('evt', evt) for evt in
+                                             evt_names])
+
+    def _evts_dau_calls(self, evt_names, with_date, as_datetime, segment,
+                        output, kwargs):
+        """ Create calls of `get_evt` for every event and one call of
+        `get_kpi` for DAU
+        """
+
+        calls = {('evt', evt): (self.get_evt, (evt, with_date, as_datetime,
+                                               segment, output), kwargs)
+                 for evt in evt_names}
+        calls[('kpi', 'dau')] = (
+            self.get_kpi, ('dau', with_date, as_datetime),
+            dict(kwargs, segment=segment, output=output)
+        )
+        return calls
+
+    @shaping(endpoint='exporter/bulk_dau')
+    def _bulk_dau_results(self, data, keys):
+        """ Divide every series from `data` with DAU """
+
+        dau = data[('kpi', 'dau')]
+        if isinstance(dau, SwrveApiException):
+            raise dau
+
+        results = {}
+        for key in keys:
+            if isinstance(data[key], SwrveApiException):
+                results[key[1]] = data[key]
+            else:
+                results[key[1]] = self._dau_results(dau, data[key])
         return results
 
     def get_evt_lst(self):
@@ -264,7 +573,8 @@ class SwrveExportApi(SwrveApi):
         return results
 
     def get_payload(self, evt_name, payload_key, with_date=True,
-                    as_datetime=False, default_struct=False):
+                    as_datetime=False, default_struct=False, output='list',
+                    top=None):
         """ Request stats for the event with specified payload key
 
         :param evt_name: [:class:`str`] the event name
@@ -293,6 +603,13 @@ class SwrveExportApi(SwrveApi):
 
             `[{'timeline': 'D-2018-01-01', '1': 116, '2': 260},
             {'timeline': 'D-2018-01-02', '1': 116, '2': 216}]`
+        :param output: [:class:`str`] `list`, `array`, `matrix` or
+            `sparse`, with `array` the result is a dict where keys are
+            payload values and values are :class:`SeriesArray`, with
+            `matrix` - :class:`PayloadMatrix`, with `sparse` -
+            :class:`SparsePayload`, other structure args are ignored
+        :param top: [:class:`int`] keep only `top` payload values with
+            the largest sum of stats
         :return: [:class:`list`] a list of dicts with stats for
             payload key in event
         """
@@ -300,37 +617,57 @@ class SwrveExportApi(SwrveApi):
         url = urljoin(self._api_url, 'event/payload')
         data = self.send_api_request(url, name=evt_name,
                                      payload_key=payload_key)
+        return self._payload_results(data, with_date, as_datetime,
+                                     default_struct, output, top)
+
+    @shaping
+    def _payload_results(self, data, with_date, as_datetime, default_struct,
+                         output='list', top=None):
+        """ Shape raw payload response, shared by sync and async apis """
+
+        if output not in ('matrix', 'sparse'):
+            self._check_output(output)
+
+        data = top_payloads(data, top)
+        if output == 'array':
+            return {dct['payload_value']: series_array(dct['data'])
+                    for dct in data}
+        elif output == 'matrix':
+            return pivot_dense(data)
+        elif output == 'sparse':
+            return pivot_sparse(data)
 
         if not with_date:
-            for dct in data:
-                dct['data'] = [i[1] for i in dct['data']]
+            data = [dict(dct, data=[i[1] for i in dct['data']])
+                    for dct in data]
         elif as_datetime:
-            for dct in data:
-                dct['data'] = [
-                    [self.to_datetime(i[0]), i[1]] for i in dct['data']
-                ]
+            data = [dict(dct, data=self._with_datetime(dct['data']))
+                    for dct in data]
 
         if default_struct:
             return data
 
-        results = {}
-        for dct in data:
-            paylod_value = dct['payload_value']
-
-            for idx in range(len(dct['data'])):
-                if isinstance(dct['data'][idx], list):
-                    results_key, value = dct['data'][idx]
-                else:
-                    results_key = idx
-                    value = dct['data'][idx]
+        return merge_rows(data, with_date)
 
-                if results_key not in results:
-                    results[results_key] = {'timeline': results_key}
-                results[results_key][paylod_value] = value
+    def iter_payload(self, evt_name, payload_key, with_date=True,
+                     as_datetime=False):
+        """ Request stats for the event with specified payload key and
+        yield values as the response is decoded
 
-        results = sorted(results.values(), key=lambda x: x['timeline'])
+        :param evt_name: [:class:`str`] the event name
+        :param payload_key: [:class:`str`] the payload key
+        :param with_date: [`bool`] the same as in `get_payload`
+        :param as_datetime: [`bool`] the same as in `get_payload`
+        :return: generator of tuples (payload_value, point), where point
+            is [date, value] pair or value
+        """
 
-        return results
+        url = urljoin(self._api_url, 'event/payload')
+        points = self.stream_api_request(url, 'payload_value', name=evt_name,
+                                         payload_key=payload_key)
+        for series, point in points:
+            yield (series['payload_value'],
+                   self._point(point, with_date, as_datetime))
 
     def get_payload_lst(self, evt_name):
         """ Request event payloads list
@@ -344,6 +681,88 @@ class SwrveExportApi(SwrveApi):
 
         return results
 
+    def get_event_breakdown(self, evt_name, payload_keys=None,
+                            with_date=True, as_datetime=False,
+                            output='list', max_workers=None, **kwargs):
+        """ Request event stats and stats for all its payload keys
+        concurrently
+
+        If `payload_keys` isn't passed, payload keys are requested with
+        `get_payload_lst` together with event stats and then all payloads
+        are requested at once.
+
+        :param evt_name: [:class:`str`] the event name
+        :param payload_keys: [:class:`list`] request only these payload
+            keys
+        :param with_date: [`bool`] the same as in `get_evt`
+        :param as_datetime: [`bool`] the same as in `get_evt`
+        :param output: [:class:`str`] `list` or `array`
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :param kwargs: other args of `get_payload` like `default_struct`
+            or `top`
+        :return: [:class:`dict`] with `event` - the event name, `count` -
+            `get_evt` result and `payloads` - a dict where keys are
+            payload keys and values are `get_payload` results or
+            `SwrveApiException` if the request has failed
+        :raises SwrveApiException: if event stats or payload keys request
+            has failed
+        """
+
+        calls = self._breakdown_calls(evt_name, payload_keys, with_date,
+                                      as_datetime, output, kwargs)
+        data = self._gather(calls, max_workers)
+        if payload_keys is None:
+            payload_keys = self._breakdown_keys(data)
+            calls = self._breakdown_calls(evt_name, payload_keys, with_date,
+                                          as_datetime, output, kwargs,
+                                          count=False)
+            data.update(self._gather(calls, max_workers))
+
+        return self._breakdown_results(evt_name, payload_keys, data)
+
+    def _breakdown_calls(self, evt_name, payload_keys, with_date,
+                         as_datetime, output, kwargs, count=True):
+        """ Create calls of `get_payload` for every payload key, calls of
+        `get_evt` and `get_payload_lst` if it's needed
+        """
+
+        calls = {}
+        if count:
+            calls['count'] = (self.get_evt, (evt_name, with_date,
+                                             as_datetime), {'output': output})
+        if payload_keys is None:
+            calls['payload_keys'] = (self.get_payload_lst, (evt_name,), {})
+            return calls
+
+        for key in payload_keys:
+            calls[('payload', key)] = (
+                self.get_payload, (evt_name, key, with_date, as_datetime),
+                dict(kwargs, output=output)
+            )
+        return calls
+
+    @staticmethod
+    def _breakdown_keys(data):
+        """ Get payload keys from results of the first stage """
+
+        if isinstance(data['payload_keys'], SwrveApiException):
+            raise data['payload_keys']
+        return data['payload_keys']
+
+    @staticmethod
+    def _breakdown_results(evt_name, payload_keys, data):
+        """ Combine results of `get_event_breakdown` requests """
+
+        if isinstance(data['count'], SwrveApiException):
+            raise data['count']
+
+        return {
+            'event': evt_name,
+            'count': data['count'],
+            'payloads': {key: data[('payload', key)] for key in payload_keys}
+        }
+
     def get_user_cohorts(self, cohort_type='retention', as_datetime=False,
                          segment=None):
         """ Request user cohorts data
@@ -361,15 +780,144 @@ class SwrveExportApi(SwrveApi):
         url = urljoin(self._api_url, 'cohorts/daily')
         data = self.send_api_request(url, cohort_type=cohort_type,
                                      segment=segment)
+        return self._cohorts_results(data, as_datetime)
+
+    @shaping
+    def _cohorts_results(self, data, as_datetime):
+        """ Shape raw cohorts response, shared by sync and async apis """
 
         results = data[0]['data']
         if as_datetime:
-            results = {
-                datetime.strptime(k, '%Y-%m-%d'): results[k] for k in results
-            }
+            keys = list(results)
+            results = dict(zip(parse_days(keys), (results[k] for k in keys)))
 
         return results
 
+    def get_cohort_matrix(self, cohort_type='retention', segment=None):
+        """ Request user cohorts data as a dense matrix
+
+        :param cohort_type: [:class:`str`] the type of cohort data, one
+            from `SwrveExportApi.cohort_types`
+        :param segment: [:class:`str`] request stats for specified segment
+        :return: :class:`CohortMatrix`
+        """
+
+        url = urljoin(self._api_url, 'cohorts/daily')
+        data = self.send_api_request(url, cohort_type=cohort_type,
+                                     segment=segment)
+        return self._cohort_matrix_results(data)
+
+    @shaping
+    def _cohort_matrix_results(self, data):
+        return CohortMatrix.from_response(data)
+
+    def get_cohort_matrices(self, cohort_types=None, segments=None,
+                            base=None, max_workers=None):
+        """ Request cohorts data for many cohort types and segments
+        concurrently
+
+        :param cohort_types: [:class:`list`] cohort types, by default all
+            `SwrveExportApi.cohort_types`
+        :param segments: [:class:`list`] segments names, None in the list
+            means stats for all users
+        :param base: [:class:`dict`] previous results, new data is merged
+            into them with :meth:`CohortMatrix.update`, so only recent
+            cohorts can be requested after `set_dates`
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :return: [:class:`dict`] keys are tuples (cohort_type, segment),
+            values are :class:`CohortMatrix` or `SwrveApiException` if
+            the request has failed
+        """
+
+        calls = self._cohorts_calls(cohort_types, segments)
+        return self._merge_cohorts(self._gather(calls, max_workers), base)
+
+    def _cohorts_calls(self, cohort_types, segments):
+        """ Create calls of `get_cohort_matrix` for every combination of
+        cohort type and segment
+        """
+
+        return {
+            (cohort_type, segment): (self.get_cohort_matrix,
+                                     (cohort_type, segment), {})
+            for cohort_type in cohort_types or self.cohort_types
+            for segment in segments or [None]
+        }
+
+    @staticmethod
+    def _merge_cohorts(results, base):
+        """ Merge new cohort matrices into previous ones """
+
+        if not base:
+            return results
+
+        merged = {}
+        for key, matrix in results.items():
+            previous = base.get(key)
+            if isinstance(matrix, CohortMatrix) and \
+                    isinstance(previous, CohortMatrix):
+                matrix = previous.update(matrix)
+            merged[key] = matrix
+        return merged
+
+    def get_report(self, report, max_workers=None):
+        """ Request all series of the report concurrently and assemble
+        them to one columnar table, the most expensive requests are sent
+        first, with :class:`SwrveMetrics` in hooks the costs are measured
+        means of endpoints
+
+        :param report: :class:`SwrveReport` with dimensions of the report
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :return: :class:`ReportTable`, failed requests are in `errors`
+        :raises SwrveApiException: if segments or events list request
+            has failed
+        """
+
+        lists = self._gather(self._report_lists_calls(report), max_workers)
+        plan = self._report_plan(report, lists)
+        data = self._gather(self._report_calls(report, plan), max_workers)
+        return self._report_results(plan, data)
+
+    def _report_lists_calls(self, report):
+        """ Create calls of lists requested for `all` in the report """
+
+        calls = {}
+        if report.segments == 'all':
+            calls['segments'] = (self.get_segment_lst, (), {})
+        if report.events == 'all':
+            calls['events'] = (self.get_evt_lst, (), {})
+        return calls
+
+    def _report_plan(self, report, lists):
+        for result in lists.values():
+            if isinstance(result, SwrveApiException):
+                raise result
+        return report.plan(self.kpi_factors, lists.get('segments'),
+                           lists.get('events'), report_costs(self._hooks))
+
+    def _report_calls(self, report, plan):
+        """ Create calls of `get_kpi` and `get_evt` in the planned order """
+
+        kwargs = {'start': report.start, 'stop': report.stop,
+                  'output': 'array'}
+        calls = {}
+        for query in plan.queries:
+            if query.kind == 'kpi':
+                calls[query] = (self.get_kpi, (query.name,), dict(
+                    kwargs, currency=query.currency, segment=query.segment,
+                    multiplier=report.multiplier
+                ))
+            else:
+                calls[query] = (self.get_evt, (query.name,),
+                                dict(kwargs, segment=query.segment))
+        return calls
+
+    @shaping(endpoint='exporter/report')
+    def _report_results(self, plan, data):
+        return SwrveReport.assemble(plan, data)
+
     def get_item_sales(self, uid=None, tag=None, as_datetime=False,
                        currency=None, segment=None, **kwargs):
         """ Request the sales (count) of the item(s). If no uid or tag is
@@ -385,17 +933,10 @@ class SwrveExportApi(SwrveApi):
         """
 
         url = urljoin(self._api_url, 'item/sales')
-        results = self.send_api_request(url, uid=uid, tag=tag,
-                                        currency=currency, segment=segment,
-                                        **kwargs)
-
-        if as_datetime:
-            for dct in results:
-                dct['data'] = [
-                    [self.to_datetime(i[0]), i[1]] for i in dct['data']
-                ]
-
-        return results
+        results = self._send_series_request(url, uid=uid, tag=tag,
+                                            currency=currency,
+                                            segment=segment, **kwargs)
+        return self._items_results(results, as_datetime)
 
     def get_item_revenue(self, uid=None, tag=None, as_datetime=False,
                          currency=None, segment=None, **kwargs):
@@ -412,15 +953,54 @@ class SwrveExportApi(SwrveApi):
         """
 
         url = urljoin(self._api_url, 'item/revenue')
-        results = self.send_api_request(url, uid=uid, tag=tag,
-                                        currency=currency, segment=segment,
-                                        **kwargs)
+        results = self._send_series_request(url, uid=uid, tag=tag,
+                                            currency=currency,
+                                            segment=segment, **kwargs)
+        return self._items_results(results, as_datetime)
+
+    def iter_item_sales(self, uid=None, tag=None, as_datetime=False,
+                        currency=None, segment=None, **kwargs):
+        """ Request the sales of the item(s) and yield values as the
+        response is decoded, args are the same as in `get_item_sales`
+
+        :return: generator of tuples (series, point), where series is
+            a dict with series fields except `data`
+        """
+
+        url = urljoin(self._api_url, 'item/sales')
+        return self._iter_items(url, uid, tag, as_datetime, currency,
+                                segment, kwargs)
+
+    def iter_item_revenue(self, uid=None, tag=None, as_datetime=False,
+                          currency=None, segment=None, **kwargs):
+        """ Request revenue from the item(s) and yield values as the
+        response is decoded, args are the same as in `get_item_revenue`
+
+        :return: generator of tuples (series, point), where series is
+            a dict with series fields except `data`
+        """
+
+        url = urljoin(self._api_url, 'item/revenue')
+        return self._iter_items(url, uid, tag, as_datetime, currency,
+                                segment, kwargs)
+
+    def _iter_items(self, url, uid, tag, as_datetime, currency, segment,
+                    kwargs):
+        points = self.stream_api_request(url, uid=uid, tag=tag,
+                                         currency=currency, segment=segment,
+                                         **kwargs)
+        for series, point in points:
+            yield series, self._point(point, True, as_datetime)
+
+    @shaping
+    def _items_results(self, results, as_datetime):
+        """ Shape raw item sales or revenue response, shared by sync and
+        async apis
+        """
 
         if as_datetime:
-            for dct in results:
-                dct['data'] = [
-                    [self.to_datetime(i[0]), i[1]] for i in dct['data']
-                ]
+            results = [dict(dct, data=self._with_datetime(dct['data']))
+                       for dct in results]
 
         return results
 
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .api import SwrveApi, read_config
+from .export_api import SwrveExportApi
+from .async_api import AsyncSwrveExportApi
+from .exceptions import SwrveApiException
+from .ratelimit import SwrveRateLimiter
+from .transport import SwrveTransport, AsyncSwrveTransport
+
+
+class SwrveFleetApi:
+    """ Run the same query for many Swrve apps concurrently
+
+    Every section of pyswrve config is one app, the config is read once.
+    Api objects of apps in the same region share one transport and one
+    rate limiter. Region of an app is taken from `region` option of its
+    section, `us` by default.
+    """
+
+    api_class = SwrveExportApi
+    transport_class = SwrveTransport
+
+    def __init__(self, sections=None, conf_path=None, region=None,
+                 api_class=None, pool_size=None, rate_limiter_kwargs=None,
+                 cache=None, coalescer=None):
+        """ __init__
+
+        :param sections: [:class:`list`] config sections to use, by
+            default all sections
+        :param conf_path: [:class:`str`] path to config file, by default
+            `SwrveApi.conf_path`
+        :param region: [:class:`str`] us or eu region for all apps,
+            overrides `region` option of sections
+        :param api_class: api class of apps, `SwrveExportApi` by default
+        :param pool_size: [:class:`int`] size of connections pool of one
+            region, by default equals to count of apps in the region
+        :param rate_limiter_kwargs: [:class:`dict`] args of
+            :class:`SwrveRateLimiter` created for every region
+        :param cache: [:class:`SwrveCache`] opt-in cache shared by all apps
+        :param coalescer: [:class:`SwrveCoalescer`] opt-in deduplication
+            shared by all apps
+        """
+
+        if api_class is not None:
+            self.api_class = api_class
+        if conf_path is None:
+            conf_path = SwrveApi.conf_path
+
+        conf = read_config(conf_path)
+        if sections is None:
+            sections = conf.sections()
+
+        regions = {}
+        for section in sections:
+            section_region = region or conf.get(section, 'region',
+                                                fallback='us')
+            regions.setdefault(section_region, []).append(section)
+
+        self.transports = {}
+        self.rate_limiters = {}
+        self.apis = {}
+        for section_region, region_sections in regions.items():
+            transport = self.transport_class(
+                pool_size=pool_size or len(region_sections)
+            )
+            limiter = SwrveRateLimiter(**(rate_limiter_kwargs or {}))
+            self.transports[section_region] = transport
+            self.rate_limiters[section_region] = limiter
+
+            for section in region_sections:
+                self.apis[section] = self.api_class(
+                    section_region, conf.get(section, 'api_key'),
+                    conf.get(section, 'personal_key'), section, conf_path,
+                    transport=transport, cache=cache, rate_limiter=limiter,
+                    coalescer=coalescer
+                )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Close transports of all regions """
+
+        for transport in self.transports.values():
+            transport.close()
+
+    def for_each(self, method, *args, **kwargs):
+        """ Call a method of every app without sending requests, e.g.
+        `set_dates`
+        """
+
+        for api in self.apis.values():
+            getattr(api, method)(*args, **kwargs)
+
+    def run(self, method, *args, max_workers=None, **kwargs):
+        """ Call a method of every app concurrently
+
+        :param method: [:class:`str`] name of api method, e.g. `get_kpi`
+        :param args: args of the method
+        :param max_workers: [:class:`int`] max count of apps queried
+            concurrently, by default all apps at once
+        :param kwargs: kwargs of the method
+        :return: [:class:`dict`] keys are config sections, values are
+            results or `SwrveApiException` if the request has failed
+        """
+
+        if not self.apis:
+            return {}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers or
+                                len(self.apis)) as executor:
+            futures = {
+                section: executor.submit(getattr(api, method), *args,
+                                         **kwargs)
+                for section, api in self.apis.items()
+            }
+            for section in futures:
+                try:
+                    results[section] = futures[section].result()
+                except SwrveApiException as e:
+                    results[section] = e
+
+        return results
+
+
+class AsyncSwrveFleetApi(SwrveFleetApi):
+    """ Async version of :class:`SwrveFleetApi`, requires `aiohttp` """
+
+    api_class = AsyncSwrveExportApi
+    transport_class = AsyncSwrveTransport
+
+    def __enter__(self):
+        raise TypeError('use "async with" with %s' % type(self).__name__)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        raise TypeError('use "async with" with %s' % type(self).__name__)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """ Async version of :meth:`SwrveFleetApi.close` """
+
+        for transport in self.transports.values():
+            await transport.close()
+
+    async def run(self, method, *args, max_workers=None, **kwargs):
+        """ Async version of :meth:`SwrveFleetApi.run` """
+
+        semaphore = asyncio.Semaphore(max_workers or len(self.apis) or 1)
+
+        async def run(api):
+            async with semaphore:
+                try:
+                    return await getattr(api, method)(*args, **kwargs)
+                except SwrveApiException as e:
+                    return e
+
+        sections = list(self.apis)
+        results = await asyncio.gather(*[run(self.apis[section])
+                                         for section in sections])
+        return dict(zip(sections, results))
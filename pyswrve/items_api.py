@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import os
 import json
+import time
+import hashlib
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 import requests
 
 from .api import SwrveApi
+from .exceptions import SwrveApiException
 
 
 class SwrveItemsApi(SwrveApi):
@@ -16,7 +21,9 @@ class SwrveItemsApi(SwrveApi):
     """
 
     def __init__(self, region='us', api_key=None, personal_key=None,
-                 section=None, conf_path=None):
+                 section=None, conf_path=None, transport=None,
+                 cache=None, rate_limiter=None, coalescer=None,
+                 hooks=None):
         """ __init__
 
         :param region: [:class:`str`] us or eu region, it defines domain
@@ -30,25 +37,58 @@ class SwrveItemsApi(SwrveApi):
             config sections
         :param conf_path: [:class:`str`] arg overrides default path to
             config file with entered
+        :param transport: [:class:`SwrveTransport`] transport for sending
+            requests, pass one transport to several api objects to share
+            the pool of connections
+        :param cache: [:class:`SwrveCache`] opt-in cache for responses
+        :param rate_limiter: [:class:`SwrveRateLimiter`] opt-in rate
+            limiter and retry scheduler
+        :param coalescer: [:class:`SwrveCoalescer`] opt-in deduplication
+            of identical requests
+        :param hooks: [:class:`list`] opt-in callables receiving events
+            with timings of every request, e.g. :class:`SwrveMetrics`
         """
 
-        super().__init__(region, api_key, personal_key, section, conf_path)
+        super().__init__(region, api_key, personal_key, section, conf_path,
+                         transport, cache, rate_limiter, coalescer,
+                         hooks)
         self._api_url = urljoin(self._api_url, 'items')
 
     def send_post_request(self, url, uid=None, data=None):
         """ Send POST request to Swrve Items API
 
         :param url: [:class:`str`] url for request
+        :return: [:class:`dict`] response or None if response isn't json
         :raises SwrveApiException: if request status_code != 200
         """
 
+        params = self._post_params(uid, data)
+        if self._rate_limiter is not None:
+            time.sleep(self._rate_limiter.reserve(params['api_key']))
+
+        res = self._transport.post(url, data=params)
+        try:
+            results = res.json()
+        except ValueError:
+            results = None
+
+        if res.status_code != 200:
+            error = results.get('error') if isinstance(results, dict) \
+                else None
+            raise SwrveApiException(error, res.status_code, url,
+                                    {'item': uid})
+
+        return results
+
+    def _post_params(self, uid=None, data=None):
+        """ Create form data for POST request """
+
         params = self._params.copy()
         if uid is not None:
             params['item'] = uid
         if data is not None:
             params['data'] = json.dumps(data)
-
-        requests.post(url, data=params)
+        return params
 
     def get_item_lst(self):
         """ Request list of project items
@@ -68,6 +108,97 @@ class SwrveItemsApi(SwrveApi):
         results = self.send_api_request(self._api_url, item=uid)
         return results
 
+    def iter_items_attrs(self, uids, max_workers=None):
+        """ Request attributes of many items concurrently, uids are read
+        lazily and results are yielded as they arrive
+
+        :param uids: iterable of items uids
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :return: generator of tuples (uid, attrs), attrs is
+            a :class:`SwrveApiException` if the request failed
+        """
+
+        args = ((uid,) for uid in uids)
+        return self._iter_completed(self._item_attrs, args, max_workers)
+
+    def get_items_attrs(self, uids, path=None, max_workers=None):
+        """ Request attributes of many items concurrently
+
+        :param uids: iterable of items uids
+        :param path: [:class:`str`] path to JSONL file, if it's passed
+            results are written to the file as they arrive, one line
+            `{"uid": ..., "attrs": ...}` per item
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests
+        :return: [:class:`dict`] where keys are uids and values are dicts
+            with attributes or :class:`SwrveApiException`; with `path` -
+            a report with `written` - count of written items and `failed`
+            - a dict where keys are uids and values are exceptions
+        """
+
+        results = self.iter_items_attrs(uids, max_workers)
+        if path is None:
+            return dict(results)
+
+        report = {'written': 0, 'failed': {}}
+        with open(path, 'w') as f:
+            for uid, attrs in results:
+                self._write_attrs(f, report, uid, attrs)
+        return report
+
+    def _item_attrs(self, uid):
+        """ Request attributes of one item, failures are returned instead
+        of raised, connection errors and timeouts are wrapped
+        """
+
+        try:
+            return uid, self.get_item_attrs(uid)
+        except SwrveApiException as e:
+            return uid, e
+        except requests.RequestException as e:
+            return uid, SwrveApiException(str(e), None, self._api_url,
+                                          {'item': uid})
+
+    @staticmethod
+    def _write_attrs(f, report, uid, attrs):
+        """ Write one result of `get_items_attrs` to JSONL file """
+
+        if isinstance(attrs, SwrveApiException):
+            report['failed'][uid] = attrs
+            return
+        f.write(json.dumps({'uid': uid, 'attrs': attrs}) + '\n')
+        report['written'] += 1
+
+    def _iter_completed(self, func, args_iter, max_workers=None):
+        """ Call `func` concurrently for every tuple of args, at most
+        `max_workers` calls are pending, so `args_iter` is read lazily
+
+        :return: generator of results in order of completion
+        """
+
+        if max_workers is None:
+            max_workers = self._transport.pool_size
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            try:
+                for args in args_iter:
+                    if len(pending) >= max_workers:
+                        done, pending = wait(pending,
+                                             return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                    pending.add(executor.submit(func, *args))
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
     def create_item(self, uid, data=None):
         """ Create or update one item
 
@@ -93,3 +224,192 @@ class SwrveItemsApi(SwrveApi):
 
         url = self._api_url + '_bulk'
         self.send_post_request(url, data=data)
+
+    @staticmethod
+    def _item_chunks(items, max_bytes):
+        """ Split items to chunks by size of serialised data
+
+        :param items: [:class:`dict`] or iterable of tuples (uid, data)
+        :param max_bytes: [:class:`int`] max size of chunk data in bytes,
+            an item bigger than `max_bytes` is sent in own chunk
+        :return: generator of dicts
+        """
+
+        if isinstance(items, dict):
+            items = items.items()
+
+        chunk = {}
+        size = 2
+        for uid, data in items:
+            item_size = len(json.dumps({uid: data}).encode('utf-8'))
+            if chunk and size + item_size > max_bytes:
+                yield chunk
+                chunk = {}
+                size = 2
+            chunk[uid] = data
+            size += item_size
+
+        if chunk:
+            yield chunk
+
+    def _upload_chunk(self, chunk):
+        """ Send one chunk, failures are returned instead of raised
+
+        :return: [:class:`tuple`] uids of the chunk and an exception or
+            None
+        """
+
+        try:
+            self.send_post_request(self._api_url + '_bulk', data=chunk)
+        except (SwrveApiException, requests.RequestException) as e:
+            return list(chunk), e
+        return list(chunk), None
+
+    @staticmethod
+    def _add_chunk_result(report, uids, error):
+        if error is None:
+            report['succeeded'].extend(uids)
+        else:
+            for uid in uids:
+                report['failed'][uid] = error
+
+    def upload_items(self, items, max_bytes=512*1024, max_workers=None):
+        """ Create or update many items with concurrent bulk requests
+
+        Items are read from `items` lazily and split to chunks by size of
+        serialised data, at most `max_workers` chunks are in memory.
+
+        :param items: [:class:`dict`] a dict like in `create_items` or
+            any iterable of tuples (uid, data)
+        :param max_bytes: [:class:`int`] max size of one request data in
+            bytes
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests, by default equals to the transport pool size
+        :return: [:class:`dict`] report with `succeeded` - a list of uids,
+            `failed` - a dict where keys are uids and values are exceptions,
+            `chunks` - count of sent requests
+        """
+
+        report = {'succeeded': [], 'failed': {}, 'chunks': 0}
+        chunks = ((chunk,) for chunk in self._item_chunks(items, max_bytes))
+        for uids, error in self._iter_completed(self._upload_chunk, chunks,
+                                                max_workers):
+            report['chunks'] += 1
+            self._add_chunk_result(report, uids, error)
+
+        return report
+
+    def sync_items(self, desired, index_path=None, dry_run=False,
+                   max_bytes=512*1024, max_workers=None):
+        """ Create and update only changed items of the catalogue
+
+        Current items are requested with `get_item_lst`, an item is
+        uploaded if it doesn't exist or any of its desired parameters and
+        attributes differs. Hashes of uploaded items are stored in the
+        index file, an item with the same hash in the index isn't compared
+        with the current state again.
+
+        :param desired: [:class:`dict`] a dict like in `create_items`
+        :param index_path: [:class:`str`] path to the json file with
+            content hashes of items, None means no index
+        :param dry_run: [:class:`bool`] only compute the diff
+        :param max_bytes: [:class:`int`] max size of one request data in
+            bytes
+        :param max_workers: [:class:`int`] max count of concurrent
+            requests
+        :return: [:class:`dict`] report with lists of uids - `create`,
+            `update`, `unchanged` and `extra` (existing items missing in
+            `desired`), and `upload` - report of `upload_items` or None
+            for dry run
+        """
+
+        index = _ItemIndex(index_path)
+        diff = self._items_diff(desired, self.get_item_lst(), index)
+        if dry_run:
+            diff['upload'] = None
+            return diff
+
+        changed = ((uid, desired[uid])
+                   for uid in diff['create'] + diff['update'])
+        upload = self.upload_items(changed, max_bytes, max_workers)
+        return self._sync_report(desired, diff, upload, index)
+
+    @classmethod
+    def _items_diff(cls, desired, current, index):
+        """ Compare desired items with the list of current items
+
+        :param desired: [:class:`dict`] desired items
+        :param current: [:class:`list`] result of `get_item_lst`
+        :param index: :class:`_ItemIndex`
+        :return: [:class:`dict`] lists of uids
+        """
+
+        current = {item.get('uid'): item for item in current or []}
+        diff = {'create': [], 'update': [], 'unchanged': [], 'extra': []}
+        for uid, data in desired.items():
+            item = current.get(uid)
+            if item is None:
+                diff['create'].append(uid)
+            elif index.get(uid) == index.item_hash(data) or \
+                    cls._item_matches(item, data):
+                diff['unchanged'].append(uid)
+            else:
+                diff['update'].append(uid)
+
+        diff['extra'] = [uid for uid in current if uid not in desired]
+        return diff
+
+    @staticmethod
+    def _item_matches(item, data):
+        """ Check that an item from `get_item_lst` has all desired values,
+        values are compared as strings as the API returns them
+
+        :param item: [:class:`dict`] current item
+        :param data: [:class:`dict`] desired parameters and attributes
+        :return: [:class:`bool`]
+        """
+
+        attrs = item.get('attributes') or {}
+        for key, value in data.items():
+            current = item[key] if key in item else attrs.get(key)
+            if current is None or str(current) != str(value):
+                return False
+        return True
+
+    @staticmethod
+    def _sync_report(desired, diff, upload, index):
+        """ Add upload report to the diff and update the index """
+
+        hashes = {uid: index.item_hash(desired[uid])
+                  for uid in upload['succeeded']}
+        hashes.update((uid, index.item_hash(desired[uid]))
+                      for uid in diff['unchanged'])
+        index.update(hashes)
+
+        diff['upload'] = upload
+        return diff
+
+
+class _ItemIndex:
+    """ Content hashes of synced items stored in a json file """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._hashes = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._hashes = json.load(f)
+
+    @staticmethod
+    def item_hash(data):
+        dump = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha1(dump.encode('utf-8')).hexdigest()
+
+    def get(self, uid):
+        return self._hashes.get(uid)
+
+    def update(self, hashes):
+        self._hashes.update(hashes)
+        if self.path is not None:
+            with open(self.path, 'w') as f:
+                json.dump(self._hashes, f)
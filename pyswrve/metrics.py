@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+import time
+import bisect
+import threading
+import functools
+from contextvars import ContextVar
+
+from .cache import endpoint_name
+
+# endpoint of the last request sent in the current thread or task
+current_endpoint = ContextVar('current_endpoint', default=None)
+_in_shaping = ContextVar('in_shaping', default=False)
+
+timings = ('queue', 'ttfb', 'download', 'decode', 'total', 'shape')
+
+
+def request_event(url):
+    """ Create event of one request, timings are in seconds and None if
+    they weren't measured
+
+    :param url: [:class:`str`] request url
+    :return: [:class:`dict`]
+    """
+
+    return {'kind': 'request', 'endpoint': endpoint_name(url),
+            'status': None, 'cached': False, 'retries': 0, 'bytes': None,
+            'queue': 0, 'ttfb': None, 'download': None, 'decode': None,
+            'total': None}
+
+
+def shaping(func=None, endpoint=None):
+    """ Decorator of api methods shaping raw responses, with hooks it
+    emits `shape` event with the time spent, nested calls aren't counted
+
+    :param endpoint: [:class:`str`] label of the event for methods
+        shaping responses of several requests sent by worker threads or
+        tasks, by default the endpoint of the last request sent in the
+        current thread or task is used
+    """
+
+    if func is None:
+        return functools.partial(shaping, endpoint=endpoint)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self._hooks or _in_shaping.get():
+            return func(self, *args, **kwargs)
+
+        token = _in_shaping.set(True)
+        started = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            shape = time.perf_counter() - started
+            _in_shaping.reset(token)
+            label = endpoint if endpoint is not None else \
+                current_endpoint.get()
+            self._emit({'kind': 'shape', 'endpoint': label,
+                        'method': func.__name__.strip('_'), 'shape': shape})
+
+    return wrapper
+
+
+def exponential_bounds(start, factor, count):
+    return [start * factor ** i for i in range(count)]
+
+
+# from 0.5 ms to ~1 min
+time_bounds = exponential_bounds(0.0005, 2, 18)
+# from 1 KB to 512 MB
+bytes_bounds = exponential_bounds(1024, 2, 20)
+retries_bounds = list(range(10))
+
+
+class Histogram:
+    """ Histogram with fixed buckets, thread-safe only with an external
+    lock
+    """
+
+    def __init__(self, bounds=None):
+        """ __init__
+
+        :param bounds: [:class:`list`] sorted upper bounds of buckets,
+            values above the last bound go to the overflow bucket, by
+            default `time_bounds`
+        """
+
+        self.bounds = bounds if bounds is not None else time_bounds
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """ Estimate percentile as the upper bound of its bucket
+
+        :param percent: [:class:`float`] from 0 to 100
+        :return: [:class:`float`] or None for empty histogram
+        """
+
+        if not self.count:
+            return None
+
+        rank = percent / 100 * self.count
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if idx == len(self.bounds):
+                    return self.max
+                return min(self.bounds[idx], self.max)
+        return self.max
+
+    def summary(self):
+        return {'count': self.count,
+                'mean': self.sum / self.count if self.count else None,
+                'min': self.min, 'p50': self.percentile(50),
+                'p99': self.percentile(99), 'max': self.max}
+
+
+class SwrveMetrics:
+    """ Hook aggregating events to histograms per endpoint
+
+    Pass it in `hooks` of api objects, one object can be shared. Time
+    metrics are `queue` (waiting for the rate limiter), `ttfb`,
+    `download`, `decode`, `total` and `shape`, also `bytes` and
+    `retries` are aggregated.
+    """
+
+    metrics = timings + ('bytes', 'retries')
+
+    def __init__(self, bounds=None):
+        """ __init__
+
+        :param bounds: [:class:`list`] bounds of time histograms
+        """
+
+        self._bounds = {'bytes': bytes_bounds, 'retries': retries_bounds}
+        self._time_bounds = bounds
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.errors = {}
+        self.cached = {}
+
+    def _histogram(self, endpoint, metric):
+        histograms = self._endpoints.setdefault(endpoint, {})
+        if metric not in histograms:
+            bounds = self._bounds.get(metric, self._time_bounds)
+            histograms[metric] = Histogram(bounds)
+        return histograms[metric]
+
+    def __call__(self, event):
+        endpoint = event['endpoint']
+        with self._lock:
+            if event.get('cached'):
+                self.cached[endpoint] = self.cached.get(endpoint, 0) + 1
+            status = event.get('status')
+            if status is not None and status != 200:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+            for metric in self.metrics:
+                value = event.get(metric)
+                if value is not None:
+                    self._histogram(endpoint, metric).add(value)
+
+    def histograms(self):
+        """ Get histograms
+
+        :return: [:class:`dict`] keys are endpoints, values are dicts
+            where keys are metrics and values are :class:`Histogram`
+        """
+
+        with self._lock:
+            return {endpoint: dict(histograms)
+                    for endpoint, histograms in self._endpoints.items()}
+
+    def summary(self):
+        """ Get count, mean, min, p50, p99 and max of every metric
+
+        :return: [:class:`dict`] keys are endpoints, values are dicts
+            where keys are metrics
+        """
+
+        with self._lock:
+            return {endpoint: {metric: histogram.summary()
+                               for metric, histogram in histograms.items()}
+                    for endpoint, histograms in self._endpoints.items()}
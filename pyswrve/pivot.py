@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+from itertools import groupby
+from operator import itemgetter
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .arrays import timeline_to_datetime64
+
+PayloadMatrix = namedtuple('PayloadMatrix',
+                           ['timeline', 'payload_values', 'values'])
+PayloadMatrix.__doc__ = """ Dense pivot of payload series: `values` is
+`float64` array with shape (len(timeline), len(payload_values)), missing
+cells are NaN
+"""
+
+SparsePayload = namedtuple('SparsePayload', ['timeline', 'payload_values',
+                                             'rows', 'cols', 'values'])
+SparsePayload.__doc__ = """ Sparse pivot of payload series in coordinate
+format: cell (`rows[i]`, `cols[i]`) has value `values[i]`, zero and
+missing cells aren't stored
+"""
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for matrix and sparse output")
+
+
+def _series_total(dct):
+    return sum(i[1] for i in dct['data'])
+
+
+def top_payloads(data, top):
+    """ Keep only `top` payload series with the largest sum of values,
+    the order of series isn't changed
+
+    :param data: [:class:`list`] Export API payload response
+    :param top: [:class:`int`] count of payload values to keep
+    :return: [:class:`list`] filtered response
+    """
+
+    if top is None or top >= len(data):
+        return data
+
+    totals = [_series_total(dct) for dct in data]
+    keep = heapq.nlargest(top, range(len(data)), key=totals.__getitem__)
+    return [data[idx] for idx in sorted(keep)]
+
+
+def _cells(dct, with_date):
+    payload_value = dct['payload_value']
+    if with_date:
+        return ((i[0], payload_value, i[1]) for i in dct['data'])
+    return ((idx, payload_value, value)
+            for idx, value in enumerate(dct['data']))
+
+
+def merge_rows(data, with_date=True):
+    """ Pivot payload series to rows by merging them in one pass, every
+    series must be sorted by timeline as Swrve returns it
+
+    :param data: [:class:`list`] payload series with [date, value] pairs
+        or only values if `with_date` is False
+    :param with_date: [`bool`] if False series have only values and rows
+        are keyed by index
+    :return: [:class:`list`] dicts like `{'timeline': date, value: count}`
+    """
+
+    results = []
+    merged = heapq.merge(*[_cells(dct, with_date) for dct in data],
+                         key=itemgetter(0))
+    for key, cells in groupby(merged, key=itemgetter(0)):
+        row = {'timeline': key}
+        for _, payload_value, value in cells:
+            row[payload_value] = value
+        results.append(row)
+
+    return results
+
+
+def _timeline(data):
+    """ Sorted unique timeline of all series """
+
+    merged = heapq.merge(*[[i[0] for i in dct['data']] for dct in data])
+    return [key for key, _ in groupby(merged)]
+
+
+def pivot_dense(data):
+    """ Pivot payload series to :class:`PayloadMatrix`
+
+    :param data: [:class:`list`] Export API payload response
+    :return: :class:`PayloadMatrix`
+    """
+
+    _require_numpy()
+    timeline = _timeline(data)
+    positions = {key: idx for idx, key in enumerate(timeline)}
+
+    values = np.full((len(timeline), len(data)), np.nan)
+    for col, dct in enumerate(data):
+        points = dct['data']
+        rows = np.fromiter((positions[i[0]] for i in points), dtype='intp',
+                           count=len(points))
+        values[rows, col] = np.fromiter((i[1] for i in points),
+                                        dtype='float64', count=len(points))
+
+    return PayloadMatrix(timeline_to_datetime64(timeline),
+                         [dct['payload_value'] for dct in data], values)
+
+
+def pivot_sparse(data):
+    """ Pivot payload series to :class:`SparsePayload`
+
+    :param data: [:class:`list`] Export API payload response
+    :return: :class:`SparsePayload`
+    """
+
+    _require_numpy()
+    timeline = _timeline(data)
+    positions = {key: idx for idx, key in enumerate(timeline)}
+
+    rows, cols, values = [], [], []
+    for col, dct in enumerate(data):
+        for key, value in dct['data']:
+            if value:
+                rows.append(positions[key])
+                cols.append(col)
+                values.append(value)
+
+    return SparsePayload(timeline_to_datetime64(timeline),
+                         [dct['payload_value'] for dct in data],
+                         np.array(rows, dtype='intp'),
+                         np.array(cols, dtype='intp'),
+                         np.array(values, dtype='float64'))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """ Thread-safe token bucket with adaptive rate
+
+    A token is reserved under the lock and the caller sleeps outside of
+    it, so the same bucket works for threads (`time.sleep`) and asyncio
+    tasks (`asyncio.sleep`). After 429 responses the rate is halved, every
+    successful response increases it back to the configured limit.
+    """
+
+    def __init__(self, rate, burst=None):
+        """ __init__
+
+        :param rate: [:class:`float`] max count of requests per second
+        :param burst: [:class:`int`] max count of requests sent at once,
+            by default equals to `rate`
+        """
+
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst if burst is not None else int(rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """ Reserve a token
+
+        :return: [:class:`float`] seconds to wait before sending request
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) *
+                               self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class SwrveRateLimiter:
+    """ Rate limiter and retry scheduler shared by api objects
+
+    Requests are limited by a token bucket per API key. GET requests
+    failed with 429 or 5xx status or with a connection error are retried
+    with exponential backoff and full jitter, `Retry-After` header is
+    honoured. Retries stop after `max_retries` attempts or when the next
+    attempt would exceed `deadline` seconds since the first one.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, rate=10, burst=None, max_retries=5, backoff=0.5,
+                 max_backoff=30, deadline=None):
+        """ __init__
+
+        :param rate: [:class:`float`] max count of requests per second
+            for one API key
+        :param burst: [:class:`int`] max count of requests sent at once
+        :param max_retries: [:class:`int`] max count of retries of one
+            request
+        :param backoff: [:class:`float`] base of exponential backoff in
+            seconds
+        :param max_backoff: [:class:`float`] max backoff in seconds
+        :param deadline: [:class:`float`] max seconds for one call with
+            all retries, None means no deadline
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, api_key):
+        """ Get the token bucket of API key
+
+        :param api_key: [:class:`str`] API key
+        :return: :class:`TokenBucket`
+        """
+
+        with self._lock:
+            if api_key not in self._buckets:
+                self._buckets[api_key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[api_key]
+
+    def reserve(self, api_key):
+        """ Reserve a request for API key
+
+        :param api_key: [:class:`str`] API key
+        :return: [:class:`float`] seconds to wait before sending request
+        """
+
+        return self.bucket(api_key).reserve()
+
+    @staticmethod
+    def _parse_retry_after(value):
+        if value is None:
+            return None
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return None
+        return max(0, retry_at - time.time())
+
+    def retry_delay(self, api_key, status, retry_after, attempt, started):
+        """ Get delay before the next attempt
+
+        :param api_key: [:class:`str`] API key
+        :param status: [:class:`int`] response status, None for
+            connection errors
+        :param retry_after: [:class:`str`] `Retry-After` header value
+        :param attempt: [:class:`int`] count of already done retries
+        :param started: [:class:`float`] `time.monotonic()` of the first
+            attempt
+        :return: [:class:`float`] seconds to wait or None if the request
+            mustn't be retried
+        """
+
+        bucket = self.bucket(api_key)
+        if status == 429:
+            bucket.slow_down()
+        elif status is not None and status < 400:
+            bucket.speed_up()
+
+        if status is not None and status not in self.retry_statuses:
+            return None
+        if attempt >= self.max_retries:
+            return None
+
+        limit = min(self.max_backoff, self.backoff * 2 ** attempt)
+        delay = random.uniform(0, limit)
+        retry_after = self._parse_retry_after(retry_after)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if self.deadline is not None and \
+                time.monotonic() - started + delay > self.deadline:
+            return None
+
+        return delay
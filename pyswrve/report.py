@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from functools import reduce
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .metrics import SwrveMetrics
+from .exceptions import SwrveApiException
+
+ReportQuery = namedtuple('ReportQuery', ['kind', 'name', 'segment',
+                                         'currency'])
+ReportQuery.__doc__ = """ One column of a report: `kind` is `kpi` or `evt`
+for series of Export API, `kpi_dau` or `evt_dau` for series divided by DAU
+"""
+
+ReportPlan = namedtuple('ReportPlan', ['queries', 'columns', 'derived'])
+ReportPlan.__doc__ = """ Planned report: `queries` are
+:class:`ReportQuery` to request ordered by expected cost, `columns` are
+all columns in the order of the report and `derived` is a dict of columns
+computed locally, values are tuples (numerator, denominator)
+"""
+
+ReportTable = namedtuple('ReportTable', ['timeline', 'columns', 'errors'])
+ReportTable.__doc__ = """ Columnar report: `timeline` is
+`numpy.datetime64` array shared by all columns, `columns` is a dict where
+keys are :class:`ReportQuery` and values are `float64` arrays aligned
+with the timeline, NaN for missing days, `errors` is a dict of failed
+queries and columns and `SwrveApiException`
+"""
+
+# kpis which are ratios of other kpis, they are computed locally when
+# both parts are requested anyway
+ratio_kpis = {'currency_spent_dau': ('currency_spent', 'dau'),
+              'currency_purchased_dau': ('currency_purchased', 'dau'),
+              'items_purchased_dau': ('items_purchased', 'dau')}
+currency_kpis = {'currency_given', 'currency_spent', 'currency_spent_dau',
+                 'currency_purchased', 'currency_purchased_dau'}
+
+# static estimate of request costs used without measured ones: seconds
+# of a request and of every day of the window, kpis aggregating a month
+# or cohorts of users per point are heavier, segments and currencies
+# filter raw data on the server
+request_cost = 0.2
+day_cost = 0.002
+default_days = 30
+kpi_weights = {'mau': 3.0, 'dau_mau': 3.0, 'arpu_monthly': 3.0,
+               'arppu_monthly': 3.0, 'day30_retention': 2.0}
+for _i in (1, 3, 7):
+    kpi_weights['day%s_retention' % _i] = 2.0
+    kpi_weights['day%s_reengagement' % _i] = 2.0
+evt_weight = 1.5
+segment_weight = 2.0
+currency_weight = 1.5
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for reports')
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+def query_endpoint(query):
+    """ Endpoint of the query like in events of hooks
+
+    :param query: :class:`ReportQuery` with `kpi` or `evt` kind
+    :return: [:class:`str`]
+    """
+
+    if query.kind == 'kpi':
+        return 'exporter/kpi/%s.json' % query.name
+    return 'exporter/event/count'
+
+
+def estimate_cost(query, days=None):
+    """ Static expected cost of the query when costs aren't measured
+
+    :param query: :class:`ReportQuery` with `kpi` or `evt` kind
+    :param days: [:class:`int`] count of days in the window, by default
+        `default_days`
+    :return: [:class:`float`] seconds
+    """
+
+    if days is None:
+        days = default_days
+    cost = request_cost + day_cost * days
+    if query.kind == 'kpi':
+        cost *= kpi_weights.get(query.name, 1.0)
+    else:
+        cost *= evt_weight
+    if query.segment is not None:
+        cost *= segment_weight
+    if query.currency is not None:
+        cost *= currency_weight
+    return cost
+
+
+def report_costs(hooks):
+    """ Expected costs of endpoints by :class:`SwrveMetrics` in hooks
+
+    :param hooks: [:class:`list`] hooks of api object
+    :return: [:class:`dict`] keys are endpoints, values are mean seconds
+        of requests
+    """
+
+    costs = {}
+    for hook in hooks:
+        if not isinstance(hook, SwrveMetrics):
+            continue
+        for endpoint, metrics in hook.summary().items():
+            mean = metrics.get('total', {}).get('mean')
+            if mean is not None:
+                costs[endpoint] = max(mean, costs.get(endpoint, 0))
+    return costs
+
+
+def divide_columns(values, dau):
+    """ Divide aligned values with DAU, zero DAU gives zero value and NaN
+    stays NaN
+
+    :param values: `float64` array
+    :param dau: `float64` array
+    :return: `float64` array
+    """
+
+    return np.divide(values, dau, out=np.zeros_like(values),
+                     where=dau != 0)
+
+
+class SwrveReport:
+    """ Declarative report of kpis and events against segments
+
+    The report describes dimensions only, :meth:`plan` turns them into
+    deduplicated requests: DAU is requested once per segment, ratios like
+    `currency_spent_dau` are divided locally when both parts are in the
+    report, the revenue multiplier is applied to `kpi_taxable` kpis by
+    `get_kpi` without extra requests. Run it with
+    `SwrveExportApi.get_report`.
+    """
+
+    def __init__(self, kpis=(), events=(), segments=None, currencies=None,
+                 start=None, stop=None, per_dau=(), multiplier=None):
+        """ __init__
+
+        :param kpis: [:class:`list`] kpis names or `all` for every kpi of
+            `SwrveExportApi.kpi_factors`
+        :param events: [:class:`list`] events names or `all` for every
+            event of `get_evt_lst`
+        :param segments: [:class:`list`] segments names, None in the list
+            means all users, `all` means all users and every segment of
+            `get_segment_lst`, by default only all users
+        :param currencies: [:class:`list`] in-project currencies of kpis
+            like `currency_given`, other kpis are requested without
+            currency
+        :param start: period's first date, by default dates of api object
+        :type start: datetime, str
+        :param stop: period's last date, by default dates of api object
+        :type stop: datetime, str
+        :param per_dau: [:class:`list`] names of kpis and events of the
+            report divided by DAU, `all` for all of them
+        :param multiplier: [:class:`float`] revenue multiplier like in
+            `get_kpi`
+        """
+
+        self.kpis = kpis
+        self.events = events
+        self.segments = segments
+        self.currencies = currencies
+        self.start = self._date(start)
+        self.stop = self._date(stop)
+        self.per_dau = per_dau
+        self.multiplier = multiplier
+
+    @staticmethod
+    def _date(value):
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    def plan(self, kpi_factors, segment_lst=None, evt_lst=None,
+             costs=None):
+        """ Plan requests of the report
+
+        :param kpi_factors: [:class:`set`] all kpis names, used for `all`
+        :param segment_lst: [:class:`list`] result of `get_segment_lst`,
+            used for `all` segments
+        :param evt_lst: [:class:`list`] result of `get_evt_lst`, used for
+            `all` events
+        :param costs: [:class:`dict`] expected costs of endpoints like in
+            :func:`report_costs`, unknown endpoints are expected to be as
+            expensive as the most expensive known one, without costs
+            queries are ordered by :func:`estimate_cost`
+        :return: :class:`ReportPlan`
+        """
+
+        kpis = _unique(sorted(kpi_factors) if self.kpis == 'all'
+                       else self.kpis)
+        events = _unique((evt_lst or []) if self.events == 'all'
+                         else self.events)
+        if self.segments == 'all':
+            segments = [None] + list(segment_lst or [])
+        else:
+            segments = self.segments or [None]
+        per_dau = set(kpis + events if self.per_dau == 'all'
+                      else self.per_dau)
+        with_dau = 'dau' in kpis or bool(per_dau & set(kpis + events))
+
+        columns, derived = [], {}
+        for segment in _unique(segments):
+            dau = ReportQuery('kpi', 'dau', segment, None)
+            for kpi in kpis:
+                currencies = [None]
+                if kpi in currency_kpis and self.currencies:
+                    currencies = _unique(self.currencies)
+                for currency in currencies:
+                    column = ReportQuery('kpi', kpi, segment, currency)
+                    columns.append(column)
+                    parts = ratio_kpis.get(kpi)
+                    if parts and parts[0] in kpis and with_dau:
+                        derived[column] = (column._replace(name=parts[0]),
+                                           dau)
+                    if kpi in per_dau:
+                        per_column = column._replace(kind='kpi_dau')
+                        columns.append(per_column)
+                        derived[per_column] = (column, dau)
+
+            for evt in events:
+                column = ReportQuery('evt', evt, segment, None)
+                columns.append(column)
+                if evt in per_dau:
+                    per_column = column._replace(kind='evt_dau')
+                    columns.append(per_column)
+                    derived[per_column] = (column, dau)
+
+        queries = [column for column in columns if column not in derived]
+        for parts in derived.values():
+            queries.extend(part for part in parts if part not in derived)
+        return ReportPlan(self._order(_unique(queries), costs or {},
+                                      self._days()),
+                          columns, derived)
+
+    def _days(self):
+        """ Count of days in the window or None if it isn't set """
+
+        if not self.start or not self.stop:
+            return None
+        start = date.fromisoformat(str(self.start)[:10])
+        stop = date.fromisoformat(str(self.stop)[:10])
+        return (stop - start).days + 1
+
+    @staticmethod
+    def _order(queries, costs, days=None):
+        """ Sort queries by expected cost, the most expensive first, so
+        slow requests don't delay the end of the report, the static
+        estimate orders queries with equal measured costs
+        """
+
+        default = max(costs.values(), default=None)
+
+        def key(query):
+            static = estimate_cost(query, days)
+            cost = costs.get(query_endpoint(query), default)
+            return -(static if cost is None else cost), -static
+
+        return sorted(queries, key=key)
+
+    @staticmethod
+    def assemble(plan, data):
+        """ Align requested series on one timeline and compute derived
+        columns
+
+        :param plan: :class:`ReportPlan`
+        :param data: [:class:`dict`] keys are queries of the plan, values
+            are :class:`SeriesArray` or `SwrveApiException`
+        :return: :class:`ReportTable`
+        """
+
+        _require_numpy()
+        errors = {query: data[query] for query in plan.queries
+                  if isinstance(data[query], SwrveApiException)}
+        series = {query: data[query] for query in plan.queries
+                  if query not in errors}
+
+        timelines = [i.timeline for i in series.values()]
+        if timelines:
+            timeline = reduce(np.union1d, timelines)
+        else:
+            timeline = np.array([], dtype='datetime64[D]')
+
+        values = {}
+        for query, result in series.items():
+            column = np.full(len(timeline), np.nan)
+            column[np.searchsorted(timeline, result.timeline)] = \
+                result.values
+            values[query] = column
+
+        def resolve(column):
+            if column in values or column in errors:
+                return
+            parts = plan.derived[column]
+            for part in parts:
+                resolve(part)
+                if part in errors:
+                    errors[column] = errors[part]
+                    return
+            values[column] = divide_columns(values[parts[0]],
+                                            values[parts[1]])
+
+        for column in plan.columns:
+            resolve(column)
+
+        columns = {column: values[column] for column in plan.columns
+                   if column in values}
+        return ReportTable(timeline, columns, errors)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import date
+
+from .cache import request_key
+
+# prefixes of daily and hourly timelines, monthly (`M-`) and yearly (`Y-`)
+# values can't be combined from parts of the period
+day_prefixes = ('DH-', 'H-', 'MD-', 'D-')
+
+
+def request_window(params):
+    """ Get the requested period
+
+    :param params: [:class:`dict`] request params
+    :return: [:class:`tuple`] `start` and `stop` dates or None if the
+        request has no period
+    """
+
+    start, stop = params.get('start'), params.get('stop')
+    if not start or not stop:
+        return None
+    return (date.fromisoformat(str(start)[:10]),
+            date.fromisoformat(str(stop)[:10]))
+
+
+def series_key(url, params):
+    """ Create the series key, request dates aren't a part of it
+
+    :param url: [:class:`str`] request url
+    :param params: [:class:`dict`] request params
+    :return: [:class:`str`] sha256 hex digest
+    """
+
+    return request_key(url, params, skip=('start', 'stop'))
+
+
+def timeline_day(timeline):
+    """ Get the day of the point
+
+    :param timeline: [:class:`str`] timeline like `D-2017-01-01`
+    :return: [:class:`str`] day like `2017-01-01` or None if the point
+        isn't daily or hourly
+    """
+
+    for prefix in day_prefixes:
+        if timeline.startswith(prefix):
+            return timeline[len(prefix):len(prefix)+10]
+    return None
+
+
+def part_key(dct):
+    """ Create a key of the response part from everything except data,
+    for example from item currency
+    """
+
+    meta = {k: dct[k] for k in dct if k != 'data'}
+    return json.dumps(meta, sort_keys=True)
+
+
+def make_part(part, points):
+    """ Create a response part with points sorted by timeline
+
+    :param part: [:class:`str`] key from :func:`part_key`
+    :param points: [:class:`dict`] keys are timelines, values are values
+    :return: [:class:`dict`]
+    """
+
+    dct = json.loads(part)
+    dct['data'] = [[k, points[k]] for k in sorted(points)]
+    return dct
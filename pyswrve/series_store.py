@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import os.path
+import json
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from .series import request_window, series_key, timeline_day, part_key, \
+    make_part
+
+
+class SwrveSeriesStore:
+    """ Local SQLite store of Export API time series for incremental
+    date range fetching
+
+    A series is identified by the request url and params except `start`
+    and `stop`. The store remembers which days of the series are already
+    known, so only missing days have to be requested. Only finished days
+    are stored, today and future days are always requested again.
+
+    Series with day or hour granularity (`D-`, `MD-`, `H-`, `DH-`
+    prefixes) are stored, monthly and yearly series (`M-`, `Y-`) can't be
+    combined from parts of the period and are always requested entirely.
+    """
+
+    default_path = os.path.join(os.path.expanduser('~'), '.pyswrve_series')
+
+    def __init__(self, path=None):
+        """ __init__
+
+        :param path: [:class:`str`] path to SQLite database file, default
+            is `$HOME/.pyswrve_series`
+        """
+
+        if path is None:
+            path = self.default_path
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS series_days (
+                series TEXT NOT NULL,
+                day TEXT NOT NULL,
+                PRIMARY KEY (series, day)
+            );
+            CREATE TABLE IF NOT EXISTS series_parts (
+                series TEXT NOT NULL,
+                part TEXT NOT NULL,
+                PRIMARY KEY (series, part)
+            );
+            CREATE TABLE IF NOT EXISTS series_points (
+                series TEXT NOT NULL,
+                part TEXT NOT NULL,
+                day TEXT NOT NULL,
+                timeline TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (series, part, timeline)
+            );
+        """)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def series_key(url, params):
+        """ Create the series key, request dates aren't a part of it
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :return: [:class:`str`] sha256 hex digest
+        """
+
+        return series_key(url, params)
+
+    def missing_ranges(self, url, params):
+        """ Get periods which have to be requested
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params with `start` and
+            `stop` dates
+        :return: [:class:`list`] a list of tuples (start, stop) with
+            dates strings or None if the request has no period
+        """
+
+        window = request_window(params)
+        if window is None:
+            return None
+        start, stop = window
+
+        series = self.series_key(url, params)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT day FROM series_days '
+                'WHERE series = ? AND day >= ? AND day <= ?',
+                (series, start.isoformat(), stop.isoformat())
+            ).fetchall()
+        known = {row[0] for row in rows}
+        today = date.today()
+
+        ranges = []
+        day = start
+        while day <= stop:
+            if day < today and day.isoformat() in known:
+                day += timedelta(days=1)
+                continue
+
+            if ranges and ranges[-1][1] == day - timedelta(days=1):
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+            day += timedelta(days=1)
+
+        return [(a.isoformat(), b.isoformat()) for a, b in ranges]
+
+    def merge(self, url, params, ranges, responses):
+        """ Store requested parts of the period and combine them with
+        already known days into one response
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params with `start` and
+            `stop` dates
+        :param ranges: [:class:`list`] requested periods from
+            `missing_ranges`
+        :param responses: [:class:`list`] responses for `ranges`
+        :return: [:class:`list`] a list of dicts like Export API response
+            for the whole period
+        """
+
+        start, stop = request_window(params)
+        series = self.series_key(url, params)
+        today = date.today().isoformat()
+
+        fresh = {}
+        storable = True
+        for res in responses:
+            for dct in res:
+                part = part_key(dct)
+                points = fresh.setdefault(part, {})
+                for timeline, value in dct['data']:
+                    points[timeline] = value
+                    if timeline_day(timeline) is None:
+                        storable = False
+
+        if not storable:
+            # monthly and yearly values can't be combined from parts
+            return [make_part(part, fresh[part]) for part in fresh]
+
+        with self._lock:
+            self._save(series, ranges, fresh, today)
+            parts = [row[0] for row in self._conn.execute(
+                'SELECT part FROM series_parts WHERE series = ? '
+                'ORDER BY rowid', (series,)
+            )]
+            rows = self._conn.execute(
+                'SELECT part, timeline, value FROM series_points '
+                'WHERE series = ? AND day >= ? AND day <= ?',
+                (series, start.isoformat(), stop.isoformat())
+            ).fetchall()
+
+        known = {part: {} for part in parts}
+        for part, timeline, value in rows:
+            known[part][timeline] = json.loads(value)
+        for part in fresh:
+            known.setdefault(part, {}).update(fresh[part])
+            if part not in parts:
+                parts.append(part)
+
+        # parts without points in the period are kept like in the API
+        # response, e.g. `[{'name': 'dau', 'data': []}]`
+        return [make_part(part, known[part]) for part in parts]
+
+    def _save(self, series, ranges, fresh, today):
+        """ Save finished days, must be called with the lock acquired """
+
+        days = []
+        for range_start, range_stop in ranges:
+            day = date.fromisoformat(range_start)
+            while day.isoformat() <= range_stop and day.isoformat() < today:
+                days.append((series, day.isoformat()))
+                day += timedelta(days=1)
+
+        points = []
+        for part in fresh:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO series_parts (series, part) '
+                'VALUES (?, ?)', (series, part)
+            )
+            for timeline, value in fresh[part].items():
+                day = timeline_day(timeline)
+                if day < today:
+                    points.append((series, part, day, timeline,
+                                   json.dumps(value)))
+
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO series_points '
+            '(series, part, day, timeline, value) VALUES (?, ?, ?, ?, ?)',
+            points
+        )
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO series_days (series, day) VALUES (?, ?)',
+            days
+        )
+        self._conn.commit()
+
+    def clear(self):
+        """ Delete all stored series """
+
+        with self._lock:
+            self._conn.executescript("""
+                DELETE FROM series_days;
+                DELETE FROM series_parts;
+                DELETE FROM series_points;
+            """)
+
+    def close(self):
+        """ Close the database connection """
+
+        self._conn.close()
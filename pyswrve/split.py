@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import timedelta
+
+from .cache import endpoint_name
+from .series import request_window, series_key, timeline_day, part_key, \
+    make_part
+
+
+class SwrveSplitter:
+    """ Splitting of long periods of Export API time series requests
+
+    A request with `start` and `stop` longer than the sub-range is sent as
+    several requests for consecutive sub-ranges, responses are stitched
+    into one response ordered by timeline. Only series with day or hour
+    granularity (`D-`, `MD-`, `H-`, `DH-` prefixes) can be stitched.
+    The granularity of every series (url and params except dates) is
+    remembered from its responses: requests of monthly and yearly series
+    aren't split, for a series not seen yet the first sub-range is
+    requested alone to learn it before the rest of sub-ranges are
+    requested.
+
+    The size of sub-ranges is fixed or, with `target`, chosen by observed
+    latency of the series or of its endpoint for a series not observed
+    yet, so that one request takes about `target` seconds.
+    """
+
+    def __init__(self, days=90, target=None, min_days=1, max_days=366,
+                 max_workers=None, smoothing=0.3):
+        """ __init__
+
+        :param days: [:class:`int`] count of days in one sub-range, with
+            `target` it's used until the first response of the endpoint
+        :param target: [:class:`float`] target seconds of one request
+        :param min_days: [:class:`int`] min count of days in adaptive
+            sub-ranges
+        :param max_days: [:class:`int`] max count of days in adaptive
+            sub-ranges
+        :param max_workers: [:class:`int`] max count of sub-ranges of one
+            series requested concurrently, by default equals to the
+            transport pool size
+        :param smoothing: [:class:`float`] weight of the last observation
+            in the moving average of seconds per day
+        """
+
+        self.days = days
+        self.target = target
+        self.min_days = min_days
+        self.max_days = max_days
+        self.max_workers = max_workers
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._day_seconds = {}
+        self._daily = {}
+
+    def range_days(self, url, params=None):
+        """ Get count of days in one sub-range for the series
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params, without them the
+            latency of the endpoint is used
+        :return: [:class:`int`]
+        """
+
+        if self.target is None:
+            return self.days
+
+        with self._lock:
+            seconds = None
+            if params is not None:
+                seconds = self._day_seconds.get(series_key(url, params))
+            if not seconds:
+                seconds = self._day_seconds.get(endpoint_name(url))
+        if not seconds:
+            return self.days
+        days = int(self.target / seconds)
+        return max(self.min_days, min(self.max_days, days))
+
+    def observe(self, url, days, seconds, params=None):
+        """ Remember latency of one sub-range request for the series and
+        its endpoint
+
+        :param url: [:class:`str`] request url
+        :param days: [:class:`int`] count of days in the sub-range
+        :param seconds: [:class:`float`] time of the request
+        :param params: [:class:`dict`] request params
+        """
+
+        keys = [endpoint_name(url)]
+        if params is not None:
+            keys.append(series_key(url, params))
+        with self._lock:
+            for key in keys:
+                value = seconds / days
+                previous = self._day_seconds.get(key)
+                if previous is not None:
+                    value = previous + self.smoothing * (value - previous)
+                self._day_seconds[key] = value
+
+    def is_daily(self, url, params):
+        """ Check granularity of the series
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :return: [:class:`bool`] True for daily or hourly series, False
+            for monthly or yearly ones and None if it isn't known yet
+        """
+
+        with self._lock:
+            return self._daily.get(series_key(url, params))
+
+    def learn(self, url, params, responses):
+        """ Remember granularity of the series by the first point of
+        responses
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :param responses: [:class:`list`] Export API responses
+        :return: [:class:`bool`] the same as :meth:`is_daily`, None if
+            responses have no points
+        """
+
+        for res in responses:
+            for dct in res:
+                if dct['data']:
+                    daily = timeline_day(dct['data'][0][0]) is not None
+                    with self._lock:
+                        self._daily[series_key(url, params)] = daily
+                    return daily
+        return None
+
+    def split(self, url, params):
+        """ Split the requested period into sub-ranges
+
+        :param url: [:class:`str`] request url
+        :param params: [:class:`dict`] request params
+        :return: [:class:`list`] a list of tuples (start, stop) with dates
+            strings or None if the request has no period, the period isn't
+            longer than one sub-range or the series is monthly or yearly
+        """
+
+        window = request_window(params)
+        if window is None or self.is_daily(url, params) is False:
+            return None
+        start, stop = window
+
+        step = timedelta(days=self.range_days(url, params))
+        if stop - start < step:
+            return None
+
+        ranges = []
+        while start <= stop:
+            end = min(start + step - timedelta(days=1), stop)
+            ranges.append((start.isoformat(), end.isoformat()))
+            start = end + timedelta(days=1)
+        return ranges
+
+    def merge(self, responses):
+        """ Stitch responses of sub-ranges into one response, points are
+        ordered by timeline and points repeated on boundaries are kept
+        once
+
+        :param responses: [:class:`list`] responses in order of sub-ranges
+        :return: [:class:`list`] a list of dicts like Export API response
+            or None if the series isn't daily or hourly
+        """
+
+        parts = {}
+        for res in responses:
+            for dct in res:
+                points = parts.setdefault(part_key(dct), {})
+                for timeline, value in dct['data']:
+                    if timeline_day(timeline) is None:
+                        return None
+                    points[timeline] = value
+
+        return [make_part(part, points) for part, points in parts.items()]
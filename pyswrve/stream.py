@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+import re
+import json
+import codecs
+
+_whitespace = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+# yielded by the parser when it needs the next chunk, the driver sends
+# the chunk back or None on the end of the stream
+_more = object()
+_incomplete = object()
+
+
+class _Reader:
+    """ Buffer over chunks of JSON text, only the unparsed tail of the
+    text is kept in memory
+
+    Methods are generators, so the same parser is driven by sync and
+    async iterables of chunks.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        """ Read the next chunk, return False on the end of the stream """
+
+        while not self.eof:
+            chunk = yield _more
+            if chunk is None:
+                self.eof = True
+                break
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+
+        return False
+
+    def peek(self):
+        """ Skip whitespaces and return the next char """
+
+        while True:
+            self.pos = _whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not (yield from self._more()):
+                raise ValueError('Unexpected end of JSON')
+
+    def take(self, chars):
+        """ Consume the next char, it must be one of `chars` """
+
+        char = yield from self.peek()
+        if char not in chars:
+            raise ValueError('Expected %s at %d, got %s' %
+                             (' or '.join(chars), self.pos, char))
+        self.pos += 1
+        return char
+
+    def try_take(self, chars):
+        """ Fast path of :meth:`take` without reading chunks, None means
+        the buffer is over
+        """
+
+        self.pos = _whitespace.match(self.buf, self.pos).end()
+        if self.pos == len(self.buf):
+            return None
+        char = self.buf[self.pos]
+        if char not in chars:
+            raise ValueError('Expected %s at %d, got %s' %
+                             (' or '.join(chars), self.pos, char))
+        self.pos += 1
+        return char
+
+    def try_value(self):
+        """ Fast path of :meth:`value` without reading chunks,
+        `_incomplete` means the value isn't in the buffer entirely
+        """
+
+        try:
+            value, end = _decoder.raw_decode(
+                self.buf, _whitespace.match(self.buf, self.pos).end()
+            )
+        except json.JSONDecodeError:
+            return _incomplete
+        if end == len(self.buf) and not self.eof:
+            return _incomplete
+        self.pos = end
+        return value
+
+    def value(self):
+        """ Decode the next JSON value """
+
+        yield from self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not (yield from self._more()):
+                    raise
+                continue
+
+            # a number at the end of the buffer may continue in next chunk
+            if end == len(self.buf) and not self.eof and \
+                    (yield from self._more()):
+                continue
+
+            self.pos = end
+            return value
+
+
+def _iter_object(reader, key):
+    """ Yield points of one series object """
+
+    meta = {}
+    buffered = []
+    yield from reader.take('{')
+    if (yield from reader.peek()) == '}':
+        reader.pos += 1
+        return
+
+    while True:
+        name = yield from reader.value()
+        yield from reader.take(':')
+        if name != 'data' or (yield from reader.peek()) != '[':
+            meta[name] = yield from reader.value()
+        else:
+            reader.pos += 1
+            wait = key is not None and key not in meta
+            if (yield from reader.peek()) == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    point = reader.try_value()
+                    if point is _incomplete:
+                        point = yield from reader.value()
+                    if wait:
+                        buffered.append(point)
+                    else:
+                        yield meta, point
+
+                    char = reader.try_take(',]')
+                    if char is None:
+                        char = yield from reader.take(',]')
+                    if char == ']':
+                        break
+
+        if (yield from reader.take(',}')) == '}':
+            break
+
+    for point in buffered:
+        yield meta, point
+
+
+def _parse(key):
+    """ Parser of the response, yields tuples (series, point) and `_more`
+    when the next chunk is needed
+    """
+
+    reader = _Reader()
+    yield from reader.take('[')
+    if (yield from reader.peek()) == ']':
+        return
+
+    while True:
+        yield from _iter_object(reader, key)
+        if (yield from reader.take(',]')) == ']':
+            return
+
+
+def iter_series(chunks, key=None):
+    """ Decode Export API response like `[{"data": [[date, value], ...],
+    "name": ...}, ...]` incrementally, only one chunk and one point are
+    kept in memory
+
+    :param chunks: iterable of `bytes` or `str` chunks of the response
+    :param key: [:class:`str`] a field of series required with every
+        point, e.g. `payload_value`; if the field follows `data` in the
+        response, points of the series are yielded after the series end
+    :return: generator of tuples (series, point), `series` is a dict of
+        series fields except `data`, fields placed after `data` are
+        filled in when the series ends
+    """
+
+    chunks = iter(chunks)
+    parser = _parse(key)
+    chunk = None
+    while True:
+        try:
+            item = parser.send(chunk)
+        except StopIteration:
+            return
+
+        chunk = None
+        if item is _more:
+            chunk = next(chunks, None)
+        else:
+            yield item
+
+
+async def aiter_series(chunks, key=None):
+    """ Async version of :func:`iter_series`
+
+    :param chunks: async iterable of `bytes` or `str` chunks
+    :param key: [:class:`str`] the same as in :func:`iter_series`
+    :return: async generator of tuples (series, point)
+    """
+
+    chunks = chunks.__aiter__()
+    parser = _parse(key)
+    chunk = None
+    while True:
+        try:
+            item = parser.send(chunk)
+        except StopIteration:
+            return
+
+        chunk = None
+        if item is _more:
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                chunk = None
+        else:
+            yield item
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class RouteHandler(BaseHTTPRequestHandler):
+    """ Handler of :class:`RouteServer`
+
+    Responses are sent by one write with TCP_NODELAY, otherwise Nagle's
+    algorithm and delayed ACK add ~40 ms to every keep-alive request.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        server = self.server
+        if server.record is not None:
+            server.record(method, parts.path, params, body, self)
+
+        route = server.routes.get(parts.path)
+        if route is None:
+            status, data, headers = 404, {'error': 'not found'}, {}
+        elif callable(route):
+            status, data, headers = route(self, params, body)
+        else:
+            status, data, headers = route
+
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        lines = ['%s %d %s' % (self.protocol_version, status,
+                               self.responses[status][0])]
+        lines += ['%s: %s' % (key, headers[key]) for key in headers]
+        if 'Content-Length' not in headers:
+            lines.append('Content-Length: %d' % len(data))
+        # the client mustn't reuse the connection closed after response
+        if self.close_connection:
+            lines.append('Connection: close')
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        self.wfile.write(head if method == 'HEAD' else head + data)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+
+class RouteServer(ThreadingHTTPServer):
+    """ Local HTTP server standing in for Swrve APIs in tests and
+    benchmarks
+
+    `routes` maps a path to a tuple (status, data, headers) or to
+    a callable `(handler, params, body) -> (status, data, headers)`,
+    `data` is JSON-serializable object, `str` or `bytes`.
+    """
+
+    daemon_threads = True
+    # concurrent clients mustn't wait in a short listen backlog
+    request_queue_size = 128
+
+    def __init__(self, routes, record=None):
+        """ __init__
+
+        :param routes: [:class:`dict`] routes of the server
+        :param record: a callable `(method, path, params, body, handler)`
+            called for every request, by default requests aren't recorded
+        """
+
+        super().__init__(('127.0.0.1', 0), RouteHandler)
+        self.routes = routes
+        self.record = record
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return 'http://%s:%s' % (host, port)
+
+    def start(self):
+        """ Serve requests in a daemon thread """
+
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from functools import lru_cache
+
+cache_size = 65536
+
+
+@lru_cache(maxsize=cache_size)
+def _parse_hour(date_str):
+    # 2017-01-01-05
+    return datetime(int(date_str[0:4]), int(date_str[5:7]),
+                    int(date_str[8:10]), int(date_str[11:13]))
+
+
+@lru_cache(maxsize=cache_size)
+def _parse_day(date_str):
+    # 2017-01-01
+    return datetime(int(date_str[0:4]), int(date_str[5:7]),
+                    int(date_str[8:10]))
+
+
+@lru_cache(maxsize=cache_size)
+def _parse_month(date_str):
+    # 2017-01
+    return datetime(int(date_str[0:4]), int(date_str[5:7]), 1)
+
+
+@lru_cache(maxsize=cache_size)
+def _parse_year(date_str):
+    return datetime(int(date_str[0:4]), 1, 1)
+
+
+# timeline prefix: (numpy datetime64 unit, parser of the date part)
+prefixes = {
+    'DH-': ('h', _parse_hour),
+    'H-': ('h', _parse_hour),
+    'MD-': ('D', _parse_day),
+    'D-': ('D', _parse_day),
+    'M-': ('M', _parse_month),
+    'Y-': ('Y', _parse_year)
+}
+
+
+def detect_prefix(date_str):
+    """ Detect granularity prefix of Swrve timeline string
+
+    :param date_str: [:class:`str`] string like `D-2017-01-01`
+    :return: [:class:`str`] prefix like `D-`
+    :raises ValueError: if the prefix is unknown
+    """
+
+    for prefix in prefixes:
+        if date_str.startswith(prefix):
+            return prefix
+    raise ValueError('unknown timeline format: %s' % date_str)
+
+
+def parse_date(date_str):
+    """ Create `datetime` object from Swrve timeline string like
+    `D-2017-01-01` or `H-2017-01-01-05`, results are memoised
+
+    :param date_str: [:class:`str`] string with date
+    :return: `datetime` object
+    """
+
+    prefix = detect_prefix(date_str)
+    return prefixes[prefix][1](date_str[len(prefix):])
+
+
+def parse_timeline(timeline):
+    """ Convert all strings of one series to `datetime` objects, the
+    granularity prefix is detected once by the first element
+
+    :param timeline: [:class:`list`] strings with dates with the same
+        prefix
+    :return: [:class:`list`] `datetime` objects
+    """
+
+    if not timeline:
+        return []
+
+    prefix = detect_prefix(timeline[0])
+    parser = prefixes[prefix][1]
+    start = len(prefix)
+    return [parser(i[start:]) for i in timeline]
+
+
+def parse_days(dates):
+    """ Convert strings like `2017-01-01` without prefix to `datetime`
+
+    :param dates: [:class:`list`] strings with dates
+    :return: [:class:`list`] `datetime` objects
+    """
+
+    return [_parse_day(i) for i in dates]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class SwrveTransport:
+    """ Pooled HTTP transport for sending requests to Swrve APIs
+
+    One transport keeps a `requests.Session` with a pool of keep-alive
+    connections, so consecutive requests to dashboard.swrve.com reuse
+    already opened TCP+TLS connections. A transport can be shared by
+    several api objects.
+    """
+
+    def __init__(self, pool_size=10, keep_alive=True, timeout=None):
+        """ __init__
+
+        :param pool_size: [:class:`int`] max count of connections kept
+            open per host
+        :param keep_alive: [`bool`] if False connections are closed
+            after every request
+        :param timeout: [:class:`float`] default timeout in seconds for
+            every request, None means no timeout
+        """
+
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        if not keep_alive:
+            self._session.headers['Connection'] = 'close'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, url, params=None, **kwargs):
+        """ Send GET request
+
+        :param url: [:class:`str`] url for request
+        :param params: [:class:`dict`] query string params
+        :return: `requests.Response` object
+        """
+
+        kwargs.setdefault('timeout', self.timeout)
+        return self._session.get(url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        """ Send POST request
+
+        :param url: [:class:`str`] url for request
+        :param data: [:class:`dict`] form data
+        :return: `requests.Response` object
+        """
+
+        kwargs.setdefault('timeout', self.timeout)
+        return self._session.post(url, data=data, **kwargs)
+
+    def head(self, url, **kwargs):
+        """ Send HEAD request
+
+        :param url: [:class:`str`] url for request
+        :return: `requests.Response` object
+        """
+
+        kwargs.setdefault('timeout', self.timeout)
+        return self._session.head(url, **kwargs)
+
+    def close(self):
+        """ Close all pooled connections """
+
+        self._session.close()
+
+
+class AsyncSwrveTransport:
+    """ Pooled HTTP transport for async api classes, requires `aiohttp`
+
+    The `aiohttp.ClientSession` is created on the first request, so
+    the transport can be created outside of a running event loop.
+    """
+
+    def __init__(self, pool_size=10, keep_alive=True, timeout=None):
+        """ __init__
+
+        :param pool_size: [:class:`int`] max count of connections kept
+            open per host
+        :param keep_alive: [`bool`] if False connections are closed
+            after every request
+        :param timeout: [:class:`float`] default timeout in seconds for
+            every request, None means no timeout
+        """
+
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for async transport')
+
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size,
+                                             force_close=not self.keep_alive)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=timeout)
+        return self._session
+
+    async def get(self, url, params=None, stream=False, **kwargs):
+        """ Send GET request, the response body is read before return
+
+        :param url: [:class:`str`] url for request
+        :param params: [:class:`dict`] query string params
+        :param stream: [`bool`] if True the body isn't read, the response
+            must be used as `async with res:` or released
+        :return: `aiohttp.ClientResponse` object
+        """
+
+        session = self._get_session()
+        if stream:
+            return await session.get(url, params=params, **kwargs)
+
+        async with session.get(url, params=params, **kwargs) as res:
+            await res.read()
+        return res
+
+    async def post(self, url, data=None, **kwargs):
+        """ Send POST request, the response body is read before return
+
+        :param url: [:class:`str`] url for request
+        :param data: [:class:`dict`] form data
+        :return: `aiohttp.ClientResponse` object
+        """
+
+        session = self._get_session()
+        async with session.post(url, data=data, **kwargs) as res:
+            await res.read()
+        return res
+
+    async def head(self, url, **kwargs):
+        """ Send HEAD request
+
+        :param url: [:class:`str`] url for request
+        :return: `aiohttp.ClientResponse` object
+        """
+
+        session = self._get_session()
+        async with session.head(url, **kwargs) as res:
+            pass
+        return res
+
+    async def close(self):
+        """ Close all pooled connections """
+
+        if self._session is not None:
+            await self._session.close()
@@ -1,8 +1,21 @@
 # -*- coding: utf-8 -*-
 
-from urllib.parse import urljoin
+import os
+import json
+import time
+import hashlib
+import threading
+from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
 
 from .api import SwrveApi
+from .exceptions import SwrveApiException
+from . import userdb_reader, userdb_columns
+
+_missing = object()
 
 
 class SwrveUserdbApi(SwrveApi):
@@ -14,7 +27,9 @@ swrve-export-api-guide/#User_DB_Export
     """
 
     def __init__(self, region='us', api_key=None, personal_key=None,
-                 section=None, conf_path=None):
+                 section=None, conf_path=None, transport=None,
+                 cache=None, rate_limiter=None, coalescer=None,
+                 hooks=None):
         """ __init__
 
         :param region: [:class:`str`] us or eu region, it defines domain
@@ -28,9 +43,21 @@ swrve-export-api-guide/#User_DB_Export
             config sections
         :param conf_path: [:class:`str`] arg overrides default path to
             config file with entered
+        :param transport: [:class:`SwrveTransport`] transport for sending
+            requests, pass one transport to several api objects to share
+            the pool of connections
+        :param cache: [:class:`SwrveCache`] opt-in cache for responses
+        :param rate_limiter: [:class:`SwrveRateLimiter`] opt-in rate
+            limiter and retry scheduler
+        :param coalescer: [:class:`SwrveCoalescer`] opt-in deduplication
+            of identical requests
+        :param hooks: [:class:`list`] opt-in callables receiving events
+            with timings of every request, e.g. :class:`SwrveMetrics`
         """
 
-        super().__init__(region, api_key, personal_key, section, conf_path)
+        super().__init__(region, api_key, personal_key, section, conf_path,
+                         transport, cache, rate_limiter, coalescer,
+                         hooks)
         self._api_url = urljoin(self._api_url, 'userdbs.json')
 
     def get_urls(self):
@@ -40,3 +67,371 @@ swrve-export-api-guide/#User_DB_Export
         """
 
         return self.send_api_request(self._api_url)
+
+    @classmethod
+    def _collect_urls(cls, obj):
+        """ Collect urls from `data_files` or `schemas`, they can be
+        strings, lists or dicts of them
+        """
+
+        if isinstance(obj, str):
+            return [obj]
+
+        if isinstance(obj, dict):
+            obj = obj.values()
+
+        urls = []
+        for item in obj:
+            urls.extend(cls._collect_urls(item))
+        return urls
+
+    def download(self, path, urls=None, max_workers=None,
+                 chunk_size=1024*1024):
+        """ Download UserDB data files and schemas concurrently
+
+        Files are streamed by chunks to `<name>.part` files and renamed
+        when completed, names are prefixed with a hash of the url path, so
+        files with the same name in different directories don't collide.
+        Partially downloaded files are resumed with HTTP Range requests,
+        files with the same size and ETag as on the server are skipped.
+        With the rate limiter failed requests are retried.
+
+        :param path: [:class:`str`] target directory
+        :param urls: [:class:`dict`] result of `get_urls`, requested if
+            not passed
+        :param max_workers: [:class:`int`] max count of concurrent
+            downloads, by default equals to the transport pool size
+        :param chunk_size: [:class:`int`] size of chunks in bytes, memory
+            usage is about `max_workers * chunk_size`
+        :return: [:class:`dict`] report with `paths` of downloaded files,
+            counts of `downloaded` and `skipped` files, transferred
+            `bytes`, `seconds`, `throughput` in bytes per second and
+            `errors` - a dict where keys are urls and values are
+            `SwrveApiException`
+        """
+
+        if urls is None:
+            urls = self.get_urls()
+
+        calls = self._download_calls(path, urls, chunk_size)
+        started = time.monotonic()
+        results = self._gather(calls, max_workers)
+        return self._download_report(results, time.monotonic() - started)
+
+    def _download_calls(self, path, urls, chunk_size):
+        """ Create calls of `_download_file` for every data file and
+        schema, shared by sync and async apis
+        """
+
+        os.makedirs(path, exist_ok=True)
+        manifest = _DownloadManifest(path)
+
+        file_urls = self._collect_urls(urls.get('data_files', []))
+        file_urls += self._collect_urls(urls.get('schemas', []))
+        return {
+            url: (self._download_file, (url, path, chunk_size, manifest), {})
+            for url in file_urls
+        }
+
+    @staticmethod
+    def _download_report(results, seconds):
+        """ Create report of `download` from results of `_download_file` """
+
+        report = {'paths': [], 'downloaded': 0, 'skipped': 0, 'bytes': 0,
+                  'seconds': seconds, 'errors': {}}
+        for url, res in results.items():
+            if isinstance(res, SwrveApiException):
+                report['errors'][url] = res
+                continue
+
+            file_path, transferred = res
+            report['paths'].append(file_path)
+            report['bytes'] += transferred
+            if transferred:
+                report['downloaded'] += 1
+            else:
+                report['skipped'] += 1
+
+        report['throughput'] = report['bytes'] / seconds if seconds else 0
+        return report
+
+    def _download_file(self, url, path, chunk_size, manifest):
+        """ Download one file, resume it or skip if it is already
+        downloaded
+
+        :return: [:class:`tuple`] path to the file and count of
+            transferred bytes
+        :raises SwrveApiException: if the request has failed, connection
+            errors and timeouts are wrapped too
+        """
+
+        download = _FileDownload(url, path, manifest)
+        try:
+            res = self._request('head', url, None, allow_redirects=True)
+            if res.status_code != 200:
+                # presigned urls often reject HEAD, the first byte is
+                # requested instead
+                res = self._get(url, None, headers=download.probe_headers,
+                                stream=True)
+                res.close()
+            if not download.check(res.status_code, res.headers):
+                return download.file_path, 0
+
+            with self._get(url, None, headers=download.headers,
+                           stream=True) as res, \
+                    download.open(res.status_code) as f:
+                for chunk in res.iter_content(chunk_size):
+                    f.write(chunk)
+                    download.transferred += len(chunk)
+        except requests.RequestException as e:
+            raise SwrveApiException(str(e), None, url, None) from e
+
+        return download.done()
+
+    @staticmethod
+    def load_schemas(path):
+        """ Load tables schemas from a downloaded schema file
+
+        :param path: [:class:`str`] path to the schema file
+        :return: [:class:`dict`] keys are tables names and values are
+            lists of tuples (column, type)
+        """
+
+        with open(path) as f:
+            return userdb_reader.parse_schema(f.read())
+
+    @staticmethod
+    def iter_records(paths, schema, columns=None, delimiter=',',
+                     header=False):
+        """ Iterate over rows of downloaded UserDB files, gzipped files are
+        decompressed on the fly, so memory usage doesn't depend on files
+        sizes
+
+        :param paths: [:class:`list`] paths to csv or gzipped csv files
+        :param schema: [:class:`list`] tuples (column, type), one table
+            from `load_schemas`
+        :param columns: [:class:`list`] names of columns to yield, other
+            columns aren't converted, by default all columns
+        :param delimiter: [:class:`str`] csv delimiter
+        :param header: [`bool`] if True the first line of every file is
+            skipped
+        :return: generator of dicts with typed values
+        """
+
+        return userdb_reader.iter_records(paths, schema, columns, delimiter,
+                                          header)
+
+    @staticmethod
+    def iter_batches(paths, schema, columns=None, batch_size=10000,
+                     delimiter=',', header=False):
+        """ Iterate over rows of downloaded UserDB files by column batches
+
+        :param paths: [:class:`list`] paths to csv or gzipped csv files
+        :param schema: [:class:`list`] tuples (column, type), one table
+            from `load_schemas`
+        :param columns: [:class:`list`] names of columns to yield, other
+            columns aren't converted, by default all columns
+        :param batch_size: [:class:`int`] max count of rows in one batch
+        :param delimiter: [:class:`str`] csv delimiter
+        :param header: [`bool`] if True the first line of every file is
+            skipped
+        :return: generator of dicts where keys are columns and values are
+            lists of typed values
+        """
+
+        return userdb_reader.iter_batches(paths, schema, columns, batch_size,
+                                          delimiter, header)
+
+    @staticmethod
+    def process(paths, schema, map_func, reduce_func, initial=_missing,
+                columns=None, max_workers=None, delimiter=',',
+                header=False):
+        """ Process downloaded UserDB files with a pool of processes
+
+        Every worker receives a file path, runs `map_func` over records of
+        the file and partial results are combined with `reduce_func`.
+        Bigger files are started first for better load balance.
+
+        :param paths: [:class:`list`] paths to csv or gzipped csv files
+        :param schema: [:class:`list`] tuples (column, type), one table
+            from `load_schemas`
+        :param map_func: a picklable (module level) function taking an
+            iterator of records of one file and returning partial result
+        :param reduce_func: a function taking two partial results and
+            returning combined one
+        :param initial: initial value for `reduce_func`, it's returned
+            for empty `paths`
+        :param columns: [:class:`list`] names of columns passed to
+            `map_func`, by default all columns
+        :param max_workers: [:class:`int`] count of processes, by default
+            count of CPUs
+        :param delimiter: [:class:`str`] csv delimiter
+        :param header: [`bool`] if True the first line of every file is
+            skipped
+        :return: combined result
+        :raises ValueError: if `paths` are empty and `initial` isn't passed
+        """
+
+        if not paths:
+            if initial is _missing:
+                raise ValueError('no paths to process and no initial value')
+            return initial
+
+        paths = sorted(paths, key=os.path.getsize, reverse=True)
+        count = len(paths)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            partials = executor.map(
+                userdb_reader.map_file, paths, [map_func] * count,
+                [schema] * count, [columns] * count, [delimiter] * count,
+                [header] * count
+            )
+            if initial is _missing:
+                return reduce(reduce_func, partials)
+            return reduce(reduce_func, partials, initial)
+
+    @staticmethod
+    def convert_columns(paths, schema, target, date, columns=None,
+                        delimiter=',', header=False, force=False):
+        """ Convert downloaded UserDB files to typed columnar files which
+        are memory-mapped on load, requires `numpy`
+
+        Every snapshot is stored in `target/<date>` directory with one file
+        per column, `target/index.json` describes converted snapshots.
+        Columns already present in the index aren't converted again.
+
+        :param paths: [:class:`list`] paths to csv or gzipped csv files
+        :param schema: [:class:`list`] tuples (column, type), one table
+            from `load_schemas`
+        :param target: [:class:`str`] directory with converted snapshots
+        :param date: [:class:`str`] snapshot date, the `date` from
+            `get_urls`
+        :param columns: [:class:`list`] names of columns to convert, by
+            default all columns
+        :param delimiter: [:class:`str`] csv delimiter
+        :param header: [`bool`] if True the first line of every file is
+            skipped
+        :param force: [`bool`] convert again even if the snapshot is in
+            the index
+        :return: :class:`UserdbColumns`
+        """
+
+        return userdb_columns.convert(paths, schema, target, date, columns,
+                                      delimiter=delimiter, header=header,
+                                      force=force)
+
+    @staticmethod
+    def load_columns(target, date=None):
+        """ Load memory-mapped columns of a converted snapshot
+
+        :param target: [:class:`str`] directory with converted snapshots
+        :param date: [:class:`str`] snapshot date, the latest by default
+        :return: :class:`UserdbColumns`
+        """
+
+        return userdb_columns.load(target, date)
+
+
+class _FileDownload:
+    """ State of one file download, shared by sync and async apis """
+
+    probe_headers = {'Range': 'bytes=0-0'}
+
+    def __init__(self, url, path, manifest):
+        self.url = url
+        parts = urlsplit(url)
+        digest = hashlib.sha1((parts.netloc + parts.path).encode('utf-8'))
+        self.name = '%s_%s' % (digest.hexdigest()[:8],
+                               os.path.basename(parts.path))
+        self.file_path = os.path.join(path, self.name)
+        self.part_path = self.file_path + '.part'
+        self.manifest = manifest
+        self.size = None
+        self.etag = None
+        self.offset = 0
+        self.headers = {}
+        self.transferred = 0
+
+    @staticmethod
+    def _size(status, headers):
+        """ Get the file size from HEAD response or the response of
+        `probe_headers` GET request, -1 if it's unknown
+        """
+
+        if status == 206:
+            total = headers.get('Content-Range', '').rpartition('/')[2]
+            return int(total) if total.isdigit() else -1
+        return int(headers.get('Content-Length', -1))
+
+    def check(self, status, headers):
+        """ Check HEAD or `probe_headers` GET response and prepare Range
+        headers for resuming
+
+        :return: [`bool`] False if the file is already downloaded
+        :raises SwrveApiException: if status isn't 200 or 206
+        """
+
+        if status not in (200, 206):
+            raise SwrveApiException(None, status, self.url, None)
+        self.size = self._size(status, headers)
+        self.etag = headers.get('ETag')
+
+        known = self.manifest.get(self.name)
+        same_etag = self.etag is None or known is None or \
+            known['etag'] == self.etag
+        if os.path.exists(self.file_path) and same_etag and \
+                os.path.getsize(self.file_path) == self.size:
+            return False
+
+        if os.path.exists(self.part_path) and same_etag:
+            self.offset = os.path.getsize(self.part_path)
+            if 0 < self.offset < self.size:
+                self.headers['Range'] = 'bytes=%d-' % self.offset
+                if self.etag is not None:
+                    self.headers['If-Range'] = self.etag
+            else:
+                self.offset = 0
+        return True
+
+    def open(self, status):
+        """ Open the part file for the GET response with `status`
+
+        :raises SwrveApiException: if status isn't 200 or 206
+        """
+
+        if status == 200:
+            self.offset = 0
+        elif status != 206:
+            raise SwrveApiException(None, status, self.url, None)
+
+        self.manifest.set(self.name, self.etag, self.size)
+        return open(self.part_path, 'ab' if self.offset else 'wb')
+
+    def done(self):
+        os.replace(self.part_path, self.file_path)
+        return self.file_path, self.transferred
+
+
+class _DownloadManifest:
+    """ ETags and sizes of downloaded files stored in the target
+    directory, shared by download threads
+    """
+
+    file_name = '.pyswrve_download.json'
+
+    def __init__(self, path):
+        self.path = os.path.join(path, self.file_name)
+        self._lock = threading.Lock()
+        self._files = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self._files = json.load(f)
+
+    def get(self, name):
+        with self._lock:
+            return self._files.get(name)
+
+    def set(self, name, etag, size):
+        with self._lock:
+            self._files[name] = {'etag': etag, 'size': size}
+            with open(self.path, 'w') as f:
+                json.dump(self._files, f)
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .userdb_reader import iter_batches
+
+index_name = 'index.json'
+column_dtypes = {
+    'tinyint': '<i8', 'smallint': '<i8', 'int': '<i8', 'integer': '<i8',
+    'bigint': '<i8', 'float': '<f8', 'double': '<f8', 'real': '<f8',
+    'decimal': '<f8', 'numeric': '<f8', 'boolean': '|b1', 'bool': '|b1'
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for columnar UserDB files')
+
+
+def _read_index(target):
+    path = os.path.join(target, index_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+class StringColumn:
+    """ Memory-mapped column of strings stored as utf-8 data and offsets,
+    values are decoded on access
+    """
+
+    def __init__(self, offsets, data, mask):
+        self.offsets = offsets
+        self.data = data
+        self.mask = mask
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if self.mask[idx]:
+            return None
+        start, stop = self.offsets[idx], self.offsets[idx+1]
+        return bytes(self.data[start:stop]).decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class UserdbColumns:
+    """ Memory-mapped columns of one UserDB snapshot
+
+    Numeric columns are `numpy.memmap` arrays (integers and booleans with
+    nulls are masked arrays, floats nulls are NaN), strings columns are
+    :class:`StringColumn`.
+    """
+
+    def __init__(self, target, date, meta):
+        self.date = date
+        self.rows = meta['rows']
+        self._path = os.path.join(target, meta['path'])
+        self._meta = meta['columns']
+        self._columns = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self._meta
+
+    def keys(self):
+        return list(self._meta)
+
+    def _map(self, name, dtype):
+        path = os.path.join(self._path, name)
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            meta = self._meta[name]
+            base = meta['file']
+            mask = self._map(base + '.null', '|b1')
+            if meta['dtype'] == 'str':
+                column = StringColumn(self._map(base + '.offsets', '<i8'),
+                                      self._map(base + '.data', '|u1'), mask)
+            elif meta['dtype'] == '<f8' or not meta['nulls']:
+                column = self._map(base, meta['dtype'])
+            else:
+                column = np.ma.MaskedArray(self._map(base, meta['dtype']),
+                                           mask=mask, copy=False)
+            self._columns[name] = column
+        return self._columns[name]
+
+
+def convert(paths, schema, target, date, columns=None, batch_size=100000,
+            delimiter=',', header=False, force=False):
+    """ Convert UserDB csv files to columnar files, one file per column
+
+    Columns of a snapshot are stored in the index, if the snapshot is
+    already converted only columns missing in it are converted and added.
+
+    :param paths: [:class:`list`] paths to csv or gzipped csv files
+    :param schema: [:class:`list`] tuples (column, type)
+    :param target: [:class:`str`] directory with snapshots and the index
+    :param date: [:class:`str`] snapshot date, the `date` from `get_urls`
+    :param columns: [:class:`list`] names of columns to convert, by
+        default all columns
+    :param batch_size: [:class:`int`] count of rows converted at once
+    :param delimiter: [:class:`str`] csv delimiter
+    :param header: [`bool`] if True the first line of every file is
+        skipped
+    :param force: [`bool`] convert again even if the snapshot is in the
+        index
+    :return: :class:`UserdbColumns`
+    :raises ValueError: if files have another count of rows than the
+        already converted snapshot
+    """
+
+    _require_numpy()
+    if columns is None:
+        columns = [col[0] for col in schema]
+
+    path = os.path.join(target, date)
+    os.makedirs(path, exist_ok=True)
+
+    stored = None if force else _read_index(target).get(date)
+    if stored is None:
+        meta, rows = _write_columns(paths, schema, path, columns, 0,
+                                    batch_size, delimiter, header)
+    else:
+        missing = [name for name in columns if name not in stored['columns']]
+        if not missing:
+            return UserdbColumns(target, date, stored)
+
+        meta, rows = _write_columns(paths, schema, path, missing,
+                                    len(stored['columns']), batch_size,
+                                    delimiter, header)
+        if rows != stored['rows']:
+            raise ValueError('snapshot %s has %d rows, files have %d, use '
+                             'force to convert it again' %
+                             (date, stored['rows'], rows))
+        meta = dict(stored['columns'], **meta)
+
+    index = _read_index(target)
+    index[date] = {'path': date, 'rows': rows, 'columns': meta}
+    with open(os.path.join(target, index_name), 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+    return UserdbColumns(target, date, index[date])
+
+
+def _write_columns(paths, schema, path, columns, first, batch_size,
+                   delimiter, header):
+    """ Write columns files of a snapshot, files are named from `c<first>`
+
+    :return: [:class:`tuple`] columns meta and count of rows
+    """
+
+    types = dict(schema)
+    meta = {}
+    files = {}
+    offsets = {}
+    for idx, name in enumerate(columns, first):
+        dtype = column_dtypes.get(types[name], 'str')
+        base = 'c%d' % idx
+        meta[name] = {'file': base, 'dtype': dtype, 'nulls': False}
+        suffixes = ('.offsets', '.data', '.null') if dtype == 'str' \
+            else ('', '.null')
+        files[name] = {s: open(os.path.join(path, base + s), 'wb')
+                       for s in suffixes}
+        if dtype == 'str':
+            offsets[name] = 0
+            np.zeros(1, dtype='<i8').tofile(files[name]['.offsets'])
+
+    rows = 0
+    try:
+        for batch in iter_batches(paths, schema, columns, batch_size,
+                                  delimiter, header):
+            for name in columns:
+                values = batch[name]
+                mask = np.fromiter((v is None for v in values), dtype='|b1',
+                                   count=len(values))
+                mask.tofile(files[name]['.null'])
+                if mask.any():
+                    meta[name]['nulls'] = True
+
+                dtype = meta[name]['dtype']
+                if dtype == 'str':
+                    encoded = [(v or '').encode('utf-8') for v in values]
+                    lengths = np.fromiter((len(v) for v in encoded),
+                                          dtype='<i8', count=len(encoded))
+                    ends = offsets[name] + np.cumsum(lengths)
+                    ends.tofile(files[name]['.offsets'])
+                    if len(ends):
+                        offsets[name] = int(ends[-1])
+                    files[name]['.data'].write(b''.join(encoded))
+                else:
+                    fill = float('nan') if dtype == '<f8' else 0
+                    arr = np.array([fill if v is None else v for v in values],
+                                   dtype=dtype)
+                    arr.tofile(files[name][''])
+            rows += len(batch[columns[0]]) if columns else 0
+    finally:
+        for name in files:
+            for f in files[name].values():
+                f.close()
+
+    return meta, rows
+
+
+def load(target, date=None):
+    """ Load memory-mapped columns of converted snapshot
+
+    :param target: [:class:`str`] directory with snapshots and the index
+    :param date: [:class:`str`] snapshot date, the latest by default
+    :return: :class:`UserdbColumns`
+    :raises KeyError: if the snapshot isn't converted
+    """
+
+    _require_numpy()
+    index = _read_index(target)
+    if date is None:
+        if not index:
+            raise KeyError('there are no converted snapshots')
+        date = max(index)
+    return UserdbColumns(target, date, index[date])
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import re
+import csv
+import gzip
+
+_create_table = re.compile(
+    r'CREATE\s+(?:EXTERNAL\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+    r'[`"\[]?([\w.]+)[`"\]]?\s*\(',
+    re.IGNORECASE
+)
+_skip_defs = ('primary', 'key', 'index', 'unique', 'constraint', 'foreign')
+null_values = ('', '\\N', 'NULL')
+
+
+def _to_bool(val):
+    return val.lower() in ('1', 't', 'true', 'y', 'yes')
+
+
+type_converters = {
+    'tinyint': int, 'smallint': int, 'int': int, 'integer': int,
+    'bigint': int, 'float': float, 'double': float, 'real': float,
+    'decimal': float, 'numeric': float, 'boolean': _to_bool, 'bool': _to_bool
+}
+
+
+def _split_defs(text):
+    """ Split columns definitions by top level commas """
+
+    defs = []
+    depth = 0
+    current = []
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            defs.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    defs.append(''.join(current))
+    return [d.strip() for d in defs if d.strip()]
+
+
+def parse_schema(text):
+    """ Parse UserDB schema with `CREATE TABLE` statements
+
+    :param text: [:class:`str`] schema file content
+    :return: [:class:`dict`] keys are tables names and values are lists
+        of tuples (column, type)
+    """
+
+    tables = {}
+    for match in _create_table.finditer(text):
+        # find the closing parenthesis of the columns definitions
+        depth = 1
+        pos = match.end()
+        while depth and pos < len(text):
+            if text[pos] == '(':
+                depth += 1
+            elif text[pos] == ')':
+                depth -= 1
+            pos += 1
+
+        columns = []
+        for col_def in _split_defs(text[match.end():pos-1]):
+            parts = col_def.split()
+            if len(parts) < 2 or parts[0].lower() in _skip_defs:
+                continue
+            name = parts[0].strip('`"[]')
+            col_type = parts[1].split('(')[0].lower()
+            columns.append((name, col_type))
+
+        tables[match.group(1).split('.')[-1]] = columns
+
+    return tables
+
+
+def _converter(col_type):
+    """ Create converter of a csv value to the column type, null values
+    are converted to None
+    """
+
+    conv = type_converters.get(col_type)
+
+    def convert(val):
+        if val in null_values:
+            return None
+        if conv is None:
+            return val
+        return conv(val)
+
+    return convert
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='')
+    return open(path, newline='')
+
+
+def _projection(schema, columns):
+    """ Get tuples (column, index, converter) only for used columns """
+
+    names = [col[0] for col in schema]
+    if columns is None:
+        columns = names
+    return [(col, names.index(col), _converter(schema[names.index(col)][1]))
+            for col in columns]
+
+
+def iter_records(paths, schema, columns=None, delimiter=',', header=False):
+    """ Iterate over UserDB rows, files are decompressed on the fly
+
+    :param paths: [:class:`list`] paths to csv or gzipped csv files
+    :param schema: [:class:`list`] tuples (column, type) from
+        `parse_schema`
+    :param columns: [:class:`list`] names of columns to yield, other
+        columns aren't converted, by default all columns
+    :param delimiter: [:class:`str`] csv delimiter
+    :param header: [`bool`] if True the first line of every file is
+        skipped
+    :return: generator of dicts with typed values
+    """
+
+    projection = _projection(schema, columns)
+    for path in paths:
+        with _open(path) as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            if header:
+                next(reader, None)
+            for row in reader:
+                yield {col: conv(row[idx]) for col, idx, conv in projection}
+
+
+def iter_batches(paths, schema, columns=None, batch_size=10000,
+                 delimiter=',', header=False):
+    """ Iterate over UserDB rows by column batches
+
+    :param paths: [:class:`list`] paths to csv or gzipped csv files
+    :param schema: [:class:`list`] tuples (column, type) from
+        `parse_schema`
+    :param columns: [:class:`list`] names of columns to yield, other
+        columns aren't converted, by default all columns
+    :param batch_size: [:class:`int`] max count of rows in one batch
+    :param delimiter: [:class:`str`] csv delimiter
+    :param header: [`bool`] if True the first line of every file is
+        skipped
+    :return: generator of dicts where keys are columns and values are
+        lists of typed values
+    """
+
+    projection = _projection(schema, columns)
+    batch = {col: [] for col, _, _ in projection}
+    count = 0
+
+    for path in paths:
+        with _open(path) as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            if header:
+                next(reader, None)
+            for row in reader:
+                for col, idx, conv in projection:
+                    batch[col].append(conv(row[idx]))
+                count += 1
+                if count == batch_size:
+                    yield batch
+                    batch = {col: [] for col, _, _ in projection}
+                    count = 0
+
+    if count:
+        yield batch
+
+
+def map_file(path, map_func, schema, columns=None, delimiter=',',
+             header=False):
+    """ Run `map_func` over records of one file, used by process pool
+    workers which receive only the file path
+    """
+
+    return map_func(iter_records([path], schema, columns, delimiter, header))
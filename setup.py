@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from distutils.core import setup
+from setuptools import setup
 
 from pyswrve import __version__
 
@@ -15,9 +15,13 @@ setup(
 
     description='Unofficial Python wrapper for Swrve Non-Client APIs',
     long_description="""pyswrve is an unofficial Python wrapper for
-Swrve Non-Client APIs: Export API (ready) and Items API (todo).""",
+Swrve Non-Client APIs: Export API, UserDB export and Items API.""",
 
-    requires=['requests'],
+    install_requires=['requests'],
+    extras_require={
+        'numpy': ['numpy'],
+        'aiohttp': ['aiohttp'],
+    },
     platforms=['any'],
     packages=['pyswrve'],
 
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from pyswrve.testing import RouteServer
+
+
+class StubServer:
+    """ Local HTTP server standing in for Swrve APIs in tests, requests
+    are recorded
+
+    `routes` maps a path to a tuple (status, data, headers) or to
+    a callable `(handler, params, body) -> (status, data, headers)`
+    """
+
+    def __init__(self, routes=None):
+        self.routes = routes or {}
+        self.requests = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        self._server = RouteServer(self.routes, self.record)
+
+    @property
+    def url(self):
+        return self._server.url
+
+    def record(self, method, path, params, body, handler):
+        with self._lock:
+            self.requests.append((method, path, params, body))
+            self.client_ports.add(handler.client_address[1])
+
+    def __enter__(self):
+        self._server.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.stop()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi, AsyncUserdbApi
+from pyswrve.split import SwrveSplitter
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+pytest.importorskip('aiohttp')
+
+
+class TestAsyncExportApi:
+    """ Class for testing async api classes with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    kpi = [{'data': [['D-2017-01-01', 10.0], ['D-2017-01-02', 20.0]]}]
+    dau = [{'data': [['D-2017-01-01', 5.0], ['D-2017-01-02', 4.0]]}]
+    payload = [
+        {'data': [['D-2017-01-01', 1], ['D-2017-01-02', 2]],
+         'payload_value': '1'},
+        {'data': [['D-2017-01-01', 3], ['D-2017-01-02', 4]],
+         'payload_value': '2'}
+    ]
+    routes = {
+        '/api/1/exporter/kpi/dollar_revenue.json': (200, kpi, {}),
+        '/api/1/exporter/kpi/dau.json': (200, dau, {}),
+        '/api/1/exporter/event/payload': (200, payload, {}),
+        '/api/1/exporter/kpi/unknown.json': (400, {'error': 'bad kpi'}, {}),
+        '/api/1/userdbs.json': (200, {'data_files': [], 'schemas': [],
+                                      'date': '2017-01-01'}, {})
+    }
+
+    def run(self, coro):
+        return asyncio.run(coro)
+
+    def test_same_results_as_sync(self):
+        async def fetch(url):
+            async with AsyncExportApi(**self.keys) as api:
+                api._api_url = url
+                return await asyncio.gather(
+                    api.get_kpi('dollar_revenue', multiplier=0.7),
+                    api.get_kpi('dollar_revenue', as_datetime=True),
+                    api.get_kpi_dau('dollar_revenue', with_date=False),
+                    api.get_payload('evt', 'level')
+                )
+
+        with StubServer(self.routes) as stub:
+            url = stub.url + '/api/1/exporter/'
+            results = self.run(fetch(url))
+
+            with ExportApi(**self.keys) as api:
+                api._api_url = url
+                expected = [
+                    api.get_kpi('dollar_revenue', multiplier=0.7),
+                    api.get_kpi('dollar_revenue', as_datetime=True),
+                    api.get_kpi_dau('dollar_revenue', with_date=False),
+                    api.get_payload('evt', 'level')
+                ]
+
+        assert results == expected
+        assert isinstance(results[1][0][0], datetime)
+        assert results[3][0] == {'timeline': 'D-2017-01-01', '1': 1, '2': 3}
+
+    def test_splitter(self):
+        async def fetch(url):
+            splitter = SwrveSplitter(days=1)
+            async with AsyncExportApi(splitter=splitter, **self.keys) as api:
+                api._api_url = url
+                api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 2))
+                return await api.get_kpi('dau')
+
+        with StubServer(self.routes) as stub:
+            res = self.run(fetch(stub.url + '/api/1/exporter/'))
+
+        # every sub-range returns both days, they are stitched once
+        assert len(stub.requests) == 2
+        assert res == self.dau[0]['data']
+
+    def test_error(self):
+        async def fetch(url):
+            async with AsyncExportApi(**self.keys) as api:
+                api._api_url = url
+                await api.get_kpi('unknown')
+
+        with StubServer(self.routes) as stub:
+            with pytest.raises(SwrveApiException) as exc:
+                self.run(fetch(stub.url + '/api/1/exporter/'))
+
+        assert exc.value.status_code == 400
+        assert exc.value.error == 'bad kpi'
+
+    def test_gather_connection_error(self):
+        def dropped(handler, params, body):
+            raise ConnectionAbortedError
+
+        async def fetch(url):
+            async with AsyncExportApi(**self.keys) as api:
+                api._api_url = url
+                return await api.get_kpis(['dau', 'mau'])
+
+        routes = dict(self.routes)
+        routes['/api/1/exporter/kpi/mau.json'] = dropped
+        with StubServer(routes) as stub:
+            res = self.run(fetch(stub.url + '/api/1/exporter/'))
+
+        assert res[('dau', None, None)] == self.dau[0]['data']
+        error = res[('mau', None, None)]
+        assert isinstance(error, SwrveApiException)
+        assert error.status_code is None and error.error
+
+    def test_sync_with(self):
+        with pytest.raises(TypeError, match='async with'):
+            with AsyncExportApi(**self.keys):
+                pass
+
+    def test_userdb_urls(self):
+        async def fetch(url):
+            async with AsyncUserdbApi(**self.keys) as api:
+                api._api_url = url
+                return await api.get_urls()
+
+        with StubServer(self.routes) as stub:
+            res = self.run(fetch(stub.url + '/api/1/userdbs.json'))
+
+        assert res['date'] == '2017-01-01'
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from pyswrve import ExportApi
+from pyswrve.cache import SwrveCache
+
+from .stub_server import StubServer
+
+
+class TestCache:
+    """ Class for testing SwrveCache with a local stub server """
+
+    keys = {'api_key': 'secret-api-key', 'personal_key': 'secret-personal'}
+    prefix = '/api/1/exporter/'
+    kpi = [{'data': [['D-2017-01-01', 10.0]]}]
+    routes = {
+        prefix + 'kpi/dau.json': (200, kpi, {}),
+        prefix + 'segment/list': (200, ['a'], {})
+    }
+
+    def make_api(self, stub, cache):
+        api = ExportApi(cache=cache, **self.keys)
+        api._api_url = stub.url + self.prefix
+        return api
+
+    def test_past_dates_cached(self, tmp_path):
+        path = str(tmp_path / 'cache')
+        with StubServer(self.routes) as stub:
+            with SwrveCache(path) as cache, self.make_api(stub, cache) as api:
+                api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 1))
+                assert api.get_kpi('dau') == [['D-2017-01-01', 10.0]]
+                assert api.get_kpi('dau') == [['D-2017-01-01', 10.0]]
+                assert cache.hits == 1 and cache.misses == 1
+
+            # the cache persists between runs
+            with SwrveCache(path) as cache, self.make_api(stub, cache) as api:
+                api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 1))
+                api.get_kpi('dau', as_datetime=True)
+                assert cache.hits == 1
+
+        assert len(stub.requests) == 1
+        with open(path, 'rb') as f:
+            raw = f.read()
+        assert b'secret-api-key' not in raw
+        assert b'secret-personal' not in raw
+
+    def test_ttl(self, tmp_path):
+        path = str(tmp_path / 'cache')
+        endpoint_ttls = {'segment/list': -1, 'kpi/': 0}
+        with StubServer(self.routes) as stub, \
+                SwrveCache(path, endpoint_ttls=endpoint_ttls) as cache, \
+                self.make_api(stub, cache) as api:
+            for _ in range(2):
+                api.get_segment_lst()
+                api.get_kpi('dau')
+            assert cache.stats()['entries'] == 1
+
+        assert len(stub.requests) == 4
+
+    def test_lru_eviction(self, tmp_path):
+        cache = SwrveCache(str(tmp_path / 'cache'), max_size=50)
+        url = 'https://dashboard.swrve.com/api/1/exporter/kpi/dau.json'
+        params = {'stop': '2017-01-01'}
+        for i in range(3):
+            cache.set(url, dict(params, segment=i), [i] * 5)
+        cache.get(url, dict(params, segment=0))
+        cache.set(url, dict(params, segment=3), [3] * 5)
+
+        assert cache.get(url, dict(params, segment=0)) == [0] * 5
+        assert cache.get(url, dict(params, segment=1)) is None
+        assert cache.stats()['size'] <= 50
+        cache.close()
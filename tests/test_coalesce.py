@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi
+from pyswrve.coalesce import SwrveCoalescer
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+
+class TestCoalescer:
+    """ Class for testing SwrveCoalescer with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+    cohorts = [{'data': {'2017-01-01': {'users': 10, 'retention': [5]}}}]
+    payload = [{'payload_value': '1', 'data': [['D-2017-01-01', 1.0]]}]
+
+    @staticmethod
+    def slow(data, delay=0.1):
+        def route(handler, params, body):
+            time.sleep(delay)
+            return 200, data, {}
+        return route
+
+    def make_routes(self):
+        series = [{'data': [['D-2017-01-01', 10.0], ['D-2017-01-02', 0.0]]}]
+        dau = [{'data': [['D-2017-01-01', 5.0], ['D-2017-01-02', 2.0]]}]
+        return {
+            self.prefix + 'kpi/dau.json': self.slow(dau),
+            self.prefix + 'kpi/new_users.json': self.slow(series),
+            self.prefix + 'kpi/dpu.json': self.slow(series),
+            self.prefix + 'event/count': self.slow(series),
+            self.prefix + 'kpi/mau.json': (500, {'error': 'failed'}, {}),
+            self.prefix + 'cohorts/daily': (200, self.cohorts, {}),
+            self.prefix + 'segment/list': (200, ['a'], {}),
+            self.prefix + 'event/payload': (200, self.payload, {})
+        }
+
+    def make_api(self, stub, coalescer, api_class=ExportApi):
+        api = api_class(coalescer=coalescer, **self.keys)
+        api._api_url = stub.url + self.prefix
+        return api
+
+    def count(self, stub, path):
+        return len([r for r in stub.requests if r[1] == self.prefix + path])
+
+    def test_window(self):
+        coalescer = SwrveCoalescer(window=10)
+        with StubServer(self.make_routes()) as stub, \
+                self.make_api(stub, coalescer) as api:
+            first = api.get_kpi_dau('new_users')
+            second = api.get_evt_dau('evt', with_date=False)
+            assert api.get_kpi_dau('new_users') == first
+
+        assert first == [[['D-2017-01-01', 2.0]], [['D-2017-01-02', 0.0]]]
+        assert second == [[2.0], [0.0]]
+        assert self.count(stub, 'kpi/dau.json') == 1
+        assert coalescer.hits == 3
+
+    def test_in_flight(self):
+        coalescer = SwrveCoalescer(window=0)
+        with StubServer(self.make_routes()) as stub, \
+                self.make_api(stub, coalescer) as api:
+            with ThreadPoolExecutor(4) as executor:
+                results = list(executor.map(lambda _: api.get_kpi('dau'),
+                                            range(4)))
+            with pytest.raises(SwrveApiException):
+                api.get_kpi('mau')
+            api.get_kpi('dau')
+
+        assert all(res == results[0] for res in results)
+        assert self.count(stub, 'kpi/dau.json') == 2
+
+    def test_results_not_shared(self):
+        coalescer = SwrveCoalescer(window=10)
+        with StubServer(self.make_routes()) as stub, \
+                self.make_api(stub, coalescer) as api:
+            first = api.get_kpi('dau')
+            first[0][1] = None
+            first.append(None)
+            second = api.get_kpi('dau')
+
+            api.get_user_cohorts().clear()
+            cohorts = api.get_user_cohorts()
+            api.get_segment_lst().append('b')
+            segments = api.get_segment_lst()
+            api.get_payload('evt', 'key', default_struct=True)[0]['data'] \
+                .append(None)
+            payload = api.get_payload('evt', 'key', default_struct=True)
+
+        assert second == [['D-2017-01-01', 5.0], ['D-2017-01-02', 2.0]]
+        assert cohorts == self.cohorts[0]['data']
+        assert segments == ['a']
+        assert len(payload[0]['data']) == 1
+        assert coalescer.hits == 4
+
+    def test_bulk_dau(self):
+        with StubServer(self.make_routes()) as stub, \
+                self.make_api(stub, None) as api:
+            res = api.get_kpis_dau(['new_users', 'dpu', 'mau'],
+                                   with_date=False)
+
+        assert res['new_users'] == [[2.0], [0.0]]
+        assert res['dpu'] == [[2.0], [0.0]]
+        assert isinstance(res['mau'], SwrveApiException)
+        assert self.count(stub, 'kpi/dau.json') == 1
+
+    def test_async(self):
+        pytest.importorskip('aiohttp')
+        coalescer = SwrveCoalescer(window=0)
+
+        async def fetch(stub):
+            async with self.make_api(stub, coalescer, AsyncExportApi) as api:
+                results = await asyncio.gather(
+                    *[api.get_kpi('dau') for _ in range(4)]
+                )
+                evts = await api.get_evts_dau(['a', 'b'], with_date=False)
+                return results, evts
+
+        with StubServer(self.make_routes()) as stub:
+            results, evts = asyncio.run(fetch(stub))
+
+        assert all(res == results[0] for res in results)
+        assert evts == {'a': [[2.0], [0.0]], 'b': [[2.0], [0.0]]}
+        assert self.count(stub, 'kpi/dau.json') == 2
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyswrve import ExportApi
+from pyswrve.cohorts import CohortMatrix
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+np = pytest.importorskip('numpy')
+
+
+def response(first_day, days):
+    data = {}
+    for idx in range(days):
+        date = '2017-01-%02d' % (first_day + idx)
+        data[date] = {'users': 100 * (idx + 1),
+                      'data': {str(day): 1 / (day + 1)
+                               for day in range(days - idx)}}
+    return [{'name': 'retention', 'data': data}]
+
+
+class TestCohorts:
+    """ Class for testing cohort matrices """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+
+    def test_from_response(self):
+        matrix = CohortMatrix.from_response(response(1, 3))
+        assert matrix.values.shape == (3, 3)
+        assert matrix.dates[0] == np.datetime64('2017-01-01')
+        assert matrix.sizes.tolist() == [100, 200, 300]
+        assert matrix.day(1).tolist()[:2] == [0.5, 0.5]
+        assert np.isnan(matrix.values[2, 1])
+        assert np.isnan(matrix.day(10)).all()
+
+        flat = [{'data': {'2017-01-01': {'cohort_size': 10, 'day_0': 1.0,
+                                         'day_2': 0.25}}}]
+        matrix = CohortMatrix.from_response(flat)
+        assert matrix.sizes.tolist() == [10]
+        assert matrix.values[0, 2] == 0.25
+        assert np.isnan(matrix.values[0, 1])
+
+    def test_weighted_mean(self):
+        matrix = CohortMatrix.from_response(response(1, 2))
+        matrix.values[:, 0] = [1.0, 0.4]
+        mean = matrix.weighted_mean()
+        assert mean[0] == pytest.approx((100 * 1.0 + 200 * 0.4) / 300)
+        assert mean[1] == 0.5
+        assert matrix.weighted_mean(np.array([1.0, 1.0]))[0] == \
+            pytest.approx(0.7)
+
+    def test_update_and_save(self, tmp_path):
+        old = CohortMatrix.from_response(response(1, 2))
+        new = CohortMatrix.from_response(response(2, 3))
+        merged = old.update(new)
+
+        assert len(merged) == 4
+        assert merged.values.shape == (4, 3)
+        assert merged.values[0, :2].tolist() == [1.0, 0.5]
+        assert merged.sizes.tolist() == [100, 100, 200, 300]
+
+        path = str(tmp_path / 'cohorts.npz')
+        merged.save(path)
+        loaded = CohortMatrix.load(path)
+        assert np.array_equal(loaded.dates, merged.dates)
+        assert np.array_equal(loaded.values, merged.values, equal_nan=True)
+
+    def test_get_cohort_matrices(self):
+        def route(handler, params, body):
+            if params.get('segment') == 'bad':
+                return 500, {'error': 'failed'}, {}
+            return 200, response(1, len(params['cohort_type'])), {}
+
+        routes = {self.prefix + 'cohorts/daily': route}
+        with StubServer(routes) as stub, ExportApi(**self.keys) as api:
+            api._api_url = stub.url + self.prefix
+            res = api.get_cohort_matrices(segments=[None, 'bad'])
+            base = {key: CohortMatrix.from_response(response(20, 1))
+                    for key in res}
+            merged = api.get_cohort_matrices(['retention'], base=base)
+
+        assert len(res) == 10
+        assert len(res[('retention', None)]) == len('retention')
+        assert isinstance(res[('avg_sessions', 'bad')], SwrveApiException)
+        assert list(merged) == [('retention', None)]
+        assert len(merged[('retention', None)]) == len('retention') + 1
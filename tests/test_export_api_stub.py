@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from pyswrve import ExportApi
+from pyswrve.exceptions import SwrveApiException
+from pyswrve.series_store import SwrveSeriesStore
+from pyswrve.split import SwrveSplitter
+
+from .stub_server import StubServer
+
+
+class TestExportApiStub:
+    """ Class for testing ExportApi methods with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+
+    def make_api(self, stub, **kwargs):
+        api = ExportApi(**dict(self.keys, **kwargs))
+        api._api_url = stub.url + self.prefix
+        return api
+
+    @staticmethod
+    def slow_kpi(delay):
+        def route(handler, params, body):
+            time.sleep(delay)
+            value = float(len(params.get('segment', '')))
+            return 200, [{'data': [['D-2017-01-01', value]]}], {}
+        return route
+
+    def test_get_kpis(self):
+        routes = {
+            self.prefix + 'kpi/dau.json': self.slow_kpi(0.2),
+            self.prefix + 'kpi/new_users.json': self.slow_kpi(0.2),
+            self.prefix + 'kpi/mau.json': (500, {'error': 'failed'}, {})
+        }
+        segments = [None, 'a', 'bb']
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            started = time.monotonic()
+            res = api.get_kpis(['dau', 'new_users', 'mau'], segments,
+                               max_workers=9)
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 0.2 * 3
+        assert len(res) == 9
+        assert res[('dau', 'bb', None)] == [['D-2017-01-01', 2.0]]
+        assert res[('new_users', None, None)] == [['D-2017-01-01', 0.0]]
+        assert isinstance(res[('mau', 'a', None)], SwrveApiException)
+
+    @staticmethod
+    def dropped(handler, params, body):
+        # the connection is closed without a response
+        raise ConnectionAbortedError
+
+    def test_gather_connection_error(self):
+        routes = {self.prefix + 'kpi/dau.json': self.slow_kpi(0),
+                  self.prefix + 'kpi/mau.json': self.dropped}
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            res = api.get_kpis(['dau', 'mau'])
+
+        assert res[('dau', None, None)] == [['D-2017-01-01', 0.0]]
+        error = res[('mau', None, None)]
+        assert isinstance(error, SwrveApiException)
+        assert error.status_code is None and error.error
+        assert error.request_url.startswith(stub.url + self.prefix +
+                                            'kpi/mau.json')
+
+    @staticmethod
+    def daily_kpi(handler, params, body):
+        day = date.fromisoformat(params['start'])
+        stop = date.fromisoformat(params['stop'])
+        data = []
+        while day <= stop:
+            data.append(['D-%s' % day.isoformat(), float(day.day)])
+            day += timedelta(days=1)
+        return 200, [{'data': data}], {}
+
+    def test_series_store(self, tmp_path):
+        routes = {self.prefix + 'kpi/dau.json': self.daily_kpi}
+        path = str(tmp_path / 'series')
+
+        with StubServer(routes) as stub, SwrveSeriesStore(path) as store, \
+                self.make_api(stub, series_store=store) as api:
+            api.set_dates(datetime(2017, 1, 10), datetime(2017, 1, 20))
+            first = api.get_kpi('dau', with_date=False)
+
+            api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 25))
+            second = api.get_kpi('dau')
+
+            api.set_dates(datetime(2017, 1, 5), datetime(2017, 1, 15))
+            third = api.get_kpi('dau')
+
+        assert first == [float(i) for i in range(10, 21)]
+        assert [i[1] for i in second] == [float(i) for i in range(1, 26)]
+        assert second[0][0] == 'D-2017-01-01'
+        assert third == second[4:15]
+
+        requested = [(p['start'], p['stop']) for _, _, p, _ in stub.requests]
+        assert requested == [('2017-01-10', '2017-01-20'),
+                             ('2017-01-01', '2017-01-09'),
+                             ('2017-01-21', '2017-01-25')]
+
+    def test_series_store_empty(self, tmp_path):
+        empty = [{'name': 'dau', 'data': []}]
+        routes = {self.prefix + 'kpi/dau.json': (200, empty, {})}
+        path = str(tmp_path / 'series')
+
+        with StubServer(routes) as stub, SwrveSeriesStore(path) as store, \
+                self.make_api(stub, series_store=store) as api:
+            api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 5))
+            first = api.get_kpi('dau')
+            second = api.get_kpi('dau', with_date=False)
+
+        assert first == second == []
+        assert len(stub.requests) == 1
+
+    @staticmethod
+    def overlapping_sales(handler, params, body):
+        # includes the day before the period to check boundaries
+        day = date.fromisoformat(params['start']) - timedelta(days=1)
+        stop = date.fromisoformat(params['stop'])
+        data = []
+        while day <= stop:
+            data.append(['D-%s' % day.isoformat(), 1.0])
+            day += timedelta(days=1)
+        return 200, [{'currency': 'gold', 'data': data},
+                     {'currency': 'coins', 'data': data}], {}
+
+    def test_splitter(self):
+        monthly = [{'data': [['M-2017-01', 1.0]]}]
+
+        def mau_kpi(handler, params, body):
+            if params.get('segment') == 'daily':
+                return self.daily_kpi(handler, params, body)
+            return 200, monthly, {}
+
+        routes = {self.prefix + 'kpi/dau.json': self.daily_kpi,
+                  self.prefix + 'kpi/mau.json': mau_kpi,
+                  self.prefix + 'item/sales': self.overlapping_sales}
+        splitter = SwrveSplitter(days=10, max_workers=4)
+
+        with StubServer(routes) as stub, \
+                self.make_api(stub, splitter=splitter) as api:
+            api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 25))
+            dau = api.get_kpi('dau', with_date=False)
+            dau_requests = list(stub.requests)
+            mau = api.get_kpi('mau')
+            mau_requests = stub.requests[len(dau_requests):]
+            assert api.get_kpi('mau') == mau
+            # other series of the endpoint are still split
+            assert len(api.get_kpi('mau', segment='daily')) == 25
+            sales = api.get_item_sales()
+
+        assert dau == [float(i) for i in range(1, 26)]
+        requested = [(p['start'], p['stop']) for _, _, p, _ in dau_requests]
+        assert requested[0] == ('2017-01-01', '2017-01-10')
+        assert sorted(requested) == [('2017-01-01', '2017-01-10'),
+                                     ('2017-01-11', '2017-01-20'),
+                                     ('2017-01-21', '2017-01-25')]
+        assert mau == monthly[0]['data']
+        requested = [(p['start'], p['stop']) for _, _, p, _ in mau_requests]
+        assert requested == [('2017-01-01', '2017-01-10'),
+                             ('2017-01-01', '2017-01-25')]
+        assert len(stub.requests) == 3 + 2 + 1 + 3 + 3
+
+        assert [dct['currency'] for dct in sales] == ['gold', 'coins']
+        days = [point[0] for point in sales[0]['data']]
+        assert days[0] == 'D-2016-12-31' and days[-1] == 'D-2017-01-25'
+        assert len(days) == len(set(days)) == 26
+
+    def test_adaptive_splitter(self):
+        url = 'https://dashboard.swrve.com/api/1/exporter/kpi/dau.json'
+        params = {'start': '2017-01-01', 'stop': '2017-12-31'}
+        splitter = SwrveSplitter(days=100, target=2.0, smoothing=0.5)
+
+        assert len(splitter.split(url, params)) == 4
+        splitter.observe(url, 10, 1.0)
+        assert splitter.range_days(url) == 20
+        splitter.observe(url, 10, 3.0)
+        assert splitter.range_days(url) == 10
+        assert splitter.split(url, {'start': '2017-01-01',
+                                    'stop': '2017-01-10'}) is None
+        assert splitter.range_days(url + '?x') == 10
+        assert splitter.range_days(url.replace('dau', 'mau')) == 100
+
+        # latency of a series is used over latency of its endpoint
+        segment = dict(params, segment='payers')
+        splitter.observe(url, 10, 0.5, segment)
+        assert splitter.range_days(url, segment) == 40
+        assert splitter.range_days(url, params) == splitter.range_days(url)
+
+    def test_array_output(self):
+        np = pytest.importorskip('numpy')
+        kpi = [{'data': [['H-2017-01-01-00', 10.0], ['H-2017-01-01-01', 0.0],
+                         ['H-2017-01-01-02', 30.0]]}]
+        dau = [{'data': [['H-2017-01-01-00', 5.0], ['H-2017-01-01-01', 0.0],
+                         ['H-2017-01-01-02', 10.0]]}]
+        routes = {
+            self.prefix + 'kpi/dollar_revenue.json': (200, kpi, {}),
+            self.prefix + 'kpi/dau.json': (200, dau, {})
+        }
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            res = api.get_kpi('dollar_revenue', multiplier=0.5,
+                              output='array')
+            ratio = api.get_kpi_dau('dollar_revenue', output='array')
+            with pytest.raises(ValueError):
+                api.get_kpi('dau', output='dict')
+
+        assert res.timeline.dtype == np.dtype('datetime64[h]')
+        assert res.timeline[2] == np.datetime64('2017-01-01T02')
+        assert res.values.tolist() == [5.0, 0.0, 15.0]
+        assert ratio.values.tolist() == [2.0, 0.0, 3.0]
+
+    def test_get_event_breakdown(self):
+        def payload(handler, params, body):
+            time.sleep(0.2)
+            if params['payload_key'] == 'bad':
+                return 500, {'error': 'failed'}, {}
+            return 200, [{'payload_value': params['payload_key'],
+                          'data': [['D-2017-01-01', 1.0]]}], {}
+
+        keys = ['key%d' % i for i in range(9)] + ['bad']
+        routes = {
+            self.prefix + 'event/count': self.slow_kpi(0.2),
+            self.prefix + 'event/payloads': (200, keys, {}),
+            self.prefix + 'event/payload': payload
+        }
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 1))
+            started = time.monotonic()
+            res = api.get_event_breakdown('evt', max_workers=10)
+            elapsed = time.monotonic() - started
+
+            only = api.get_event_breakdown('evt', ['key1'], with_date=False)
+
+        assert elapsed < 0.2 * 3
+        assert res['event'] == 'evt'
+        assert res['count'] == [['D-2017-01-01', 0.0]]
+        assert list(res['payloads']) == keys
+        assert res['payloads']['key3'] == [{'timeline': 'D-2017-01-01',
+                                            'key3': 1.0}]
+        assert isinstance(res['payloads']['bad'], SwrveApiException)
+
+        assert list(only['payloads']) == ['key1']
+        assert only['count'] == [0.0]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi, FleetApi, AsyncFleetApi
+from pyswrve.api import read_config
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+
+class TestFleetApi:
+    """ Class for testing FleetApi with a local stub server """
+
+    prefix = '/api/1/exporter/'
+    config = (
+        '[app1]\napi_key = key1\npersonal_key = personal\n\n'
+        '[app2]\napi_key = key2\npersonal_key = personal\n\n'
+        '[app3]\napi_key = bad\npersonal_key = personal\nregion = eu\n'
+    )
+
+    @staticmethod
+    def dau(handler, params, body):
+        time.sleep(0.2)
+        if params['api_key'] == 'bad':
+            return 403, {'error': 'wrong key'}, {}
+        return 200, [{'data': [['D-2017-01-01', len(params['api_key'])]]}], {}
+
+    def conf_path(self, tmp_path):
+        path = tmp_path / 'pyswrve.conf'
+        path.write_text(self.config)
+        return str(path)
+
+    def point_to(self, fleet, stub):
+        for api in fleet.apis.values():
+            api._api_url = stub.url + self.prefix
+        fleet.for_each('set_dates', datetime(2017, 1, 1),
+                       datetime(2017, 1, 1))
+
+    def test_read_config(self, tmp_path):
+        path = self.conf_path(tmp_path)
+        assert read_config(path) is read_config(path)
+
+        api = ExportApi(section='app2', conf_path=path)
+        assert api._params['api_key'] == 'key2'
+        assert api.conf_path == path
+
+    def test_run(self, tmp_path):
+        routes = {self.prefix + 'kpi/dau.json': self.dau}
+        with StubServer(routes) as stub, \
+                FleetApi(conf_path=self.conf_path(tmp_path)) as fleet:
+            self.point_to(fleet, stub)
+            started = time.monotonic()
+            res = fleet.run('get_kpi', 'dau', with_date=False)
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 0.2 * 2
+        assert sorted(fleet.transports) == ['eu', 'us']
+        assert fleet.apis['app1']._transport is fleet.apis['app2']._transport
+        assert fleet.apis['app1']._rate_limiter is \
+            fleet.rate_limiters['us']
+        assert res['app1'] == [4]
+        assert isinstance(res['app3'], SwrveApiException)
+
+    def test_async_run(self, tmp_path):
+        pytest.importorskip('aiohttp')
+        routes = {self.prefix + 'kpi/dau.json': self.dau}
+
+        async def run(stub):
+            async with AsyncFleetApi(['app1', 'app2'],
+                                     self.conf_path(tmp_path)) as fleet:
+                self.point_to(fleet, stub)
+                return await fleet.run('get_kpi', 'dau', with_date=False)
+
+        with StubServer(routes) as stub:
+            started = time.monotonic()
+            res = asyncio.run(run(stub))
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 0.2 * 2
+        assert res == {'app1': [4], 'app2': [4]}
+
+        with pytest.raises(TypeError, match='async with'):
+            with AsyncFleetApi(['app1'], self.conf_path(tmp_path)):
+                pass
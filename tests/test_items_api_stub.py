@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import parse_qs
+
+import pytest
+
+from pyswrve import ItemsApi, AsyncItemsApi
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+
+class TestItemsApiStub:
+    """ Class for testing ItemsApi methods with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+
+    @staticmethod
+    def bulk_route(in_flight=None):
+        lock = threading.Lock()
+        in_flight = in_flight if in_flight is not None else [0, 0]
+
+        def route(handler, params, body):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+
+            form = parse_qs(body.decode('utf-8'))
+            items = json.loads(form['data'][0])
+            if 'bad' in items:
+                return 400, {'error': 'bad item'}, {}
+            return 200, {'status': 'ok'}, {}
+        return route
+
+    def make_api(self, stub, api_class=ItemsApi):
+        api = api_class(**self.keys)
+        api._api_url = stub.url + '/api/1/items'
+        return api
+
+    def items(self, count):
+        for idx in range(count):
+            uid = 'bad' if idx == 7 else 'item%d' % idx
+            yield uid, {'name': 'Item %d' % idx, 'item_class': 'sword'}
+
+    def test_upload_items(self):
+        in_flight = [0, 0]
+        routes = {'/api/1/items_bulk': self.bulk_route(in_flight)}
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            report = api.upload_items(self.items(40), max_bytes=300,
+                                      max_workers=4)
+
+        sizes = [len(r[3]) for r in stub.requests]
+        assert report['chunks'] == len(stub.requests) > 5
+        assert max(sizes) < 1000
+        assert len(report['succeeded']) + len(report['failed']) == 40
+        assert isinstance(report['failed']['bad'], SwrveApiException)
+        assert 1 < in_flight[1] <= 4
+
+    def test_create_item_error(self):
+        routes = {'/api/1/items_bulk': self.bulk_route()}
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            with pytest.raises(SwrveApiException):
+                api.create_items({'bad': {'name': 'Bad'}})
+
+    def test_async_upload_items(self):
+        pytest.importorskip('aiohttp')
+        routes = {'/api/1/items_bulk': self.bulk_route()}
+
+        async def upload(stub):
+            async with self.make_api(stub, AsyncItemsApi) as api:
+                return await api.upload_items(dict(self.items(20)),
+                                              max_bytes=300, max_workers=4)
+
+        with StubServer(routes) as stub:
+            report = asyncio.run(upload(stub))
+
+        assert len(report['succeeded']) + len(report['failed']) == 20
+        assert 'bad' in report['failed']
+
+    def test_sync_items(self, tmp_path):
+        current = [
+            {'uid': 'sword', 'name': 'Sword', 'item_class': 'weapon',
+             'attributes': {'damage': '10'}},
+            {'uid': 'shield', 'name': 'Shield', 'item_class': 'armor'},
+            {'uid': 'old', 'name': 'Old'},
+        ]
+        desired = {
+            'sword': {'name': 'Sword', 'item_class': 'weapon', 'damage': 10},
+            'shield': {'name': 'Shield', 'item_class': 'armor',
+                       'weight': 5},
+            'bow': {'name': 'Bow', 'item_class': 'weapon'},
+        }
+        routes = {'/api/1/items': (200, current, {}),
+                  '/api/1/items_bulk': self.bulk_route()}
+        index_path = str(tmp_path / 'items.json')
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            diff = api.sync_items(desired, index_path, dry_run=True)
+            assert diff['create'] == ['bow']
+            assert diff['update'] == ['shield']
+            assert diff['unchanged'] == ['sword']
+            assert diff['extra'] == ['old']
+            assert diff['upload'] is None
+            assert len(stub.requests) == 1
+
+            report = api.sync_items(desired, index_path)
+            bulk = [r for r in stub.requests if r[0] == 'POST']
+            assert len(bulk) == 1
+            items = json.loads(parse_qs(bulk[0][3].decode('utf-8'))['data'][0])
+            assert sorted(items) == ['bow', 'shield']
+            assert sorted(report['upload']['succeeded']) == ['bow', 'shield']
+
+            # the list doesn't show new attribute, the index does
+            current.append({'uid': 'bow', 'name': 'Bow',
+                            'item_class': 'weapon'})
+            diff = api.sync_items(desired, index_path, dry_run=True)
+            assert diff['create'] == diff['update'] == []
+
+    @staticmethod
+    def attrs_route(in_flight):
+        lock = threading.Lock()
+
+        def route(handler, params, body):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+            if params['item'] == 'bad':
+                return 404, {'error': 'no item'}, {}
+            if params['item'] == 'dropped':
+                # the connection is closed without a response
+                raise ConnectionAbortedError
+            return 200, {'uid': params['item'], 'cost': '1'}, {}
+        return route
+
+    def test_get_items_attrs(self, tmp_path):
+        in_flight = [0, 0]
+        routes = {'/api/1/items': self.attrs_route(in_flight)}
+        uids = [uid for uid, _ in self.items(30)] + ['dropped']
+        path = str(tmp_path / 'attrs.jsonl')
+
+        with StubServer(routes) as stub, self.make_api(stub) as api:
+            results = api.get_items_attrs(uids, max_workers=5)
+            report = api.get_items_attrs(iter(uids), path, max_workers=5)
+
+        assert set(results) == set(uids)
+        assert results['item3'] == {'uid': 'item3', 'cost': '1'}
+        assert isinstance(results['bad'], SwrveApiException)
+        assert results['dropped'].status_code is None
+        assert 1 < in_flight[1] <= 5
+
+        assert report['written'] == 29
+        assert sorted(report['failed']) == ['bad', 'dropped']
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert sorted(line['uid'] for line in lines) == \
+            sorted(uid for uid in uids if uid not in ('bad', 'dropped'))
+
+    def test_async_iter_items_attrs(self):
+        pytest.importorskip('aiohttp')
+        in_flight = [0, 0]
+        routes = {'/api/1/items': self.attrs_route(in_flight)}
+
+        async def fetch(stub):
+            async with self.make_api(stub, AsyncItemsApi) as api:
+                return [res async for res in
+                        api.iter_items_attrs(['a', 'b', 'bad', 'c',
+                                              'dropped'], 2)]
+
+        with StubServer(routes) as stub:
+            results = dict(asyncio.run(fetch(stub)))
+
+        assert results['a'] == {'uid': 'a', 'cost': '1'}
+        assert isinstance(results['bad'], SwrveApiException)
+        assert results['dropped'].status_code is None
+        assert in_flight[1] <= 2
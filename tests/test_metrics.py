@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi
+from pyswrve.metrics import SwrveMetrics, Histogram
+from pyswrve.coalesce import SwrveCoalescer
+from pyswrve.ratelimit import SwrveRateLimiter
+
+from .stub_server import StubServer
+
+
+class TestMetrics:
+    """ Class for testing instrumentation hooks """
+
+    keys = {'api_key': 'secret-key', 'personal_key': 'secret-personal'}
+    prefix = '/api/1/exporter/'
+    kpi = [{'data': [['D-2017-01-01', 1.0], ['D-2017-01-02', 2.0]]}]
+
+    def flaky(self, statuses):
+        statuses = list(statuses)
+
+        def route(handler, params, body):
+            if statuses:
+                return statuses.pop(0), {'error': 'busy'}, {'Retry-After': '0'}
+            return 200, self.kpi, {}
+        return route
+
+    def make_api(self, stub, hooks, api_class=ExportApi):
+        limiter = SwrveRateLimiter(backoff=0.01)
+        api = api_class(rate_limiter=limiter, hooks=hooks, **self.keys)
+        api._api_url = stub.url + self.prefix
+        api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 2))
+        return api
+
+    def test_events(self):
+        events = []
+        metrics = SwrveMetrics()
+        routes = {self.prefix + 'kpi/dau.json': self.flaky([429]),
+                  self.prefix + 'event/count': (500, {'error': 'x'}, {})}
+
+        with StubServer(routes) as stub, \
+                self.make_api(stub, [events.append, metrics]) as api:
+            assert api.get_kpi('dau', as_datetime=True)[0][1] == 1.0
+            try:
+                api.get_evt('evt')
+            except Exception:
+                pass
+
+        request, shape = events[:2]
+        assert request['kind'] == 'request'
+        assert request['endpoint'] == 'exporter/kpi/dau.json'
+        assert request['status'] == 200
+        assert request['retries'] == 1
+        assert request['bytes'] == len(json.dumps(self.kpi))
+        for timing in ('ttfb', 'download', 'decode', 'total'):
+            assert 0 <= request[timing] <= request['total']
+
+        assert shape == {'kind': 'shape', 'method': 'kpi_results',
+                         'endpoint': 'exporter/kpi/dau.json',
+                         'shape': shape['shape']}
+        assert len([e for e in events if e['kind'] == 'shape']) == 1
+
+        dump = json.dumps(events)
+        assert 'secret' not in dump
+
+        summary = metrics.summary()
+        assert summary['exporter/kpi/dau.json']['total']['count'] == 1
+        assert summary['exporter/kpi/dau.json']['shape']['count'] == 1
+        assert metrics.errors == {'exporter/event/count': 1}
+
+    def test_failed_hook(self):
+        events = []
+
+        def broken(event):
+            raise RuntimeError('broken hook')
+
+        routes = {self.prefix + 'kpi/dau.json': self.flaky([]),
+                  self.prefix + 'event/count': self.flaky([])}
+        with StubServer(routes) as stub, \
+                self.make_api(stub, [broken, events.append]) as api:
+            api._coalescer = SwrveCoalescer(window=10)
+            assert api.get_kpi('dau')[0][1] == 1.0
+            api.get_evt('evt')
+            # the response is reused without a request
+            api.get_kpi('dau')
+
+        assert len(events) == 5
+        assert events[-1]['kind'] == 'shape'
+        assert events[-1]['endpoint'] == 'exporter/kpi/dau.json'
+
+    def test_labels(self):
+        events = []
+        routes = {self.prefix + 'kpi/dau.json': self.flaky([]),
+                  self.prefix + 'kpi/mau.json': self.flaky([]),
+                  self.prefix + 'segment/list': (200, ['payers'], {})}
+
+        with StubServer(routes) as stub, \
+                self.make_api(stub, [events.append]) as api:
+            api.get_segment_lst()
+            api.get_kpis_dau(['mau'])
+            bulk = [e for e in events
+                    if e.get('method') == 'bulk_dau_results']
+            del events[:]
+            assert len(list(api.iter_kpi('dau'))) == 2
+
+        assert [e['endpoint'] for e in bulk] == ['exporter/bulk_dau']
+
+        request, = events
+        assert request['kind'] == 'request'
+        assert request['endpoint'] == 'exporter/kpi/dau.json'
+        assert request['status'] == 200
+        assert request['bytes'] == len(json.dumps(self.kpi))
+        assert 0 <= request['ttfb'] <= request['total']
+
+    def test_async_events(self):
+        pytest.importorskip('aiohttp')
+        events = []
+        routes = {self.prefix + 'kpi/dau.json': self.flaky([])}
+
+        async def fetch(stub):
+            async with self.make_api(stub, [events.append],
+                                     AsyncExportApi) as api:
+                await asyncio.gather(api.get_kpi('dau'), api.get_kpi('dau'))
+
+        with StubServer(routes) as stub:
+            asyncio.run(fetch(stub))
+
+        requests = [e for e in events if e['kind'] == 'request']
+        shapes = [e for e in events if e['kind'] == 'shape']
+        assert len(requests) == len(shapes) == 2
+        assert requests[0]['decode'] is not None
+        assert shapes[0]['endpoint'] == 'exporter/kpi/dau.json'
+
+    def test_histogram(self):
+        histogram = Histogram([1, 2, 4, 8])
+        for value in [0.5] * 90 + [3] * 9 + [100]:
+            histogram.add(value)
+        assert histogram.percentile(50) == 1
+        assert histogram.percentile(99) == 4
+        assert histogram.percentile(100) == 100
+        assert histogram.summary()['count'] == 100
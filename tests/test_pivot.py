@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi
+from pyswrve.pivot import top_payloads, merge_rows, pivot_dense, \
+    pivot_sparse
+
+
+class TestPivot:
+    """ Class for testing pivot of payload series """
+
+    data = [
+        {'payload_value': '1',
+         'data': [['D-2017-01-01', 160], ['D-2017-01-02', 116]]},
+        {'payload_value': '2',
+         'data': [['D-2017-01-02', 216], ['D-2017-01-03', 0]]},
+        {'payload_value': '3',
+         'data': [['D-2017-01-01', 5], ['D-2017-01-03', 1]]},
+    ]
+
+    def test_merge_rows(self):
+        assert merge_rows(self.data) == [
+            {'timeline': 'D-2017-01-01', '1': 160, '3': 5},
+            {'timeline': 'D-2017-01-02', '1': 116, '2': 216},
+            {'timeline': 'D-2017-01-03', '2': 0, '3': 1},
+        ]
+
+    def test_payload_results(self):
+        api = ExportApi(api_key='key', personal_key='personal')
+
+        res = api._payload_results(self.data, False, False, False)
+        assert res[1] == {'timeline': 1, '1': 116, '2': 0, '3': 1}
+
+        res = api._payload_results(self.data, True, True, False)
+        assert res[0]['timeline'] == datetime(2017, 1, 1)
+
+        res = api._payload_results(self.data, True, False, True, top=2)
+        assert [dct['payload_value'] for dct in res] == ['1', '2']
+
+    def test_top_payloads(self):
+        assert top_payloads(self.data, None) is self.data
+        res = top_payloads(self.data, 2)
+        assert [dct['payload_value'] for dct in res] == ['1', '2']
+
+    def test_pivot_dense(self):
+        np = pytest.importorskip('numpy')
+        res = pivot_dense(self.data)
+        assert res.payload_values == ['1', '2', '3']
+        assert res.timeline[0] == np.datetime64('2017-01-01')
+        assert res.values.shape == (3, 3)
+        assert res.values[1, :2].tolist() == [116, 216]
+        assert np.isnan(res.values[1, 2])
+        assert np.isnan(res.values[0, 1])
+        assert res.values[2, 1] == 0
+
+    def test_pivot_sparse(self):
+        np = pytest.importorskip('numpy')
+        res = pivot_sparse(self.data)
+        assert len(res.values) == 5
+        cells = dict(zip(zip(res.rows.tolist(), res.cols.tolist()),
+                         res.values.tolist()))
+        assert cells[(1, 1)] == 216
+        assert (2, 1) not in cells
+
+        dense = pivot_dense(self.data).values
+        assert np.all(dense[res.rows, res.cols] == res.values)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi
+from pyswrve.exceptions import SwrveApiException
+from pyswrve.ratelimit import SwrveRateLimiter, TokenBucket
+
+from .stub_server import StubServer
+
+
+class TestRateLimiter:
+    """ Class for testing SwrveRateLimiter with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+
+    @staticmethod
+    def flaky(statuses):
+        statuses = list(statuses)
+
+        def route(handler, params, body):
+            status = statuses.pop(0) if statuses else 200
+            if status != 200:
+                return status, {'error': 'busy'}, {'Retry-After': '0'}
+            return 200, ['segment'], {}
+        return route
+
+    def make_api(self, stub, limiter, api_class=ExportApi):
+        api = api_class(rate_limiter=limiter, **self.keys)
+        api._api_url = stub.url + self.prefix
+        return api
+
+    def test_retry(self):
+        routes = {self.prefix + 'segment/list': self.flaky([429, 503])}
+        limiter = SwrveRateLimiter(backoff=0.01)
+        with StubServer(routes) as stub, self.make_api(stub, limiter) as api:
+            assert api.get_segment_lst() == ['segment']
+        assert len(stub.requests) == 3
+
+    def test_max_retries(self):
+        routes = {self.prefix + 'segment/list': self.flaky([503] * 10)}
+        limiter = SwrveRateLimiter(max_retries=2, backoff=0.01)
+        with StubServer(routes) as stub, self.make_api(stub, limiter) as api:
+            with pytest.raises(SwrveApiException) as exc:
+                api.get_segment_lst()
+        assert exc.value.status_code == 503
+        assert len(stub.requests) == 3
+
+    def test_deadline(self):
+        def route(handler, params, body):
+            return 429, {'error': 'slow down'}, {'Retry-After': '10'}
+
+        routes = {self.prefix + 'segment/list': route}
+        limiter = SwrveRateLimiter(deadline=1)
+        with StubServer(routes) as stub, self.make_api(stub, limiter) as api:
+            started = time.monotonic()
+            with pytest.raises(SwrveApiException):
+                api.get_segment_lst()
+        assert time.monotonic() - started < 1
+        assert limiter.bucket('key').rate < limiter.rate
+
+    def test_rate_shared_by_threads_and_tasks(self):
+        pytest.importorskip('aiohttp')
+        routes = {self.prefix + 'segment/list': self.flaky([])}
+        limiter = SwrveRateLimiter(rate=20, burst=1)
+
+        async def fetch(stub):
+            async with self.make_api(stub, limiter, AsyncExportApi) as api:
+                await asyncio.gather(*[api.get_segment_lst()
+                                       for _ in range(4)])
+
+        with StubServer(routes) as stub, self.make_api(stub, limiter) as api:
+            started = time.monotonic()
+            api.get_kpis(['dau', 'mau', 'dau_mau', 'new_users'])
+            asyncio.run(fetch(stub))
+            elapsed = time.monotonic() - started
+
+        assert elapsed >= 7 / 20
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi, Report
+from pyswrve.report import ReportQuery
+from pyswrve.exceptions import SwrveApiException
+
+from .stub_server import StubServer
+
+
+def series(dates, value):
+    def route(handler, params, body):
+        data = [['D-2017-01-%02d' % day, value] for day in dates]
+        return 200, [{'name': 'series', 'data': data}], {}
+    return route
+
+
+class TestReport:
+    """ Class for testing reports planning and assembling """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+    kpi = prefix + 'kpi/%s.json'
+
+    def routes(self):
+        return {
+            self.kpi % 'dau': series([1, 2], 10.0),
+            self.kpi % 'dollar_revenue': series([1, 2], 5.0),
+            self.kpi % 'currency_spent': series([1, 2], 20.0),
+            self.kpi % 'mau': (500, {'error': 'failed'}, {}),
+            self.prefix + 'event/count': series([2, 3], 30.0),
+            self.prefix + 'event/list': (200, ['levelup'], {}),
+            self.prefix + 'segment/list': (200, ['payers'], {}),
+        }
+
+    def report(self):
+        return Report(kpis=['dau', 'dollar_revenue', 'currency_spent',
+                            'currency_spent_dau', 'mau'],
+                      events='all', segments='all', currencies=['gold'],
+                      per_dau=['levelup'], multiplier=0.5,
+                      start=datetime(2017, 1, 1), stop='2017-01-03')
+
+    def check_table(self, table):
+        np = pytest.importorskip('numpy')
+        assert table.timeline.tolist() == list(np.arange(
+            '2017-01-01', '2017-01-04', dtype='datetime64[D]'
+        ))
+
+        columns = table.columns
+        spent_dau = ReportQuery('kpi', 'currency_spent_dau', None, 'gold')
+        assert columns[spent_dau][:2].tolist() == [2.0, 2.0]
+        revenue = ReportQuery('kpi', 'dollar_revenue', 'payers', None)
+        assert columns[revenue][:2].tolist() == [2.5, 2.5]
+
+        levelup = columns[ReportQuery('evt_dau', 'levelup', None, None)]
+        assert np.isnan(levelup[0]) and np.isnan(levelup[2])
+        assert levelup[1] == 3.0
+
+        mau = ReportQuery('kpi', 'mau', 'payers', None)
+        assert mau not in columns
+        assert isinstance(table.errors[mau], SwrveApiException)
+
+    def test_get_report(self):
+        pytest.importorskip('numpy')
+        with StubServer(self.routes()) as stub, \
+                ExportApi(**self.keys) as api:
+            api._api_url = stub.url + self.prefix
+            table = api.get_report(self.report(), max_workers=4)
+
+        self.check_table(table)
+        paths = [request[1] for request in stub.requests]
+        assert len(paths) == 2 + 5 * 2
+        assert self.kpi % 'currency_spent_dau' not in paths
+        assert paths.count(self.kpi % 'dau') == 2
+
+        params = [request[2] for request in stub.requests
+                  if request[1] == self.kpi % 'currency_spent']
+        assert params[0]['currency'] == 'gold'
+        assert params[0]['start'] == '2017-01-01'
+
+    def test_async_get_report(self):
+        pytest.importorskip('numpy')
+        pytest.importorskip('aiohttp')
+
+        async def fetch(stub):
+            async with AsyncExportApi(**self.keys) as api:
+                api._api_url = stub.url + self.prefix
+                return await api.get_report(self.report())
+
+        with StubServer(self.routes()) as stub:
+            self.check_table(asyncio.run(fetch(stub)))
+
+    def test_plan(self):
+        costs = {'exporter/kpi/dau.json': 2.0,
+                 'exporter/event/count': 1.0,
+                 'exporter/kpi/new_users.json': 0.5}
+        plan = Report(kpis=['new_users', 'dau', 'dau'],
+                      events=['levelup']).plan(ExportApi.kpi_factors,
+                                               costs=costs)
+        assert [query.name for query in plan.queries] == \
+            ['dau', 'levelup', 'new_users']
+        assert plan.derived == {}
+
+        plan = Report(kpis=['currency_spent_dau']).plan(ExportApi.kpi_factors)
+        assert plan.queries == plan.columns
+
+        plan = Report(kpis='all').plan(ExportApi.kpi_factors)
+        assert len(plan.queries) == len(ExportApi.kpi_factors) - 3
+
+    def test_plan_estimate(self):
+        report = Report(kpis=['dau', 'day7_retention', 'currency_spent'],
+                        events=['levelup'], segments=[None, 'payers'],
+                        currencies=['gold'])
+        plan = report.plan(ExportApi.kpi_factors)
+        assert plan.queries[0] == ReportQuery('kpi', 'day7_retention',
+                                              'payers', None)
+        assert plan.queries[-1] == ReportQuery('kpi', 'dau', None, None)
+
+        # measured costs win, the estimate orders equal ones
+        costs = {'exporter/kpi/dau.json': 10.0, 'exporter/event/count': 0.1}
+        plan = report.plan(ExportApi.kpi_factors, costs=costs)
+        assert [query.name for query in plan.queries[-2:]] == \
+            ['levelup', 'levelup']
+        assert plan.queries[0].name == 'day7_retention'
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi, AsyncExportApi
+from pyswrve.exceptions import SwrveApiException
+from pyswrve.stream import iter_series, aiter_series
+
+from .stub_server import StubServer
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return [raw[i:i+size] for i in range(0, len(raw), size)]
+
+
+class TestStream:
+    """ Class for testing incremental decoding of Export API responses """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    prefix = '/api/1/exporter/'
+    payload = [
+        {'data': [['D-2017-01-01', 160], ['D-2017-01-02', 116.5]],
+         'name': 'levelup/level/1', 'payload_value': '1'},
+        {'payload_value': 'äö', 'tags': {'a': [1, 2]},
+         'data': [['D-2017-01-01', 12345678], ['D-2017-01-02', 0]]},
+        {'payload_value': 'empty', 'data': []},
+    ]
+
+    def test_iter_series(self):
+        for size in (1, 3, 7, 1024):
+            res = [(dict(series), point) for series, point in
+                   iter_series(chunked(self.payload, size))]
+            assert [point for _, point in res] == \
+                [p for dct in self.payload for p in dct['data']]
+            assert res[2][0]['tags'] == {'a': [1, 2]}
+            assert res[2][1] == ['D-2017-01-01', 12345678]
+
+    def test_aiter_series(self):
+        async def decode(chunks):
+            async def source():
+                for chunk in chunks:
+                    yield chunk
+            return [point async for _, point in aiter_series(source())]
+
+        res = asyncio.run(decode(chunked(self.payload, 3)))
+        assert res == [p for dct in self.payload for p in dct['data']]
+
+    def test_wait_for_key(self):
+        res = list(iter_series(chunked(self.payload, 5), 'payload_value'))
+        assert [series['payload_value'] for series, _ in res] == \
+            ['1', '1', 'äö', 'äö']
+
+        assert list(iter_series([b'[', b' ]'])) == []
+        with pytest.raises(ValueError):
+            list(iter_series([b'[{"data": [[1, 2]', b']']))
+
+    def test_export_api(self):
+        kpi = [{'data': [['D-2017-01-01', 10.0], ['D-2017-01-02', 20.0]]}]
+        routes = {
+            self.prefix + 'kpi/dollar_revenue.json': (200, kpi, {}),
+            self.prefix + 'event/payload': (200, self.payload, {}),
+            self.prefix + 'event/count': (400, {'error': 'bad'}, {})
+        }
+
+        with StubServer(routes) as stub, ExportApi(**self.keys) as api:
+            api._api_url = stub.url + self.prefix
+            api.set_dates(datetime(2017, 1, 1), datetime(2017, 1, 2))
+
+            res = list(api.iter_kpi('dollar_revenue', multiplier=0.5,
+                                    as_datetime=True))
+            assert res == [[datetime(2017, 1, 1), 5.0],
+                           [datetime(2017, 1, 2), 10.0]]
+            assert list(api.iter_kpi('dollar_revenue', with_date=False)) == \
+                api.get_kpi('dollar_revenue', with_date=False)
+
+            res = list(api.iter_payload('levelup', 'level', with_date=False))
+            assert res == [('1', 160), ('1', 116.5), ('äö', 12345678),
+                           ('äö', 0)]
+
+            with pytest.raises(SwrveApiException):
+                list(api.iter_evt('evt'))
+
+    def test_async_export_api(self):
+        pytest.importorskip('aiohttp')
+        sales = [{'currency': 'gold',
+                  'data': [['D-2017-01-01', 1.0], ['D-2017-01-02', 2.0]]}]
+        routes = {
+            self.prefix + 'kpi/dollar_revenue.json': (200, sales, {}),
+            self.prefix + 'event/payload': (200, self.payload, {}),
+            self.prefix + 'item/sales': (200, sales, {}),
+            self.prefix + 'event/count': (400, {'error': 'bad'}, {})
+        }
+
+        async def fetch(stub):
+            async with AsyncExportApi(**self.keys) as api:
+                api._api_url = stub.url + self.prefix
+                kpi = [point async for point in
+                       api.iter_kpi('dollar_revenue', with_date=False,
+                                    multiplier=0.5)]
+                payload = [item async for item in
+                           api.iter_payload('levelup', 'level')]
+                items = [item async for item in api.iter_item_sales()]
+                with pytest.raises(SwrveApiException) as exc:
+                    async for _ in api.iter_evt('evt'):
+                        pass
+                return kpi, payload, items, exc.value
+
+        with StubServer(routes) as stub:
+            kpi, payload, items, error = asyncio.run(fetch(stub))
+
+        assert kpi == [0.5, 1.0]
+        assert payload[2] == ('äö', ['D-2017-01-01', 12345678])
+        assert items == [({'currency': 'gold'}, ['D-2017-01-01', 1.0]),
+                         ({'currency': 'gold'}, ['D-2017-01-02', 2.0])]
+        assert error.status_code == 400 and error.error == 'bad'
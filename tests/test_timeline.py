@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from pyswrve import ExportApi
+from pyswrve.timeline import parse_date, parse_timeline, parse_days
+
+
+class TestTimeline:
+    """ Class for testing parsing of Swrve timeline strings """
+
+    def test_same_as_strptime(self):
+        api = ExportApi(api_key='key', personal_key='personal')
+        for date_str in ('D-2017-01-31', 'MD-2017-01-31', 'H-2017-01-31-05',
+                         'DH-2017-01-31-23', 'M-2017-02', 'Y-2017'):
+            for prefix, fmt in api.date_formats.items():
+                if date_str.startswith(prefix):
+                    expected = datetime.strptime(date_str[len(prefix):], fmt)
+                    break
+            assert parse_date(date_str) == expected
+            assert api.to_datetime(date_str) == expected
+
+    def test_parse_timeline(self):
+        timeline = ['H-2017-01-01-%02d' % i for i in range(24)] * 2
+        res = parse_timeline(timeline)
+        assert len(res) == 48
+        assert res[5] == datetime(2017, 1, 1, 5)
+        assert res[5] is res[29]
+        assert parse_timeline([]) == []
+
+    def test_parse_days(self):
+        assert parse_days(['2017-01-02']) == [datetime(2017, 1, 2)]
+
+    def test_unknown_prefix(self):
+        with pytest.raises(ValueError):
+            parse_date('W-2017-01')
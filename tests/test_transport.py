@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from pyswrve import ExportApi
+from pyswrve.transport import SwrveTransport
+
+from .stub_server import StubServer
+
+
+class TestTransport:
+    """ Class for testing SwrveTransport with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+
+    def test_connections_reused(self):
+        routes = {'/api/1/exporter/segment/list': (200, ['a', 'b'], {})}
+        with StubServer(routes) as stub, ExportApi(**self.keys) as api:
+            api._api_url = stub.url + '/api/1/exporter/'
+            for _ in range(5):
+                assert api.get_segment_lst() == ['a', 'b']
+
+        assert len(stub.requests) == 5
+        assert len(stub.client_ports) == 1
+
+    def test_shared_transport(self):
+        routes = {'/api/1/exporter/event/list': (200, ['evt'], {})}
+        with StubServer(routes) as stub, SwrveTransport(pool_size=2) as tr:
+            apis = [ExportApi(transport=tr, **self.keys) for _ in range(3)]
+            for api in apis:
+                api._api_url = stub.url + '/api/1/exporter/'
+                assert api.get_evt_lst() == ['evt']
+                api.close()
+
+            # api objects don't close a transport they don't own
+            assert apis[0].get_evt_lst() == ['evt']
+
+        assert len(stub.client_ports) == 1
+
+    def test_no_keep_alive(self):
+        routes = {'/api/1/exporter/event/list': (200, [], {})}
+        transport = SwrveTransport(keep_alive=False)
+        with StubServer(routes) as stub, \
+                ExportApi(transport=transport, **self.keys) as api:
+            api._api_url = stub.url + '/api/1/exporter/'
+            for _ in range(3):
+                api.get_evt_lst()
+        transport.close()
+
+        assert len(stub.client_ports) == 3
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import asyncio
+
+import pytest
+
+from pyswrve import UserdbApi, AsyncUserdbApi
+from pyswrve.ratelimit import SwrveRateLimiter
+from pyswrve.userdb_api import _FileDownload
+
+from .stub_server import StubServer
+
+
+class TestUserdbDownload:
+    """ Class for testing UserdbApi.download with a local stub server """
+
+    keys = {'api_key': 'key', 'personal_key': 'personal'}
+    files = {
+        '/files/users_0000.gz': os.urandom(300000),
+        '/files/users_0001.gz': os.urandom(200000),
+        '/files/users.schema': b'user_id,level'
+    }
+
+    def file_route(self, path):
+        data = self.files[path]
+        etag = '"%s"' % hash(data)
+
+        def route(handler, params, body):
+            headers = {'ETag': etag}
+            byte_range = handler.headers.get('Range')
+            if byte_range is None:
+                return 200, data, headers
+            start = int(byte_range.split('=')[1].rstrip('-'))
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (
+                start, len(data) - 1, len(data)
+            )
+            return 206, data[start:], headers
+        return route
+
+    @staticmethod
+    def local_path(target, url):
+        return _FileDownload(url, target, None).file_path
+
+    def make_urls(self, stub):
+        return {
+            'date': '2017-01-01',
+            'data_files': {'users': [stub.url + '/files/users_0000.gz',
+                                     stub.url + '/files/users_0001.gz']},
+            'schemas': {'users': stub.url + '/files/users.schema'}
+        }
+
+    def test_download(self, tmp_path):
+        routes = {path: self.file_route(path) for path in self.files}
+        target = str(tmp_path)
+
+        with StubServer(routes) as stub, UserdbApi(**self.keys) as api:
+            urls = self.make_urls(stub)
+            part = self.local_path(target, stub.url + '/files/users_0000.gz')
+            part += '.part'
+            with open(part, 'wb') as f:
+                f.write(self.files['/files/users_0000.gz'][:1000])
+
+            report = api.download(target, urls, chunk_size=4096)
+            assert report['downloaded'] == 3
+            assert report['errors'] == {}
+            assert report['bytes'] == 499000 + len(b'user_id,level')
+            assert report['throughput'] > 0
+
+            ranges = [r for r in stub.requests if r[0] == 'GET']
+            assert len(ranges) == 3
+
+            report = api.download(target, urls)
+            assert report['skipped'] == 3
+            assert report['bytes'] == 0
+
+        for path, data in self.files.items():
+            with open(self.local_path(target, stub.url + path), 'rb') as f:
+                assert f.read() == data
+        assert not os.path.exists(part)
+
+    def test_presigned_urls(self, tmp_path):
+        data = self.files['/files/users_0000.gz']
+        other = self.files['/files/users_0001.gz']
+        failures = ['/a/users.gz']
+
+        def ranged(content):
+            def handle(handler, params, body):
+                if handler.command == 'HEAD':
+                    return 403, b'', {}
+                path = handler.path.split('?')[0]
+                if path in failures:
+                    failures.remove(path)
+                    return 503, b'', {}
+                byte_range = handler.headers.get('Range')
+                if byte_range is None:
+                    return 200, content, {'ETag': '"x"'}
+                start, _, stop = byte_range.split('=')[1].partition('-')
+                stop = int(stop) if stop else len(content) - 1
+                headers = {'ETag': '"x"', 'Content-Range': 'bytes %s-%d/%d'
+                           % (start, stop, len(content))}
+                return 206, content[int(start):stop + 1], headers
+            return handle
+
+        routes = {'/a/users.gz': ranged(data), '/b/users.gz': ranged(other)}
+        limiter = SwrveRateLimiter(backoff=0.01)
+        target = str(tmp_path)
+        with StubServer(routes) as stub, \
+                UserdbApi(rate_limiter=limiter, **self.keys) as api:
+            urls = {'data_files': [stub.url + '/a/users.gz?sig=1',
+                                   stub.url + '/b/users.gz?sig=2']}
+            report = api.download(target, urls)
+            assert report['errors'] == {}
+            assert report['downloaded'] == 2
+
+            urls = {'data_files': [stub.url + '/a/users.gz?sig=3']}
+            assert api.download(target, urls)['skipped'] == 1
+
+        assert failures == []
+        assert len(set(report['paths'])) == 2
+        with open(self.local_path(target, stub.url + '/a/users.gz'),
+                  'rb') as f:
+            assert f.read() == data
+        with open(self.local_path(target, stub.url + '/b/users.gz'),
+                  'rb') as f:
+            assert f.read() == other
+
+    @staticmethod
+    def closed_url():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        return 'http://127.0.0.1:%d/files/users_0002.gz' % port
+
+    def test_download_error(self, tmp_path):
+        closed = self.closed_url()
+        with StubServer({}) as stub, UserdbApi(**self.keys) as api:
+            urls = self.make_urls(stub)
+            urls['data_files']['users'].append(closed)
+            report = api.download(str(tmp_path), urls)
+
+        assert len(report['errors']) == 4
+        assert report['errors'][stub.url + '/files/users.schema'].status_code \
+            == 404
+        assert report['errors'][closed].status_code is None
+        assert report['errors'][closed].error
+
+    def test_async_download(self, tmp_path):
+        pytest.importorskip('aiohttp')
+        routes = {path: self.file_route(path) for path in self.files}
+        target = str(tmp_path)
+        closed = self.closed_url()
+
+        async def download(urls):
+            async with AsyncUserdbApi(**self.keys) as api:
+                first = await api.download(target, urls, chunk_size=4096)
+                second = await api.download(target, urls)
+            return first, second
+
+        with StubServer(routes) as stub:
+            urls = self.make_urls(stub)
+            urls['data_files']['users'].append(closed)
+            first, second = asyncio.run(download(urls))
+
+        assert first['downloaded'] == 3
+        assert list(first['errors']) == [closed]
+        assert first['bytes'] == 500000 + len(b'user_id,level')
+        assert second['skipped'] == 3
+        for path, data in self.files.items():
+            with open(self.local_path(target, stub.url + path), 'rb') as f:
+                assert f.read() == data
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import math
+from collections import Counter
+
+import pytest
+
+from pyswrve import UserdbApi
+from pyswrve.userdb_reader import parse_schema
+
+
+def count_payers(records):
+    return Counter(str(record['payer']) for record in records)
+
+
+class TestUserdbReader:
+    """ Class for testing reading of downloaded UserDB files """
+
+    schema_sql = """
+        CREATE TABLE IF NOT EXISTS `all_users` (
+            `swrve_user_id` VARCHAR(255) NOT NULL,
+            `level` INT,
+            `revenue` DECIMAL(10, 2),
+            `payer` BOOLEAN,
+            PRIMARY KEY (`swrve_user_id`)
+        );
+    """
+    rows = [
+        ['u1', '1', '0.5', 'true'],
+        ['u2', '', '1.25', 'false'],
+        ['u3', '7', '\\N', 'true']
+    ]
+
+    def write_files(self, tmp_path):
+        paths = []
+        for idx in range(2):
+            path = str(tmp_path / ('users_%d.gz' % idx))
+            with gzip.open(path, 'wt') as f:
+                for row in self.rows:
+                    f.write(','.join(row) + '\n')
+            paths.append(path)
+        return paths
+
+    def test_parse_schema(self):
+        tables = parse_schema(self.schema_sql)
+        assert tables == {'all_users': [
+            ('swrve_user_id', 'varchar'), ('level', 'int'),
+            ('revenue', 'decimal'), ('payer', 'boolean')
+        ]}
+
+    def test_iter_records(self, tmp_path):
+        schema = parse_schema(self.schema_sql)['all_users']
+        paths = self.write_files(tmp_path)
+
+        records = list(UserdbApi.iter_records(paths, schema))
+        assert len(records) == 6
+        assert records[0] == {'swrve_user_id': 'u1', 'level': 1,
+                              'revenue': 0.5, 'payer': True}
+        assert records[1]['level'] is None
+        assert records[2]['revenue'] is None
+
+        records = list(UserdbApi.iter_records(paths, schema, ['level']))
+        assert records[:3] == [{'level': 1}, {'level': None}, {'level': 7}]
+
+    def test_iter_batches(self, tmp_path):
+        schema = parse_schema(self.schema_sql)['all_users']
+        paths = self.write_files(tmp_path)
+
+        batches = list(UserdbApi.iter_batches(paths, schema,
+                                              ['swrve_user_id', 'payer'],
+                                              batch_size=4))
+        assert [len(b['payer']) for b in batches] == [4, 2]
+        assert batches[1] == {'swrve_user_id': ['u2', 'u3'],
+                              'payer': [False, True]}
+
+    def test_process(self, tmp_path):
+        schema = parse_schema(self.schema_sql)['all_users']
+        paths = self.write_files(tmp_path)
+
+        res = UserdbApi.process(paths, schema, count_payers,
+                                lambda a, b: a + b, columns=['payer'],
+                                max_workers=2)
+        assert res == Counter({'True': 4, 'False': 2})
+
+        res = UserdbApi.process(paths, schema, count_payers,
+                                lambda a, b: [a, b], initial=None,
+                                columns=['payer'], max_workers=2)
+        assert res[0][0] is None
+
+        assert UserdbApi.process([], schema, count_payers,
+                                 lambda a, b: a + b, Counter()) == Counter()
+        with pytest.raises(ValueError):
+            UserdbApi.process([], schema, count_payers, lambda a, b: a + b)
+
+    def test_columns(self, tmp_path):
+        pytest.importorskip('numpy')
+        schema = parse_schema(self.schema_sql)['all_users']
+        paths = self.write_files(tmp_path)
+        target = str(tmp_path / 'columns')
+
+        snapshot = UserdbApi.convert_columns(paths, schema, target,
+                                             '2017-01-01', ['level'])
+        assert snapshot.keys() == ['level']
+
+        UserdbApi.convert_columns(paths, schema, target, '2017-01-01')
+        snapshot = UserdbApi.load_columns(target)
+
+        assert snapshot.date == '2017-01-01'
+        assert len(snapshot) == 6
+        assert list(snapshot['swrve_user_id'])[:3] == ['u1', 'u2', 'u3']
+        assert snapshot['level'].tolist() == [1, None, 7] * 2
+        assert snapshot['payer'].sum() == 4
+        assert math.isnan(snapshot['revenue'][2])
+        assert snapshot['revenue'][1] == 1.25
+
+        # already converted snapshots aren't parsed again
+        snapshot = UserdbApi.convert_columns([], schema, target, '2017-01-01')
+        assert len(snapshot) == 6
+        UserdbApi.convert_columns(paths[:1], schema, target, '2017-01-02',
+                                  ['level'])
+        with pytest.raises(ValueError):
+            UserdbApi.convert_columns(paths, schema, target, '2017-01-02')